@@ -0,0 +1,65 @@
+from __future__ import print_function
+import argparse
+import json
+import sys
+
+# Compares two result files of run.py: for every case found in both, the ratio new/old of the
+# times and peak memories. Exits with status 1 if any ratio is above --threshold, so it can
+# be used to catch regressions between releases.
+
+# Fields identifying a measurement
+case_fields = ("format", "kind", "n", "groups", "partitions", "periodic", "sparse", "workers", "measurement", "rules", "batch")
+
+
+
+
+####################################################################################################
+####################################################################################################
+def case_key(result):
+    return tuple(result.get(field) for field in case_fields)
+
+
+def compared_values(result):
+    # (name, value) pairs compared for a measurement
+    stage = result["measurement"]
+    return [(stage + "_seconds", result.get(stage + "_seconds")), (stage + "_memory_mib", result.get(stage + "_memory_mib"))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2, help="largest accepted new/old ratio")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print("old: " + str(old["version"].get("commit")) + "   new: " + str(new["version"].get("commit")))
+
+    previous = dict((case_key(result), result) for result in old["results"])
+    regressions = 0
+    for result in new["results"]:
+        reference = previous.get(case_key(result))
+        if reference is None:
+            continue
+        ratios = []
+        for (name, value), (name, old_value) in zip(compared_values(result), compared_values(reference)):
+            if value is None or not old_value:
+                continue
+            ratio = value / old_value
+            flag = ""
+            if ratio > args.threshold:
+                flag = " <-- slower" if name.endswith("seconds") else " <-- more memory"
+                regressions += 1
+            ratios.append("%s %.3g -> %.3g (x%.2f)%s" % (name, old_value, value, ratio, flag))
+        print("%-10s %-5s n=%-4d %-6s rules=%-3d  " % (result["format"], result["kind"], result["n"], result["measurement"],
+            result["rules"]) + ", ".join(ratios))
+
+    print(str(regressions) + " regressions above x" + str(args.threshold))
+    sys.exit(1 if regressions > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
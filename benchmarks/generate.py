@@ -0,0 +1,176 @@
+from __future__ import print_function
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gmshtranslator.mshwriter import write_msh
+from gmshtranslator.readers import ElementBlock
+
+# Synthetic .msh files for the benchmarks: a structured grid of n x n x n cells in the unit
+# cube, as 8-node hexahedra or 6 tetrahedra per cell, written as MSH 2.2 or 4.1, ASCII or
+# binary. Options add what real meshes have and the parser must handle:
+#
+#   groups      physical groups, as layers of cells along z (1 .. groups)
+#   partitions  partitions, as slabs of cells along x (MSH 2.2 element tags, MSH 4.1 $PartitionedEntities)
+#   periodic    $Periodic links between the opposite faces of the cube (with affine transformations)
+#   sparse      node and element tags with gaps (multiples of SPARSE_STRIDE)
+#
+# Nodes and elements are generated one plane of cells at a time into the arrays of a mesh, which
+# are written by gmshtranslator.mshwriter.
+
+SPARSE_STRIDE = 7
+
+# Hexahedron corners (i, j, k offsets) in gmsh order, and its split in 6 positive tetrahedra
+hexahedron_corners = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+hexahedron_tetrahedra = [[0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6], [0, 5, 1, 6]]
+
+
+
+
+####################################################################################################
+####################################################################################################
+class SyntheticMesh(object):
+    """
+SyntheticMesh
+
+    Structured mesh description. Nodes are numbered index = (i*(n+1) + j)*(n+1) + k for the
+    grid point (i, j, k); elements are generated by entity, one entity per (physical group,
+    partition) pair, and numbered consecutively in that order.
+    """
+
+    def __init__(self, n, kind="hex", groups=1, partitions=0, periodic=False, sparse=False):
+        if kind not in ("hex", "tet"):
+            raise ValueError("gmshTranslator: unknown element kind \"" + str(kind) + "\", use hex or tet")
+        if groups < 1 or groups > n or partitions > n:
+            raise ValueError("gmshTranslator: need 1 <= groups <= n and partitions <= n")
+        self.n = n
+        self.kind = kind
+        self.groups = groups
+        self.partitions = partitions
+        self.periodic = periodic
+        self.stride = SPARSE_STRIDE if sparse else 1
+        self.eletype = 5 if kind == "hex" else 4
+        self.nodes_per_element = 8 if kind == "hex" else 4
+        self.cells_per_element = 1 if kind == "hex" else 6
+        self.Nnodes = (n + 1)**3
+        self.Nelem = self.cells_per_element * n**3
+
+    def node_tag(self, index):
+        return 1 + self.stride * np.asarray(index, dtype=np.int64)
+
+    def element_tag(self, number):
+        return 1 + self.stride * np.asarray(number, dtype=np.int64)
+
+    def node_planes(self):
+        # Yields (tags, coords) for the nodes of each plane i = 0..n
+        n = self.n
+        x = np.linspace(0.0, 1.0, n + 1)
+        j, k = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing="ij")
+        j, k = j.ravel(), k.ravel()
+        for i in range(n + 1):
+            coords = np.column_stack((np.full(j.size, x[i]), x[j], x[k]))
+            yield self.node_tag((i * (n + 1) + j) * (n + 1) + k), coords
+
+    def ranges(self, parts):
+        return [(p * self.n // parts, (p + 1) * self.n // parts) for p in range(parts)]
+
+    def entities(self):
+        # (entity tag, physical group, partition, first i, last i + 1, first k, last k + 1)
+        slabs = self.ranges(max(self.partitions, 1))
+        layers = self.ranges(self.groups)
+        result = []
+        for g, (k0, k1) in enumerate(layers):
+            for p, (i0, i1) in enumerate(slabs):
+                partition = p + 1 if self.partitions > 0 else 0
+                result.append((len(result) + 1, g + 1, partition, i0, i1, k0, k1))
+        return result
+
+    def entity_size(self, entity):
+        tag, grp, partition, i0, i1, k0, k1 = entity
+        return self.cells_per_element * (i1 - i0) * self.n * (k1 - k0)
+
+    def element_planes(self, entity, first_number):
+        # Yields the connectivity (node tags) of the elements of `entity`, one plane of cells at a
+        # time, and their tags (numbered from first_number)
+        n = self.n
+        tag, grp, partition, i0, i1, k0, k1 = entity
+        j, k = np.meshgrid(np.arange(n), np.arange(k0, k1), indexing="ij")
+        j, k = j.ravel(), k.ravel()
+        number = first_number
+        for i in range(i0, i1):
+            corners = np.column_stack([((i + di) * (n + 1) + j + dj) * (n + 1) + k + dk for di, dj, dk in hexahedron_corners])
+            if self.kind == "tet":
+                corners = corners[:, hexahedron_tetrahedra].reshape(-1, 4)
+            yield self.element_tag(np.arange(number, number + corners.shape[0])), self.node_tag(corners)
+            number += corners.shape[0]
+
+    def periodic_links(self):
+        # (dimension, entity, master entity, affine, pairs) for the faces x = 1, y = 1 and z = 1,
+        # slaves of x = 0, y = 0 and z = 0
+        n = self.n
+        a, b = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing="ij")
+        a, b = a.ravel(), b.ravel()
+        links = []
+        for axis in range(3):
+            ijk_slave = [a, b]
+            ijk_slave.insert(axis, np.full(a.size, n))
+            ijk_master = [a, b]
+            ijk_master.insert(axis, np.zeros(a.size, dtype=a.dtype))
+            slaves = (ijk_slave[0] * (n + 1) + ijk_slave[1]) * (n + 1) + ijk_slave[2]
+            masters = (ijk_master[0] * (n + 1) + ijk_master[1]) * (n + 1) + ijk_master[2]
+            affine = np.eye(4)
+            affine[axis, 3] = 1.0
+            links.append((2, 2 * axis + 2, 2 * axis + 1, affine.ravel(), np.column_stack((self.node_tag(slaves), self.node_tag(masters)))))
+        return links
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_mesh(filename, mesh, version="2.2", binary=False):
+    # Writes `mesh` (a SyntheticMesh) as MSH version "2.2" or "4.1", with the writer of gmshtranslator:
+    # physical group g is named "group<g>", elements keep their entity and partition
+    node_tags, node_coords = [np.concatenate(columns) for columns in zip(*mesh.node_planes())]
+    tags, nodes, physgrp, entities, partitions = [], [], [], [], []
+    number = 0
+    for entity in mesh.entities():
+        tag, grp, partition, i0, i1, k0, k1 = entity
+        for plane_tags, plane_nodes in mesh.element_planes(entity, number):
+            number += plane_tags.size
+            tags.append(plane_tags)
+            nodes.append(plane_nodes)
+            for values, value in ((physgrp, grp), (entities, tag), (partitions, partition)):
+                values.append(np.full(plane_tags.size, value, dtype=np.int64))
+    block = ElementBlock(mesh.eletype, np.concatenate(tags), np.concatenate(physgrp), np.concatenate(entities),
+        np.concatenate(nodes), np.arange(mesh.Nelem), np.concatenate(partitions).astype(np.int32))
+    groups = range(1, mesh.groups + 1)
+    write_msh(filename, node_tags, node_coords, {mesh.eletype : block}, dict((g, "group%d" % g) for g in groups),
+        dict((g, 3) for g in groups), version, binary, mesh.periodic_links() if mesh.periodic else ())
+
+
+
+
+####################################################################################################
+####################################################################################################
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic structured .msh file")
+    parser.add_argument("filename")
+    parser.add_argument("-n", type=int, default=20, help="cells per side")
+    parser.add_argument("--kind", default="hex", choices=["hex", "tet"])
+    parser.add_argument("--version", default="2.2", choices=["2.2", "4.1"])
+    parser.add_argument("--binary", action="store_true")
+    parser.add_argument("--groups", type=int, default=1)
+    parser.add_argument("--partitions", type=int, default=0)
+    parser.add_argument("--periodic", action="store_true")
+    parser.add_argument("--sparse", action="store_true")
+    args = parser.parse_args()
+    mesh = SyntheticMesh(args.n, args.kind, args.groups, args.partitions, args.periodic, args.sparse)
+    write_mesh(args.filename, mesh, args.version, args.binary)
+    print("Wrote " + args.filename + ": " + str(mesh.Nnodes) + " nodes, " + str(mesh.Nelem) + " elements")
+
+
+if __name__ == "__main__":
+    main()
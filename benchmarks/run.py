@@ -0,0 +1,209 @@
+from __future__ import print_function
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate import SyntheticMesh, write_mesh
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Benchmark runner. For every case (mesh size, format, element kind and options) a synthetic
+# mesh is written with generate.py, and every measurement runs in a fresh python process so
+# that its time and peak memory are not affected by the others:
+#
+#   init    gmshTranslator(filename): the initial pass
+#   parse   gmshTranslator(filename) and parse() with 0, 1 or many rules (normal or batch rules)
+#
+# Results are written as JSON (see README.md, *Benchmarks*) and can be compared between
+# versions with compare.py.
+
+# Cells per side for each preset: from about a thousand to about ten million elements
+presets = {
+    "small" : [10, 20],
+    "medium" : [10, 50, 100],
+    "large" : [10, 100, 215],
+}
+
+formats = {
+    "2.2-ascii" : ("2.2", False),
+    "2.2-binary" : ("2.2", True),
+    "4.1-ascii" : ("4.1", False),
+    "4.1-binary" : ("4.1", True),
+}
+
+
+
+
+####################################################################################################
+####################################################################################################
+def peak_memory():
+    # Peak resident memory of this process, in MiB (None where the resource module is missing)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1048576.0
+    return peak / 1024.0
+
+
+def add_rules(gt, rules, batch, groups):
+    # rules conditions on the physical groups, cycling through them, and actions that count
+    counts = {"nodes" : 0, "elements" : 0}
+    def count_node(*args):
+        counts["nodes"] += 1
+    def count_nodes(tags, x, y, z):
+        counts["nodes"] += len(tags)
+    def count_element(*args):
+        counts["elements"] += 1
+    def count_elements(eletags, eletype, physgrp, nodes):
+        counts["elements"] += len(eletags)
+
+    for r in range(rules):
+        name = "group" + str(1 + r % groups)
+        if batch:
+            gt.add_nodes_batch_rule(gt.are_nodes_in(name), count_nodes)
+            gt.add_elements_batch_rule(gt.are_elements_in(name), count_elements)
+        else:
+            gt.add_nodes_rule(gt.is_node_in(name), count_node)
+            gt.add_elements_rule(gt.is_element_in(name), count_element)
+    return counts
+
+
+def measure(case):
+    # Runs one measurement in this process (see main) and returns its results
+    from gmshtranslator.gmshtranslator import gmshTranslator
+    result = {"baseline_memory_mib" : peak_memory()}
+
+    start = time.time()
+    gt = gmshTranslator(case["filename"], workers=case["workers"])
+    result["init_seconds"] = time.time() - start
+    result["init_memory_mib"] = peak_memory()
+    result["nodes"] = int(gt.Nnodes)
+    result["elements"] = int(gt.Nelem)
+
+    if case["measurement"] == "parse":
+        counts = add_rules(gt, case["rules"], case["batch"], case["groups"])
+        start = time.time()
+        gt.parse(workers=case["workers"])
+        result["parse_seconds"] = time.time() - start
+        result["parse_memory_mib"] = peak_memory()
+        result["parse_entities_per_second"] = (result["nodes"] + result["elements"]) / max(result["parse_seconds"], 1e-9)
+        result["matched_nodes"] = counts["nodes"]
+        result["matched_elements"] = counts["elements"]
+    return result
+
+
+def run_measurement(case):
+    # Runs `measure` in a new python process, reading its result from the last output line
+    command = [sys.executable, os.path.abspath(__file__), "--measure", json.dumps(case)]
+    output = subprocess.check_output(command).decode()
+    return json.loads(output.strip().splitlines()[-1])
+
+
+
+
+####################################################################################################
+####################################################################################################
+def version_info():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=root,
+            stderr=open(os.devnull, "w")).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import numpy
+    return {
+        "commit" : commit,
+        "python" : platform.python_version(),
+        "numpy" : numpy.__version__,
+        "platform" : platform.platform(),
+        "processor" : platform.processor(),
+        "date" : datetime.datetime.now().isoformat(),
+    }
+
+
+def cases(args):
+    sizes = args.sizes or presets[args.preset]
+    for n in sizes:
+        for kind in args.kinds:
+            for fmt in args.formats:
+                yield {
+                    "n" : n,
+                    "kind" : kind,
+                    "format" : fmt,
+                    "groups" : min(args.groups, n),
+                    "partitions" : min(args.partitions, n),
+                    "periodic" : args.periodic,
+                    "sparse" : args.sparse,
+                    "workers" : args.workers,
+                }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gmshTranslator on synthetic meshes")
+    parser.add_argument("--preset", default="small", choices=sorted(presets))
+    parser.add_argument("--sizes", type=int, nargs="+", help="cells per side (overrides --preset)")
+    parser.add_argument("--kinds", nargs="+", default=["hex"], choices=["hex", "tet"])
+    parser.add_argument("--formats", nargs="+", default=sorted(formats), choices=sorted(formats))
+    parser.add_argument("--groups", type=int, default=4, help="physical groups")
+    parser.add_argument("--partitions", type=int, default=0)
+    parser.add_argument("--periodic", action="store_true")
+    parser.add_argument("--sparse", action="store_true", help="node and element tags with gaps")
+    parser.add_argument("--rules", type=int, nargs="+", default=[0, 1, 10], help="numbers of rules for parse()")
+    parser.add_argument("--batch", action="store_true", help="use batch rules instead of normal rules")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each measurement, the fastest is kept")
+    parser.add_argument("--workdir", default=".", help="where the meshes are written")
+    parser.add_argument("--keep", action="store_true", help="keep the meshes")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        #child process: gmshTranslator messages go to /dev/null, the result to stdout
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        result = measure(json.loads(args.measure))
+        stdout.write(json.dumps(result) + "\n")
+        return
+
+    results = []
+    for case in cases(args):
+        version, binary = formats[case["format"]]
+        mesh = SyntheticMesh(case["n"], case["kind"], case["groups"], case["partitions"], case["periodic"], case["sparse"])
+        filename = os.path.join(args.workdir, "benchmark_%(kind)s_%(n)d_%(format)s.msh" % case)
+        write_mesh(filename, mesh, version, binary)
+        case["filename"] = filename
+        case["file_bytes"] = os.path.getsize(filename)
+
+        measurements = [dict(case, measurement="init", rules=0, batch=False)]
+        measurements += [dict(case, measurement="parse", rules=rules, batch=args.batch) for rules in args.rules]
+        for m in measurements:
+            runs = [run_measurement(m) for r in range(args.repeat)]
+            key = "init_seconds" if m["measurement"] == "init" else "parse_seconds"
+            result = dict(m, **min(runs, key=lambda run: run[key]))
+            del result["filename"]
+            results.append(result)
+            print("%-10s %-5s n=%-4d %-6s rules=%-3d %s %.3f s, peak %s MiB" % (m["format"], m["kind"], m["n"],
+                m["measurement"], m["rules"], "batch" if m["batch"] else "     ", result[key],
+                "%.0f" % result[m["measurement"] + "_memory_mib"] if result.get(m["measurement"] + "_memory_mib") else "?"))
+
+        if not args.keep:
+            os.remove(filename)
+
+    with open(args.output, "w") as f:
+        json.dump({"version" : version_info(), "results" : results}, f, indent=1)
+    print("Wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-from __future__ import print_function
-from gmshtranslator import gmshTranslator
+"""
+gmshtranslator
+
+    Rules and actions prototypes (see README.md):
 
-print ("gmshtranslator friendly reminder: rules and actions prototypes\n\n")
-print ("def node_condition(tag,x,y,z,physgroups): ")
-print ("def node_action(tag,x,y,z):")
-print ("def element_condition(eletag,eletype,physgrp,nodes):")
-print ("def element_action(eletag,eletype,physgrp,nodes):")
+    def node_condition(tag,x,y,z,physgroups):
+    def node_action(tag,x,y,z):
+    def element_condition(eletag,eletype,physgrp,nodes):
+    def element_action(eletag,eletype,physgrp,nodes):
+    def node_batch_condition(tags,x,y,z,physgroups): -> mask
+    def node_batch_action(tags,x,y,z):
+    def element_batch_condition(eletags,eletype,physgrp,nodes): -> mask
+    def element_batch_action(eletags,eletype,physgrp,nodes):
+"""
+from __future__ import print_function
+from .gmshtranslator import gmshTranslator
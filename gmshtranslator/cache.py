@@ -0,0 +1,124 @@
+from __future__ import print_function
+import numpy as np
+import hashlib
+import json
+import os
+from .readers import ElementBlock
+
+# On-disk cache of a parsed mesh: header information, physical group membership, periodic
+# links and the node/element arrays are stored in a single .npz file, together with a key
+# identifying the version of the .msh file they were obtained from.
+
+CACHE_VERSION = 3
+
+
+
+
+####################################################################################################
+####################################################################################################
+def cache_key(mshfilename, method="mtime"):
+    # "mtime": path, size and modification time of the file (cheap).
+    # "hash" : sha1 of the contents of the file (reads the whole file, survives copies and touches).
+    if method == "hash":
+        digest = hashlib.sha1()
+        with open(mshfilename, "rb") as fid:
+            for block in iter(lambda: fid.read(1 << 24), b""):
+                digest.update(block)
+        return "hash:" + digest.hexdigest()
+    info = os.stat(mshfilename)
+    mtime = getattr(info, "st_mtime_ns", None)     #python 2 only has the float st_mtime
+    if mtime is None:
+        mtime = int(info.st_mtime * 1e9)
+    return "mtime:%s:%d:%d" % (os.path.abspath(mshfilename), info.st_size, mtime)
+
+
+def cache_path(mshfilename, cache_dir=None):
+    # Next to the .msh file by default, otherwise in cache_dir under a name unique to the path
+    if cache_dir is None:
+        return mshfilename + ".cache.npz"
+    name = hashlib.sha1(os.path.abspath(mshfilename).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, os.path.basename(mshfilename) + "." + name + ".npz")
+
+
+
+
+####################################################################################################
+####################################################################################################
+def save_cache(path, key, header, node_tags, node_coords, element_blocks, membership, periodic_links):
+    arrays = {}
+    arrays["node_tags"] = np.asarray(node_tags)
+    arrays["node_coords"] = np.asarray(node_coords)
+    for eletype, block in element_blocks.items():
+        for field in ("tags", "physgrp", "entity", "nodes", "index", "partition"):
+            arrays["elements_%d_%s" % (eletype, field)] = np.asarray(getattr(block, field))
+        if block.partition_tags is not None:
+            arrays["elements_%d_partition_tags" % eletype] = np.asarray(block.partition_tags)
+
+    nodes, gidx = membership.pairs()
+    arrays["membership_nodes"] = nodes
+    arrays["membership_gidx"] = gidx
+    arrays["membership_groups"] = np.asarray(membership.groups, dtype=np.int64)
+
+    arrays["periodic_ids"] = np.array([link[:3] for link in periodic_links], dtype=np.int64).reshape(-1, 3)
+    arrays["periodic_npairs"] = np.array([len(link[4]) for link in periodic_links], dtype=np.int64)
+    arrays["periodic_naffine"] = np.array([len(link[3]) for link in periodic_links], dtype=np.int64)
+    arrays["periodic_affine"] = np.concatenate([np.zeros(0)] + [link[3] for link in periodic_links])
+    arrays["periodic_pairs"] = np.concatenate([np.zeros((0, 2), dtype=np.int64)] + [link[4] for link in periodic_links])
+
+    header = dict(header, cache_version=CACHE_VERSION, key=key, eletypes=sorted(int(t) for t in element_blocks))
+    arrays["header"] = np.array(json.dumps(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as fid:
+        np.savez(fid, **arrays)
+    getattr(os, "replace", os.rename)(temporary, path)
+
+
+def load_cache(path, key):
+    # Returns the cached data as a dictionary, or None if there is no valid cache for `key`. The arrays
+    # are read while the .npz file is open, which is closed before returning.
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("cache_version") != CACHE_VERSION or header.get("key") != key:
+                return None
+            return read_cache_arrays(data, header)
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+
+def read_cache_arrays(data, header):
+    element_blocks = {}
+    for eletype in header["eletypes"]:
+        fields = [data["elements_%d_%s" % (eletype, field)] for field in ("tags", "physgrp", "entity", "nodes", "index", "partition")]
+        partition_tags = "elements_%d_partition_tags" % eletype
+        fields.append(data[partition_tags] if partition_tags in data.files else None)
+        element_blocks[eletype] = ElementBlock(eletype, *fields)
+
+    periodic_links = []
+    npairs = np.cumsum(np.append(0, data["periodic_npairs"]))
+    naffine = np.cumsum(np.append(0, data["periodic_naffine"]))
+    periodic_affine = data["periodic_affine"]
+    periodic_pairs = data["periodic_pairs"]
+    for i, (dim, entity, master) in enumerate(data["periodic_ids"]):
+        periodic_links.append((int(dim), int(entity), int(master),
+            periodic_affine[naffine[i]:naffine[i+1]], periodic_pairs[npairs[i]:npairs[i+1]]))
+
+    return {
+        "header" : header,
+        "node_tags" : data["node_tags"],
+        "node_coords" : data["node_coords"],
+        "element_blocks" : element_blocks,
+        "membership" : (data["membership_nodes"], data["membership_gidx"], data["membership_groups"]),
+        "periodic_links" : periodic_links,
+    }
+
+
+def remove_cache(path):
+    if os.path.exists(path):
+        os.remove(path)
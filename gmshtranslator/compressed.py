@@ -0,0 +1,251 @@
+from __future__ import print_function
+import numpy as np
+import bisect
+import io
+import os
+import threading
+import zlib
+import bz2
+from collections import OrderedDict
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Transparent reading of compressed .msh files (gzip, xz, bz2 and, with the zstandard package,
+# zstd), recognized by their first bytes whatever their name. open_mesh() gives a seekable file
+# object over the decompressed data, decompressing the file in large blocks as it is read.
+#
+# Seeking backwards in a compressed stream means decompressing it again from an earlier point.
+# For gzip, the state of the decompressor is saved every CHECKPOINT_INTERVAL bytes of output, in
+# an index shared by all the files opened on the same .msh (one per process), so going back to a
+# section found in an earlier pass only decompresses from the checkpoint before it. Other formats
+# start again from the beginning of the file. The last HISTORY bytes read are kept, so that short
+# look-backs (as done by the section scanners) cost nothing.
+#
+# Binary sections cannot be memory mapped from compressed files: map_array reads them instead.
+
+INPUT_BLOCK = 1 << 20           # compressed bytes decompressed at once
+HISTORY = 1 << 20               # decompressed bytes kept behind the current block
+CHECKPOINT_INTERVAL = 1 << 24   # decompressed bytes between two gzip checkpoints
+READ_BUFFER = 1 << 16           # buffer of the io.BufferedReader returned by open_mesh
+MAX_INDEXES = 8                 # decompression indexes kept (one per compressed file)
+
+magic_numbers = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def compression_of(filename):
+    # "gzip", "xz", "bz2", "zstd", or None for uncompressed files
+    with open(filename, "rb") as f:
+        start = f.read(8)
+    for magic, method in magic_numbers:
+        if start.startswith(magic):
+            return method
+    return None
+
+
+def new_decompressor(method):
+    if method == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if method == "bz2":
+        return bz2.BZ2Decompressor()
+    if method == "xz":
+        if lzma is None:
+            raise ValueError("gmshTranslator: reading xz compressed files needs the lzma module")
+        return lzma.LZMADecompressor()
+    if zstandard is None:
+        raise ValueError("gmshTranslator: reading zstd compressed files needs the zstandard package")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def stream_finished(decompressor):
+    # End of a gzip member, bz2/xz stream or zstd frame (files may hold several, one after the other)
+    return getattr(decompressor, "eof", False) or len(getattr(decompressor, "unused_data", b"")) > 0
+
+
+def open_mesh(filename):
+    # Binary file object on the (decompressed) contents of filename
+    method = compression_of(filename)
+    if method is None:
+        return open(filename, "rb")
+    return io.BufferedReader(CompressedFile(filename, method), READ_BUFFER)
+
+
+def is_compressed(f):
+    return isinstance(getattr(f, "raw", None), CompressedFile)
+
+
+def mesh_size(filename):
+    # Size of the mesh in bytes, None if not known (compressed files)
+    if compression_of(filename) is not None:
+        return None
+    return os.path.getsize(filename)
+
+
+def map_array(f, filename, dtype, offset, shape):
+    # np.memmap of `shape` values of type dtype at byte `offset` of the mesh; for compressed files
+    # (f opened with open_mesh), the values read into memory through f, which is left after them.
+    if not is_compressed(f):
+        return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    f.seek(offset)
+    data = f.read(count * dtype.itemsize)
+    if len(data) != count * dtype.itemsize:
+        raise IOError("gmshTranslator: unexpected end of file")
+    return np.frombuffer(data, dtype=dtype, count=count).reshape(shape)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class DecompressionIndex(object):
+    """
+DecompressionIndex
+
+    Checkpoints of the decompression of a file: (decompressed offset, compressed offset,
+    decompressor state or None for a fresh decompressor), sorted by offset. The first one
+    is the beginning of the file.
+    """
+
+    def __init__(self):
+        self.positions = [0]
+        self.checkpoints = [(0, 0, None)]
+        self.lock = threading.Lock()
+
+    def add(self, position, offset, state):
+        with self.lock:
+            if position >= self.positions[-1] + CHECKPOINT_INTERVAL:
+                self.positions.append(position)
+                self.checkpoints.append((position, offset, state))
+
+    def last_position(self):
+        return self.positions[-1]
+
+    def before(self, position):
+        # Last checkpoint at or before `position`
+        with self.lock:
+            return self.checkpoints[bisect.bisect_right(self.positions, position) - 1]
+
+
+# Indexes of the last MAX_INDEXES compressed files opened by this process, by (path, size,
+# modification time), least recently used first
+indexes = OrderedDict()
+indexes_lock = threading.Lock()
+
+def shared_index(filename):
+    info = os.stat(filename)
+    key = (os.path.abspath(filename), info.st_size, getattr(info, "st_mtime_ns", info.st_mtime))
+    with indexes_lock:
+        index = indexes.pop(key, None) or DecompressionIndex()
+        indexes[key] = index
+        while len(indexes) > MAX_INDEXES:
+            indexes.popitem(last=False)
+    return index
+
+
+
+
+####################################################################################################
+####################################################################################################
+class CompressedFile(io.RawIOBase):
+    """
+CompressedFile
+
+    Seekable raw file over the decompressed contents of a compressed file. `output` holds the
+    decompressed bytes from offset output_start on: the current block and up to HISTORY bytes
+    before it. Use it through open_mesh, which adds buffering.
+    """
+
+    def __init__(self, filename, method):
+        io.RawIOBase.__init__(self)
+        self.fid = open(filename, "rb")
+        self.method = method
+        self.index = shared_index(filename)
+        self.__restart__(self.index.before(0))
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self.fid.close()
+        io.RawIOBase.close(self)
+
+    def __restart__(self, checkpoint):
+        position, offset, state = checkpoint
+        self.fid.seek(offset)
+        self.decompressor = new_decompressor(self.method) if state is None else state.copy()
+        self.unused = b""
+        self.output = b""
+        self.output_start = position
+        self.position = position
+        self.finished = False
+
+    def __end__(self):
+        return self.output_start + len(self.output)
+
+    def __fill__(self):
+        # Decompress the next block of input, appending it to `output`
+        data = self.unused or self.fid.read(INPUT_BLOCK)
+        self.unused = b""
+        if len(data) == 0 or (self.method == "gzip" and len(data.strip(b"\x00")) == 0):
+            self.finished = True
+            return
+        block = self.decompressor.decompress(data)
+        if stream_finished(self.decompressor):
+            self.unused = self.decompressor.unused_data
+            self.decompressor = new_decompressor(self.method)
+
+        keep = self.output[max(0, len(self.output) - HISTORY):]
+        self.output_start = self.__end__() - len(keep)
+        self.output = keep + block
+        end = self.__end__()
+        if self.method == "gzip" and len(self.unused) == 0 and end >= self.index.last_position() + CHECKPOINT_INTERVAL:
+            self.index.add(end, self.fid.tell(), self.decompressor.copy())
+
+    def readinto(self, b):
+        while self.position >= self.__end__() and not self.finished:
+            self.__fill__()
+        start = self.position - self.output_start
+        n = min(len(b), len(self.output) - start)
+        if n <= 0:
+            return 0
+        b[:n] = memoryview(self.output)[start:start+n]
+        self.position += n
+        return n
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            while not self.finished:
+                self.__fill__()
+            offset += self.__end__()
+        if offset < self.output_start or self.index.before(offset)[0] > self.__end__():
+            self.__restart__(self.index.before(offset))
+        while offset > self.__end__() and not self.finished:
+            self.__fill__()
+        self.position = min(offset, self.__end__())
+        return self.position
+
+    def tell(self):
+        return self.position
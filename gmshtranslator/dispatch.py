@@ -0,0 +1,97 @@
+from __future__ import print_function
+import numpy as np
+from .topology import element_facets
+
+# Dispatch of element rules. Conditions built from structured selectors (physical groups,
+# element types, dimensions) are decided once per (eletype, physgrp) pair instead of once per
+# element: each pair gets the list of rules that can match it, and elements of pairs with no
+# rule are skipped without calling any python function.
+
+
+def element_dimension(eletype):
+    # 0 for points (and types without facets), 1 for lines, 2 for surfaces, 3 for volumes
+    return element_facets.get(int(eletype), (0, None))[0]
+
+
+def as_set(values):
+    if values is None:
+        return None
+    if isinstance(values, (list, tuple, set, frozenset, np.ndarray)):
+        return frozenset(int(v) for v in values)
+    return frozenset([int(values)])
+
+
+
+
+####################################################################################################
+####################################################################################################
+class ElementSelector(object):
+    """
+ElementSelector
+
+    Element rule condition selecting elements by physical group, element type and dimension
+    (any of them if None), and optionally by a further condition(eletag,eletype,physgrp,nodes).
+    It is called like any condition, but parse() only evaluates it for elements of the
+    (eletype, physgrp) pairs it can match.
+    """
+
+    def __init__(self, physgrps=None, eletypes=None, dims=None, condition=None):
+        self.physgrps = as_set(physgrps)
+        self.eletypes = as_set(eletypes)
+        self.dims = as_set(dims)
+        self.condition = condition
+        self.__name__ = getattr(condition, "__name__", "element_selector")
+
+    def matches(self, eletype, physgrp):
+        # Whether elements of this type and group may be selected (ignoring `condition`)
+        return ((self.physgrps is None or int(physgrp) in self.physgrps) and
+            (self.eletypes is None or int(eletype) in self.eletypes) and
+            (self.dims is None or element_dimension(eletype) in self.dims))
+
+    def __call__(self, eletag, eletype, physgrp, nodes, *partitions):
+        if not self.matches(eletype, physgrp):
+            return False
+        return self.condition is None or self.condition(eletag, eletype, physgrp, nodes, *partitions)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class RuleDispatcher(object):
+    """
+RuleDispatcher
+
+    Dispatch table of a list of (condition, action) element rules: for an (eletype, physgrp)
+    pair, rules_for gives (rule number, must call condition) for the rules that can match, in
+    the order they were added. Pairs are compiled the first time they are seen. If `physgrps`
+    is given, elements of other physical groups match no rule.
+    """
+
+    def __init__(self, rules, physgrps=None):
+        self.rules = rules
+        self.physgrps = as_set(physgrps)
+        self.table = {}
+
+    def rules_for(self, eletype, physgrp):
+        key = (int(eletype), int(physgrp))
+        entries = self.table.get(key)
+        if entries is None:
+            entries = []
+            rules = self.rules if self.physgrps is None or key[1] in self.physgrps else []
+            for number, (condition, action) in enumerate(rules):
+                if isinstance(condition, ElementSelector):
+                    if condition.matches(eletype, physgrp):
+                        entries.append((number, condition.condition is not None))
+                else:
+                    entries.append((number, True))
+            self.table[key] = entries
+        return entries
+
+    def selected_rows(self, block):
+        # Boolean mask of the elements of `block` (an ElementBlock) that some rule can match
+        selected = np.zeros(len(block), dtype=bool)
+        for physgrp in np.unique(block.physgrp):
+            if len(self.rules_for(block.eletype, physgrp)) > 0:
+                selected |= block.physgrp == physgrp
+        return selected
@@ -0,0 +1,96 @@
+from __future__ import print_function
+import numpy as np
+import hashlib
+import json
+import os
+
+# Fingerprints of the physical groups of a mesh, to find out which groups changed between two
+# versions of a .msh file. The fingerprint of a group is its number of elements and nodes, a
+# sha1 of its elements (types, tags and connectivity in gmsh ordering) and a sha1 of its nodes
+# (tags and coordinates). They are saved as JSON after a run and compared on the next one, so
+# that rules and writers only have to be run again for the groups that changed.
+
+FINGERPRINT_VERSION = 1
+
+
+
+
+####################################################################################################
+####################################################################################################
+def group_fingerprints(node_tags, node_coords, element_blocks, membership, names=None):
+    # {physical group : {"name", "elements", "nodes", "connectivity", "coordinates"}}
+    names = names or {}
+    counts = {}
+    digests = {}
+    for eletype in sorted(element_blocks):
+        block = element_blocks[eletype]
+        order = np.argsort(block.physgrp, kind="mergesort")     # file order within each group
+        groups, starts = np.unique(block.physgrp[order], return_index=True)
+        bounds = np.append(starts, order.size)
+        for g, grp in enumerate(groups.tolist()):
+            rows = order[bounds[g]:bounds[g+1]]
+            digest = digests.setdefault(grp, hashlib.sha1())
+            digest.update(np.array([eletype, rows.size], dtype="<i8").tobytes())
+            digest.update(np.ascontiguousarray(block.tags[rows], dtype="<i8").tobytes())
+            digest.update(np.ascontiguousarray(block.nodes[rows], dtype="<i8").tobytes())
+            counts[grp] = counts.get(grp, 0) + rows.size
+
+    sorter = np.argsort(node_tags, kind="mergesort")
+    fingerprints = {}
+    for grp in sorted(digests):
+        nodes = membership.nodes_of(grp)
+        positions = sorter[np.searchsorted(node_tags, nodes, sorter=sorter)]
+        coordinates = hashlib.sha1(np.ascontiguousarray(nodes, dtype="<i8").tobytes())
+        coordinates.update(np.ascontiguousarray(node_coords[positions], dtype="<f8").tobytes())
+        fingerprints[grp] = {
+            "name" : names.get(grp),
+            "elements" : int(counts[grp]),
+            "nodes" : int(nodes.size),
+            "connectivity" : digests[grp].hexdigest(),
+            "coordinates" : coordinates.hexdigest(),
+        }
+    return fingerprints
+
+
+def changed_groups(previous, fingerprints):
+    # Groups of `fingerprints` which are new or differ from `previous` (all of them if previous is None)
+    if previous is None:
+        return sorted(fingerprints)
+    return [grp for grp in sorted(fingerprints) if previous.get(grp) != fingerprints[grp]]
+
+
+
+
+####################################################################################################
+####################################################################################################
+def fingerprint_path(mshfilename, cache_dir=None):
+    # Next to the .msh file by default, otherwise in cache_dir under a name unique to the path (as cache_path)
+    if cache_dir is None:
+        return mshfilename + ".fingerprints.json"
+    name = hashlib.sha1(os.path.abspath(mshfilename).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, os.path.basename(mshfilename) + "." + name + ".fingerprints.json")
+
+
+def save_fingerprints(path, fingerprints):
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump({"version" : FINGERPRINT_VERSION, "groups" : [[int(grp), fingerprints[grp]] for grp in sorted(fingerprints)]},
+            f, indent=1)
+    getattr(os, "replace", os.rename)(temporary, path)
+
+
+def load_fingerprints(path):
+    # The saved fingerprints, or None if there are none (or they cannot be read)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if data.get("version") != FINGERPRINT_VERSION:
+        return None
+    return dict((grp, fingerprint) for grp, fingerprint in data["groups"])
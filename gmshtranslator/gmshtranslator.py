@@ -1,6 +1,58 @@
 from __future__ import print_function
-import scipy as sp
+import numpy as np
+import multiprocessing
 import sys
+import os
+import io
+from .readers import find_line, find_marker, read_section_body, parse_ascii_nodes, parse_ascii_elements, \
+    read_mesh_format, read_physical_names, map_binary_nodes, map_binary_elements, read_periodic_v2, \
+    Section, index_sections, end_marker_offset, iter_ascii_line_chunks, iter_ascii_node_chunks, iter_ascii_element_chunks, iter_binary_node_chunks, iter_binary_element_chunks, \
+    parallel_parse_nodes, parallel_parse_elements, read_array
+from .msh4 import MSH4Format, read_entities, read_partitioned_entities, read_nodes, read_elements, read_periodic, iter_node_chunks, \
+    iter_element_chunks
+from .membership import MembershipBuilder, NodesInPhysicalGroups, PhysicalGroupMembership
+from .cache import cache_key, cache_path, save_cache, load_cache, remove_cache
+from .writers import write_opensees, write_essi, write_abaqus, write_vtk, used_nodes, selected_blocks
+from .mshwriter import write_msh
+from .ordering import node_orderings, reorder_block, reorder_blocks
+from .renumbering import compact_renumbering, rcm_renumbering, renumber_blocks, bandwidth
+from .topology import Topology
+from .partitions import Partitioning, partition_writers, write_partition
+from .periodic import PeriodicConstraints
+from .spatial import SpatialIndex, tag_mask
+from .instrumentation import Instrumentation, clock
+from .dispatch import ElementSelector, RuleDispatcher
+from .pipeline import Pipeline, AsyncAction
+from .fingerprints import group_fingerprints, changed_groups, fingerprint_path, save_fingerprints, load_fingerprints
+from .compressed import open_mesh, mesh_size, compression_of
+from .quality import MeshQuality
+
+PROGRESS_LINES = 1 << 16    # lines between two progress calls of the line by line passes
+PROGRESS_ITEMS = 1 << 14    # nodes or elements between two progress calls when applying rules
+
+class NodeGroupMasks(object):
+    """
+NodeGroupMasks
+
+    Passed as `physgroups` to node batch conditions. physgroups[grp] is a boolean mask telling
+    which of the nodes in the batch belong to physical group `grp`. Masks are built on demand.
+    """
+
+    def __init__(self, translator, tags):
+        self.translator = translator
+        self.tags = tags
+        self.masks = {}
+
+    def __getitem__(self, grp):
+        if grp not in self.masks:
+            self.masks[grp] = self.translator.node_groups.contains(grp, self.tags)
+        return self.masks[grp]
+
+    def __iter__(self):
+        return iter(self.translator.physical_groups)
+
+
+
 
 class gmshTranslator:
     """
@@ -14,16 +66,36 @@ gmshTranslator
 
 ####################################################################################################
 ####################################################################################################
-    def __init__(self, mshfilename):
+    def __init__(self, mshfilename, workers=1, cache=False, cache_dir=None, lazy=False, ordering="gmsh",
+            verbose=True, progress=None, profile=False):
 
+        #verbose = False silences all messages but errors. Timings (and, with profile = True, the
+        #time spent in every rule) are kept in self.stats, progress(phase, done, total) is called during long phases.
+        self.verbose = verbose
+        self.stats = Instrumentation(progress, profile)
         self.mshfilename = mshfilename
-        self.mshfid = open(mshfilename,"r")
+        self.mshfid = open_mesh(mshfilename)
+
+        #cache = True (or "mtime") or "hash" keeps the parsed mesh in an .npz file (see cache.py)
+        self.cache = "mtime" if cache is True else cache
+        self.cache_dir = cache_dir
+
+        #Node ordering convention of the element connectivity given to rules and kept in element_blocks (see ordering.py)
+        if ordering not in node_orderings:
+            self.__error__("Unknown node ordering \"" + str(ordering) + "\". Available: " + ", ".join(sorted(node_orderings)))
+            exit(-1)
+        self.ordering = ordering
+
+        #lazy = True only reads the header sections now, see __scan_header__ and __getattr__
+        self.workers = workers
+        self.lazy_pending = lazy and not self.cache
 
         #Initially, parse elements to know what nodes are in which physical groups.
         reading_physnames = 0
         reading_nodes = 0
         reading_elements = 0
         reading_periodic = 0
+        periodic_lines = []
 
         self.__inform__("Initializing...")
 
@@ -36,11 +108,63 @@ gmshTranslator
         self.physical_group_dims = {}
         self.physical_group_names = {}
         self.Periodic_nodes = []
-        self.i_periodic = 0
+        self.periodic_links = []
+        self.periodic = PeriodicConstraints([])
         self.maxNodeTag = -1
+        self.sections = {}     #name -> Section (byte offsets and line counts of every $Section)
+        membership = MembershipBuilder()
+        known_groups = set()
+
+        #Array representation of the mesh, filled in by load()
+        self.node_tags = None
+        self.node_coords = None
+        self.element_blocks = None
+        self.topology = None      #filled in by build_topology()
+        self.partitioning = None  #filled in by build_partitions()
+        self.spatial = None       #filled in by spatial_index()
+        self.fingerprints = None  #filled in by changed_groups()
+        self.quality = None       #filled in by mesh_quality()
+
+        #MSH 2 ASCII files are scanned line by line below, other formats (or workers > 1) are read as arrays
+        with open_mesh(mshfilename) as fid:
+            self.mshversion, self.mshbinary, datasize, byteorder = read_mesh_format(fid)
+        self.mshformat = MSH4Format(self.mshbinary, datasize, byteorder)
+        self.__inform__("Format is MSH " + str(self.mshversion) + (" binary" if self.mshbinary else " ASCII"))
+        #MSH 2.x and 4.1 and later 4.x are read; MSH 4.0 lays out $Entities and $Nodes differently
+        if not (2 <= self.mshversion < 3 or 4.1 <= self.mshversion < 5):
+            self.__error__("MSH " + str(self.mshversion) + (" binary" if self.mshbinary else "") + " files are not supported. Aborting.")
+            exit(-1)
+
+        #Files with a valid cache are not read at all. Otherwise, when caching, the arrays are needed
+        #anyway so they are used for the initial pass too.
+        start = clock()
+        filesize = mesh_size(mshfilename)
+        restored = self.cache and self.__restore_cache__()
+        self.scanned_lines = self.__line_by_line__(workers) and not self.cache and not self.lazy_pending
+        if restored:
+            lines = []
+        elif self.lazy_pending:
+            self.__scan_header__()
+            lines = []
+        elif self.scanned_lines:
+            lines = self.mshfid
+        else:
+            self.__scan_arrays__(membership, known_groups, workers)
+            lines = []
 
         linenumber = 1
-        for line in self.mshfid:
+        offset = 0
+        nline = 0
+        for line in lines:
+            #Remember where every section begins and ends, so that it can be reached with seek() later
+            nline += 1
+            if line.startswith(b"$"):
+                self.__record_section__(line, offset, nline)
+            offset += len(line)
+            if nline % PROGRESS_LINES == 0:
+                self.stats.progress("initial pass", offset, filesize)
+            line = line.decode()
+
             #################################################
             # Identify begining of nodes and elements sections
             if line.find("$PhysicalNames") >= 0:
@@ -74,6 +198,9 @@ gmshTranslator
                 continue
             if line.find("$EndPeriodic") >= 0:
                 reading_periodic  = 0
+                self.periodic_links = read_periodic_v2(io.BytesIO(b"".join(periodic_lines) + b"$EndPeriodic\n"))
+                self.__read_periodic__()
+                self.__inform__("Mesh has " + str(self.Nperiodic) + " periodic entities.")
                 continue
 
 
@@ -81,13 +208,13 @@ gmshTranslator
         
             #If this is the first line of nodes, read the number of nodes. 
             if reading_physnames == 1:
-                self.Nphys = sp.int32(line)
+                self.Nphys = np.int32(line)
                 self.__inform__("Mesh has " + str(self.Nphys) + " physical groups.")
                 reading_physnames = 2
                 continue
 
             if reading_nodes == 1:
-                self.Nnodes = sp.int32(line)
+                self.Nnodes = np.int32(line)
                 self.__inform__("Mesh has " + str(self.Nnodes) + " nodes.")
                 reading_nodes = 2
                 self.maxNodeTag = -1
@@ -95,12 +222,12 @@ gmshTranslator
                 continue
 
             if reading_nodes == 2:
-                tag = sp.int32(line.split()[0])
+                tag = np.int32(line.split()[0])
                 self.maxNodeTag = max(self.maxNodeTag, tag)
             
             #If this is the first line of elements, read the number of elements
             if reading_elements == 1:
-                self.Nelem = sp.int32(line)
+                self.Nelem = np.int32(line)
                 self.__inform__("Mesh has " + str(self.Nelem) + " elements.")
                 reading_elements = 2
                 continue
@@ -110,26 +237,26 @@ gmshTranslator
 
             if reading_physnames == 2:
                 sl = line.split()
-                grpdim  = sp.int32(sl[0])  # spatial dimension of the physical group (0 = point, 1 = line, 2 = surface, 3 = volume)
-                physgrp = sp.int32(sl[1])  # group number
+                grpdim  = np.int32(sl[0])  # spatial dimension of the physical group (0 = point, 1 = line, 2 = surface, 3 = volume)
+                physgrp = np.int32(sl[1])  # group number
                 grpname = ( " ".join(sl[2:]) )[1:-1]  # strip quotation marks
                 self.physical_group_dims[physgrp]  = grpdim
                 self.physical_group_names[physgrp] = grpname
 
             #Now parse elements and populate the list of nodes in groups
             if reading_elements == 2:
-                sl = sp.array( line.split(), dtype = sp.int32)
+                sl = np.array( line.split(), dtype = np.int32)
 
-                eletag = sp.int32(sl[0])
-                eletype = sp.int32(sl[1])
-                ntags = sp.int32(sl[2])
-                physgrp = sp.int32(sl[3])
-                entitynum = sp.int32(sl[4])
+                eletag = np.int32(sl[0])
+                eletype = np.int32(sl[1])
+                ntags = np.int32(sl[2])
+                physgrp = np.int32(sl[3])
+                entitynum = np.int32(sl[4])
                 npartitions = 0
                 parts = []
                 if ntags > 2:
-                    npartitions = sp.int32(sl[5])
-                    parts = sp.int32(sl[6:])
+                    npartitions = np.int32(sl[5])
+                    parts = np.int32(sl[6:])
                     # for p in range(npartitions):
                         # parts.append(sl[6+p])
 
@@ -144,11 +271,9 @@ gmshTranslator
                     #         self.node_partitions[n].append(parts)
 
 
-                    if physgrp in self.physical_groups:
-                        self.nodes_in_physical_groups[physgrp][nodelist] = 1
-                    else:
-                        self.nodes_in_physical_groups[physgrp] = -sp.ones(self.maxNodeTag+1, dtype=sp.int16)
-                        self.nodes_in_physical_groups[physgrp][nodelist] = 1
+                    membership.add(nodelist, physgrp)
+                    if not physgrp in known_groups:
+                        known_groups.add(physgrp)
                         self.physical_groups.append(physgrp)
                         pass
                 else:
@@ -156,35 +281,11 @@ gmshTranslator
 
             linenumber += 1
 
+            #periodic links are gathered and parsed in one go at $EndPeriodic
             if reading_periodic == 1:
-                self.Nperiodic = sp.int32(line)
-                self.Nnodes_periodic = sp.zeros(self.Nperiodic, dtype=sp.int32)
-                self.__inform__("Mesh has " + str(self.Nperiodic) + " periodic entities.")
-                reading_periodic = 2
+                periodic_lines.append(line.encode())
                 continue
 
-            if reading_periodic == 2:
-                reading_periodic = 3
-                continue
-
-            if reading_periodic == 3:
-                if line.find("Affine") >= 0:
-                    continue
-                self.Nnodes_periodic[self.i_periodic] = sp.int32(line)
-                self.Periodic_nodes.append(sp.zeros((self.Nnodes_periodic[self.i_periodic],2), dtype=sp.int32))
-                reading_periodic = 4
-                continue
-
-            if reading_periodic >= 4:
-                sl = sp.array( line.split(), dtype = sp.int32)
-                j = reading_periodic - 4
-                self.Periodic_nodes[self.i_periodic][j, 0] = sl[0]
-                self.Periodic_nodes[self.i_periodic][j, 1] = sl[1]
-                reading_periodic += 1
-                if j == self.Nnodes_periodic[self.i_periodic] - 1:
-                    reading_periodic = 2
-                    self.i_periodic += 1
-
 
 
                 
@@ -195,10 +296,24 @@ gmshTranslator
 
 
         #end for line
-        self.__inform__("Processed " + str(linenumber) +" lines.")
-        self.__inform__("There are " + str(len(self.physical_groups)) + " physical groups available: ")
-        for g in self.physical_groups:
-            self.__inform__("%s = %s # (dimension %d)" % (self.physical_group_names[g], str(g), self.physical_group_dims[g]), headline=False)
+        if self.scanned_lines:
+            self.__inform__("Processed " + str(linenumber) +" lines.")
+
+        #node -> physical groups index (CSR), and a dictionary-like view of it
+        if self.lazy_pending:
+            listed_groups = sorted(self.physical_group_names)
+        else:
+            if not restored:
+                with self.stats.phase("membership"):
+                    self.node_groups = membership.finish()
+            self.nodes_in_physical_groups = NodesInPhysicalGroups(self.node_groups, self.maxNodeTag+1)
+            listed_groups = self.physical_groups
+        self.stats.add("initial pass", clock() - start, nline, offset)
+        self.stats.progress("initial pass", offset if filesize is None else filesize, filesize)
+
+        self.__inform__("There are " + str(len(listed_groups)) + " physical groups available: ")
+        for g in listed_groups:
+            self.__inform__("%s = %s # (dimension %d)" % (self.physical_group_names.get(g, "(unnamed)"), str(g), self.physical_group_dims.get(g, -1)), headline=False)
             # self.__inform__("     > %s: \"%s\" (dimension %d)" % (str(g), self.physical_group_names[g], self.physical_group_dims[g]))
 
         # create inverse mapping from names -> IDs so that the user can refer to physical groups by name
@@ -209,6 +324,11 @@ gmshTranslator
 
         self.nodes_rules = []
         self.elements_rules = []
+        self.nodes_batch_rules = []
+        self.elements_batch_rules = []
+
+        if self.cache and not restored:
+            self.__save_cache__()
     #end def __init__
 
         self.mshfid.close()
@@ -217,6 +337,344 @@ gmshTranslator
 ####################################################################################################
 ####################################################################################################
 
+    def __record_section__(self, line, offset, nline):
+        #Called by the line by line scan for every "$..." line, which starts at byte `offset` and is line number `nline` (from 1)
+        name = line.strip()[1:].decode()
+        opened = self.sections.get(name[3:])
+        if name.startswith("End") and opened is not None and opened.end is None:
+            opened.end = offset
+            opened.nlines = nline - opened.line
+        else:
+            self.sections[name] = Section(offset, offset + len(line), line=nline + 1)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def section_index(self):
+        #Dictionary section name -> Section, built from the initial pass or, if not available, by scanning the file
+        if len(self.sections) == 0:
+            with open_mesh(self.mshfilename) as fid:
+                self.sections = index_sections(fid, count=not self.mshbinary)
+        return self.sections
+
+
+    def __seek_section__(self, fid, name):
+        #Position fid at the beginning of the body of section `name`. Returns False if there is no such section.
+        section = self.section_index().get(name)
+        if section is None:
+            return False
+        fid.seek(section.start)
+        return True
+
+
+
+
+####################################################################################################
+####################################################################################################
+    #Attributes that, in lazy mode, are only computed when first used
+    lazy_attributes = ("Nelem", "Nperiodic", "Nnodes_periodic", "Periodic_nodes", "periodic_links", "periodic", "maxNodeTag",
+        "physical_groups", "node_groups", "nodes_in_physical_groups")
+
+    def __scan_header__(self):
+        #Lazy initial pass: read $PhysicalNames and the number of nodes, which come first in the file,
+        #and leave everything else (elements, periodic nodes, physical group membership) for later.
+        for name in self.lazy_attributes:
+            self.__dict__.pop(name, None)
+
+        with open_mesh(self.mshfilename) as fid:
+            for line in iter(fid.readline, b""):
+                if line.startswith(b"$PhysicalNames"):
+                    self.physical_group_dims, self.physical_group_names = read_physical_names(fid)
+                    find_line(fid, b"$EndPhysicalNames")
+                elif line.startswith(b"$Nodes"):
+                    if self.mshversion >= 4 and self.mshbinary:
+                        counts = read_array(fid, self.mshformat.size_t, 4)
+                    else:
+                        counts = fid.readline().split()
+                    self.Nnodes = int(counts[1]) if self.mshversion >= 4 else int(counts[0])
+                    break
+                elif line.startswith(b"$"):
+                    fid.seek(find_marker(fid, b"$End" + line.strip()[1:]))
+                    fid.readline()
+
+        self.Nphys = len(self.physical_group_names)
+        self.__inform__("Mesh has " + str(self.Nphys) + " physical groups.")
+        self.__inform__("Mesh has " + str(self.Nnodes) + " nodes.")
+        self.__inform__("Elements and physical group membership will be read when first needed.")
+
+
+    def __getattr__(self, name):
+        #Only called for attributes not set yet: in lazy mode, complete the initial pass the first time one is needed
+        if name in gmshTranslator.lazy_attributes and self.__dict__.get("lazy_pending"):
+            self.__complete_scan__()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+
+    def __complete_scan__(self):
+        self.lazy_pending = False
+        self.__inform__("Completing the initial pass")
+        self.Nelem = 0
+        self.physical_groups = []
+        #periodic links are read with the arrays: if load() already ran (eg. from parse()) they are kept
+        self.__dict__.setdefault("periodic_links", [])
+        membership = MembershipBuilder()
+        self.__scan_arrays__(membership, set(), self.workers)
+        self.node_groups = membership.finish()
+        self.nodes_in_physical_groups = NodesInPhysicalGroups(self.node_groups, self.maxNodeTag+1)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __is_legacy_ascii__(self):
+        return self.mshversion < 3 and not self.mshbinary
+
+
+    def __line_by_line__(self, workers=1):
+        #MSH 2 ASCII files are read line by line by one process, with the gmsh node ordering. Other
+        #orderings go through the arrays, where whole element blocks are permuted at once.
+        return self.__is_legacy_ascii__() and workers <= 1 and self.ordering == "gmsh"
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __scan_arrays__(self, membership, known_groups, workers=1):
+        #Same information as the line by line scan in __init__, obtained from the array representation
+        if self.element_blocks is None:
+            self.load(workers)
+        self.__read_periodic__()
+
+        self.Nphys = len(self.physical_group_names)
+        self.Nnodes = self.node_tags.size
+        self.Nelem = sum([len(block) for block in self.element_blocks.values()])
+        self.maxNodeTag = int(self.node_tags.max()) if self.Nnodes > 0 else -1
+        self.__inform__("Mesh has " + str(self.Nphys) + " physical groups.")
+        self.__inform__("Mesh has " + str(self.Nnodes) + " nodes.")
+        self.__inform__("Mesh has " + str(self.Nelem) + " elements.")
+
+        #physical groups are listed in order of first appearance in the file, like the line by line scan
+        first_seen = {}
+        with self.stats.phase("membership", items=self.Nelem):
+            for block in self.element_blocks.values():
+                membership.add_block(block.nodes, block.physgrp)
+                groups, first = np.unique(block.physgrp, return_index=True)
+                for grp, i in zip(groups, block.index[first]):
+                    first_seen[grp] = min(i, first_seen.get(grp, i))
+        for grp in sorted(first_seen, key=first_seen.get):
+            known_groups.add(grp)
+            self.physical_groups.append(grp)
+
+        if self.Nperiodic > 0:
+            self.__inform__("Mesh has " + str(self.Nperiodic) + " periodic entities.")
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __read_sections__(self, workers=1):
+        #Walk through the sections of the file reading each one in bulk. Unknown sections are skipped.
+        #ASCII MSH 2 nodes and elements are parsed by `workers` processes if workers > 1.
+        fmt = self.mshformat
+        msh4 = self.mshversion >= 4
+        legacy = self.__is_legacy_ascii__()
+        physicals = {}
+        partitions = {}
+        pool = None
+        filesize = mesh_size(self.mshfilename)
+        if legacy and workers > 1 and filesize is None:
+            self.__inform__("File is " + compression_of(self.mshfilename) + " compressed, reading it with a single process")
+        elif legacy and workers > 1:
+            pool = multiprocessing.Pool(workers)
+
+        with open_mesh(self.mshfilename) as fid:
+            for line in iter(fid.readline, b""):
+                if line.startswith(b"$"):
+                    name = line.strip()[1:]
+                    start = fid.tell()
+                    started = clock()
+
+                if line.startswith(b"$PhysicalNames"):
+                    self.physical_group_dims, self.physical_group_names = read_physical_names(fid)
+                    find_line(fid, b"$EndPhysicalNames")
+                elif line.startswith(b"$Entities"):
+                    physicals.update(read_entities(fid, fmt))
+                elif line.startswith(b"$PartitionedEntities"):
+                    partitions, partitioned_physicals = read_partitioned_entities(fid, fmt)
+                    physicals.update(partitioned_physicals)
+                elif line.startswith(b"$Nodes") and msh4:
+                    self.node_tags, self.node_coords = read_nodes(fid, fmt)
+                elif line.startswith(b"$Nodes") and legacy:
+                    nnodes = int(fid.readline())
+                    if pool is None:
+                        self.node_tags, self.node_coords = parse_ascii_nodes(read_section_body(fid, b"Nodes"), nnodes)
+                    else:
+                        end = find_marker(fid, b"$EndNodes")
+                        self.node_tags, self.node_coords = parallel_parse_nodes(pool, self.mshfilename, fid, end, nnodes, 4*workers)
+                        fid.seek(end)
+                        fid.readline()
+                elif line.startswith(b"$Nodes"):
+                    nnodes = int(fid.readline())
+                    self.node_tags, self.node_coords, end = map_binary_nodes(fid, self.mshfilename, fid.tell(), nnodes, fmt.int.byteorder)
+                    fid.seek(end)
+                    find_line(fid, b"$EndNodes")
+                elif line.startswith(b"$Elements") and msh4:
+                    self.element_blocks = read_elements(fid, fmt, physicals, partitions)
+                elif line.startswith(b"$Elements") and legacy:
+                    nelem = int(fid.readline())
+                    if pool is None:
+                        self.element_blocks = parse_ascii_elements(read_section_body(fid, b"Elements"), nelem)
+                    else:
+                        end = find_marker(fid, b"$EndElements")
+                        self.element_blocks = parallel_parse_elements(pool, self.mshfilename, fid, end, nelem, 4*workers)
+                        fid.seek(end)
+                        fid.readline()
+                elif line.startswith(b"$Elements"):
+                    nelem = int(fid.readline())
+                    self.element_blocks = map_binary_elements(fid, self.mshfilename, nelem, fmt.int.byteorder)
+                    find_line(fid, b"$EndElements")
+                elif line.startswith(b"$Periodic"):
+                    self.periodic_links = read_periodic(fid, fmt) if msh4 else read_periodic_v2(fid)
+                elif line.startswith(b"$"):
+                    end = find_marker(fid, b"$End" + name)
+                    fid.seek(end)
+                    fid.readline()
+
+                if line.startswith(b"$"):
+                    after = fid.tell()
+                    self.sections[name.decode()] = Section(start - len(line), start, end_marker_offset(fid, name))
+                    fid.seek(after)
+                    self.stats.add("read " + name.decode(), clock() - started, nbytes=self.sections[name.decode()].end - start)
+                    self.stats.progress("load", after, filesize)
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+        if self.node_tags is None:
+            self.__error__("No $Nodes section found. Aborting.")
+            exit(-1)
+        if self.element_blocks is None:
+            self.__error__("No $Elements section found. Aborting.")
+            exit(-1)
+        self.element_blocks = reorder_blocks(self.element_blocks, self.ordering)
+
+
+
+
+    def __read_periodic__(self):
+        links = self.periodic_links
+        self.Nperiodic = len(links)
+        self.Nnodes_periodic = np.array([len(link[4]) for link in links], dtype=np.int32)
+        self.Periodic_nodes = [link[4] for link in links]
+        self.periodic = PeriodicConstraints(links)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __cache_path__(self):
+        return cache_path(self.mshfilename, self.cache_dir)
+
+
+    def __save_cache__(self):
+        header = {
+            "Nphys" : int(self.Nphys),
+            "Nnodes" : int(self.Nnodes),
+            "Nelem" : int(self.Nelem),
+            "maxNodeTag" : int(self.maxNodeTag),
+            "physical_groups" : [int(g) for g in self.physical_groups],
+            "physical_group_names" : [[int(g), name] for g, name in self.physical_group_names.items()],
+            "physical_group_dims" : [[int(g), int(dim)] for g, dim in self.physical_group_dims.items()],
+            "ordering" : self.ordering,
+            "sections" : [[name, sec.header, sec.start, sec.end, sec.line, sec.nlines] for name, sec in self.sections.items()],
+        }
+        path = self.__cache_path__()
+        save_cache(path, cache_key(self.mshfilename, self.cache), header, self.node_tags, self.node_coords,
+            self.element_blocks, self.node_groups, self.periodic_links)
+        self.__inform__("Saved cache " + path)
+
+
+    def __restore_cache__(self):
+        path = self.__cache_path__()
+        data = load_cache(path, cache_key(self.mshfilename, self.cache))
+        if data is None:
+            self.__inform__("No valid cache found, parsing " + self.mshfilename)
+            return False
+
+        header = data["header"]
+        if header.get("ordering") != self.ordering:
+            self.__inform__("Cache has node ordering " + str(header.get("ordering")) + ", parsing " + self.mshfilename)
+            return False
+        self.Nphys = header["Nphys"]
+        self.Nnodes = header["Nnodes"]
+        self.Nelem = header["Nelem"]
+        self.maxNodeTag = header["maxNodeTag"]
+        self.physical_groups = [np.int32(g) for g in header["physical_groups"]]
+        self.physical_group_names = dict((np.int32(g), name) for g, name in header["physical_group_names"])
+        self.physical_group_dims = dict((np.int32(g), np.int32(dim)) for g, dim in header["physical_group_dims"])
+        self.sections = dict((sec[0], Section(*sec[1:])) for sec in header["sections"])
+        self.node_tags = data["node_tags"]
+        self.node_coords = data["node_coords"]
+        self.element_blocks = data["element_blocks"]
+        self.node_groups = PhysicalGroupMembership(*data["membership"])
+        self.periodic_links = data["periodic_links"]
+        self.__read_periodic__()
+        self.__inform__("Restored mesh from cache " + path)
+        return True
+
+
+    def invalidate_cache(self):
+        #Remove the cache file of this mesh, next opening will parse the .msh again
+        remove_cache(self.__cache_path__())
+
+
+
+
+####################################################################################################
+####################################################################################################
+    #Incremental runs (see fingerprints.py): changed_groups() tells which physical groups changed since the last
+    #save_fingerprints(), so that only those go through parse(groups=...) and write_groups(..., changed=...).
+    def group_fingerprints(self):
+        tags, coords, blocks = self.__arrays_in__("gmsh")
+        return group_fingerprints(tags, coords, blocks, self.node_groups, self.physical_group_names)
+
+
+    def changed_groups(self, path=None):
+        #Physical groups whose elements or node coordinates changed since the fingerprints saved in path (by default
+        #next to the .msh file, or in cache_dir) were computed. All groups if there are no saved fingerprints.
+        self.fingerprints = self.group_fingerprints()
+        previous = load_fingerprints(path or fingerprint_path(self.mshfilename, self.cache_dir))
+        changed = changed_groups(previous, self.fingerprints)
+        if previous is None:
+            self.__inform__("No previous fingerprints, all " + str(len(changed)) + " physical groups are new.")
+        else:
+            removed = [grp for grp in previous if grp not in self.fingerprints]
+            self.__inform__(str(len(changed)) + " of " + str(len(self.fingerprints)) + " physical groups changed" +
+                (", " + str(len(removed)) + " removed." if len(removed) > 0 else "."))
+        return changed
+
+
+    def save_fingerprints(self, path=None):
+        #Save the fingerprints of this mesh for the next changed_groups(), once the run has completed
+        if self.fingerprints is None:
+            self.fingerprints = self.group_fingerprints()
+        path = path or fingerprint_path(self.mshfilename, self.cache_dir)
+        save_fingerprints(path, self.fingerprints)
+        self.__inform__("Saved fingerprints " + path)
+
+
+
+
+####################################################################################################
+####################################################################################################
     def __del__(self):
         self.mshfid.close()
         self.__inform__("Ending")
@@ -240,11 +698,29 @@ gmshTranslator
         pass
 
 
+####################################################################################################
+####################################################################################################
+    def add_elements_batch_rule(self, condition, action):
+        self.elements_batch_rules.append((condition, action))
+        pass
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def add_nodes_batch_rule(self, condition, action):
+        self.nodes_batch_rules.append((condition, action))
+        pass
+
+
 ####################################################################################################
 ####################################################################################################
     def clear_rules(self):
         self.nodes_rules = []
         self.elements_rules = []
+        self.nodes_batch_rules = []
+        self.elements_batch_rules = []
         pass
 
 
@@ -254,19 +730,39 @@ gmshTranslator
 
 ####################################################################################################
 ####################################################################################################
-    def parse(self):
-        self.mshfid = open(self.mshfilename, 'r')
+    def parse(self, workers=1, groups=None, pipeline=False, chunk_size=100000, queue_size=4):
+        #With workers > 1 the file is first loaded as arrays by that many processes, and the
+        #rules are then fed from the arrays in file order. The arrays are used too whenever they are
+        #already in memory (eg. restored from the cache), instead of reading the file again.
+        #With groups (physical group names or numbers, eg. from changed_groups()) only the nodes and
+        #elements of those groups go through the rules.
+        #With pipeline = True the file is streamed through threads reading and parsing chunks of chunk_size
+        #nodes or elements (see pipeline.py) while the rules are applied, without loading the whole mesh.
+        groups = self.__group_list__(groups)
+        if pipeline:
+            self.__parse_pipelined__(groups, chunk_size, queue_size)
+        elif not self.__line_by_line__(workers) or self.element_blocks is not None:
+            if self.element_blocks is None:
+                self.load(workers)
+            self.__parse_arrays__(groups)
+        else:
+            self.__parse_lines__(groups)
+        self.__join_async_actions__()
+
 
+    def __parse_lines__(self, groups=None):
+        #parse() for MSH 2 ASCII files, line by line
+        only = None if groups is None else set(groups)
+        self.mshfid = open_mesh(self.mshfilename)
 
-        #Advance to nodes
-        line = self.mshfid.readline()
-        while(line.find("$Nodes") < 0):
-            line = self.mshfid.readline()
-            pass
+        #Go straight to the nodes
+        if not self.__seek_section__(self.mshfid, "Nodes"):
+            self.__error__("No $Nodes section found. Aborting.")
+            exit(-1)
         line = self.mshfid.readline()  #This line should contain number of nodes
 
         #Check that number of nodes in file is still the number of nodes in memory
-        if(not sp.int32(line) == self.Nnodes):
+        if(not np.int32(line) == self.Nnodes):
             self.__error__("Something wrong. Aborting.")
             exit(-1)
 
@@ -274,34 +770,38 @@ gmshTranslator
 
         if len(self.nodes_rules) == 0:
             self.__inform__("No rules for nodes... skipping nodes.")
-            for i in range(self.Nnodes):
-                self.mshfid.readline()
         else:
             #Read all nodes and do stuff
+            rules = self.stats.timed_rules(self.nodes_rules, "node")
+            start = clock()
             for i in range(self.Nnodes):
+                if i % PROGRESS_ITEMS == 0:
+                    self.stats.progress("node rules", i, self.Nnodes)
 
                 #Parse the line
-                sl = self.mshfid.readline().split()
-                tag = sp.int32(sl[0])
-                x = sp.double(sl[1])
-                y = sp.double(sl[2])
-                z = sp.double(sl[3])
+                sl = self.mshfid.readline().decode().split()
+                tag = np.int32(sl[0])
+                x = np.double(sl[1])
+                y = np.double(sl[2])
+                z = np.double(sl[3])
 
                 #Figure out the groups to which this node belongs
-                physgroups = []
-                for grp in self.physical_groups:
-                    if self.nodes_in_physical_groups[grp][tag] == 1:
-                        physgroups.append(grp)
+                physgroups = self.node_groups.groups_of(tag)
+                if only is not None and only.isdisjoint(physgroups):
+                    continue
 
-                for condition, action in self.nodes_rules:
+                for condition, action in rules:
                     if condition(tag,x,y,z,physgroups):
                         action(tag,x,y,z)
                     pass
+            self.stats.add("node rules", clock() - start, self.Nnodes)
+            self.stats.progress("node rules", self.Nnodes, self.Nnodes)
 
-        #Read another 2 lines after nodes are done. This should be $Elements
-        line = self.mshfid.readline()
-        line = self.mshfid.readline()
-        if(line.find("$Elements") == 0):
+        if len(self.nodes_batch_rules) > 0:
+            self.__apply_nodes_batch_rules__(groups)
+
+        #Go straight to the elements
+        if self.__seek_section__(self.mshfid, "Elements"):
             self.__inform__("Parsing elements")
         else:
             self.__error__("Something wrong reading elements. ")
@@ -310,60 +810,732 @@ gmshTranslator
         line = self.mshfid.readline()  #This line should contain number of elements
 
         #Check that number of elements in file is still the number of elements in memory
-        if(not sp.int32(line) == self.Nelem):
+        if(not np.int32(line) == self.Nelem):
             self.__error__("Something wrong. Aborting.")
             exit(-1)
 
 
         if len(self.elements_rules) == 0:
             self.__inform__("No rules for elements... skipping elements.")
-            for i in range(self.Nelem):
-                self.mshfid.readline()
         else:
-            #Read all elements and do stuff
+            #Read all elements and do stuff. Elements of (eletype, physgrp) pairs that no rule can match are not parsed further.
+            rules = self.stats.timed_rules(self.elements_rules, "element")
+            dispatcher = RuleDispatcher(self.elements_rules, groups)
+            start = clock()
             nodes = []
             for i in range(self.Nelem):
+                if i % PROGRESS_ITEMS == 0:
+                    self.stats.progress("element rules", i, self.Nelem)
 
-                sl = self.mshfid.readline().split()
+                sl = self.mshfid.readline().decode().split()
 
                 #Parse the line
-                eletag = sp.int32(sl[0])
-                eletype = sp.int32(sl[1])
-                ntags = sp.int32(sl[2])
-                physgrp = sp.int32(sl[3])
-                entitynum = sp.int32(sl[4])
+                eletag = np.int32(sl[0])
+                eletype = np.int32(sl[1])
+                ntags = np.int32(sl[2])
+                physgrp = np.int32(sl[3])
+                entitynum = np.int32(sl[4])
                 npartitions = 0
                 parts = []
                 if ntags > 2:
-                    npartitions = sp.int32(sl[5])
+                    npartitions = np.int32(sl[5])
                     for p in range(npartitions):
                         parts.append(sl[6+p])
 
                 if ntags >= 2:
-                    physgrp = sp.int32(sl[3])
-                    nodes = sp.array(sl[(3 + ntags)::], dtype=sp.int32)
+                    physgrp = np.int32(sl[3])
+                    dispatched = dispatcher.rules_for(eletype, physgrp)
+                    if len(dispatched) == 0:
+                        continue
+                    nodes = np.array(sl[(3 + ntags)::], dtype=np.int32)
             
                     if npartitions == 0:
-                        for condition, action in self.elements_rules:
-                            if condition(eletag,eletype,physgrp,nodes):
+                        for number, check in dispatched:
+                            condition, action = rules[number]
+                            if not check or condition(eletag,eletype,physgrp,nodes):
                                 action(eletag,eletype,physgrp,nodes)
                             pass
                     elif npartitions > 0:
-                        for condition, action in self.elements_rules:
-                            if condition(eletag,eletype,physgrp,nodes,npartitions,parts):
+                        for number, check in dispatched:
+                            condition, action = rules[number]
+                            if not check or condition(eletag,eletype,physgrp,nodes,npartitions,parts):
                                 action(eletag,eletype,physgrp,nodes,npartitions,parts)
                             pass  
                 else:
                     self.__error__(".msh file has < 2 tags element with tag " + str(eletag))
+            self.stats.add("element rules", clock() - start, self.Nelem)
+            self.stats.progress("element rules", self.Nelem, self.Nelem)
+
+        if len(self.elements_batch_rules) > 0:
+            self.__apply_elements_batch_rules__(groups)
+        pass
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __parse_arrays__(self, groups=None):
+        #parse() for formats read as arrays: rules are fed from the arrays, in file order
+        tags, coords, blocks = self.to_arrays()
+        only = None if groups is None else set(groups)
+
+        self.__inform__("Parsing nodes")
+        if len(self.nodes_rules) == 0:
+            self.__inform__("No rules for nodes... skipping nodes.")
+        else:
+            rules = self.stats.timed_rules(self.nodes_rules, "node")
+            start = clock()
+            self.__apply_node_rules__(rules, tags, coords, only)
+            self.stats.add("node rules", clock() - start, tags.size)
+            self.stats.progress("node rules", tags.size, tags.size)
+
+        if len(self.nodes_batch_rules) > 0:
+            self.__apply_nodes_batch_rules__(groups)
+
+        self.__inform__("Parsing elements")
+        if len(self.elements_rules) == 0:
+            self.__inform__("No rules for elements... skipping elements.")
+        else:
+            rules = self.stats.timed_rules(self.elements_rules, "element")
+            dispatcher = RuleDispatcher(self.elements_rules, groups)
+            start = clock()
+            selected = self.__selected_elements__(dispatcher, blocks)
+            nelem = self.__apply_element_rules__(rules, dispatcher, blocks, 0, self.__count_selected__(selected), selected)
+            self.stats.add("element rules", clock() - start, nelem)
+            self.stats.progress("element rules", nelem, nelem)
+
+        if len(self.elements_batch_rules) > 0:
+            self.__apply_elements_batch_rules__(groups)
         pass
 
+
+    def __apply_node_rules__(self, rules, tags, coords, only=None, done=0, total=None):
+        #Normal rules for the nodes (tags, coords), done of total nodes being already processed
+        total = tags.size if total is None else total
+        for i in range(tags.size):
+            if (done + i) % PROGRESS_ITEMS == 0:
+                self.stats.progress("node rules", done + i, total)
+            tag = tags[i]
+            x, y, z = coords[i]
+            physgroups = self.node_groups.groups_of(tag)
+            if only is not None and only.isdisjoint(physgroups):
+                continue
+            for condition, action in rules:
+                if condition(tag,x,y,z,physgroups):
+                    action(tag,x,y,z)
+                pass
+
+
+    def __apply_element_rules__(self, rules, dispatcher, blocks, done=0, total=None, selected=None):
+        #Normal rules for the elements of blocks, in file order. Only the elements of (eletype, physgrp) pairs
+        #that some rule can match are visited; returns their number. done of total elements (None if not known)
+        #are already processed.
+        if selected is None:
+            selected = self.__selected_elements__(dispatcher, blocks)
+        nelem = self.__count_selected__(selected)
+        for k, (eletype, i) in enumerate(self.__elements_in_file_order__(blocks, selected)):
+            if (done + k) % PROGRESS_ITEMS == 0:
+                self.stats.progress("element rules", done + k, total)
+            block = blocks[eletype]
+            eletag = block.tags[i]
+            physgrp = block.physgrp[i]
+            nodes = block.nodes[i]
+            npartitions, parts = block.partitions_of(i)
+            if npartitions == 0:
+                for number, check in dispatcher.rules_for(eletype, physgrp):
+                    condition, action = rules[number]
+                    if not check or condition(eletag,eletype,physgrp,nodes):
+                        action(eletag,eletype,physgrp,nodes)
+                    pass
+            else:
+                #partitioned elements get the partitions too, as in __parse_lines__
+                for number, check in dispatcher.rules_for(eletype, physgrp):
+                    condition, action = rules[number]
+                    if not check or condition(eletag,eletype,physgrp,nodes,npartitions,parts):
+                        action(eletag,eletype,physgrp,nodes,npartitions,parts)
+                    pass
+        return nelem
+
+
+    def __selected_elements__(self, dispatcher, blocks):
+        #{eletype : mask of the rows some rule can match}
+        return dict((eletype, dispatcher.selected_rows(block)) for eletype, block in blocks.items())
+
+
+    def __count_selected__(self, selected):
+        return sum([int(rows.sum()) for rows in selected.values()])
+
+
+    def __elements_in_file_order__(self, blocks, selected=None):
+        #Yields (eletype, row within blocks[eletype]) in the order elements appear in the file, only
+        #for the rows where selected[eletype] (a boolean mask) is True if given
+        types = sorted(blocks)
+        if len(types) == 0:
+            return
+        if selected is None:
+            rows = [np.arange(len(blocks[t])) for t in types]
+        else:
+            rows = [np.flatnonzero(selected[t]) for t in types]
+        index = np.concatenate([blocks[t].index[r] for t, r in zip(types, rows)])
+        which = np.repeat(np.arange(len(types)), [r.size for r in rows])
+        row = np.concatenate(rows)
+        for k in np.argsort(index, kind="mergesort"):
+            yield types[which[k]], row[k]
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __apply_nodes_batch_rules__(self, groups=None, tags=None, coords=None):
+        #Batch rules see all the nodes at once (those of `groups` only, if given), or the chunk (tags, coords):
+        #   condition(tags,x,y,z,physgroups) -> boolean mask (physgroups[grp] is a mask too)
+        #   action(tags,x,y,z) is called once with the selected nodes
+        if tags is None:
+            self.__inform__("Applying batch rules to nodes")
+            tags, coords, blocks = self.to_arrays()
+        if groups is not None:
+            keep = np.zeros(tags.shape, dtype=bool)
+            for grp in groups:
+                keep |= self.node_groups.contains(grp, tags)
+            tags, coords = tags[keep], coords[keep]
+        x, y, z = coords[:,0], coords[:,1], coords[:,2]
+        physgroups = NodeGroupMasks(self, tags)
+
+        with self.stats.phase("node batch rules", items=tags.size):
+            for condition, action in self.stats.timed_rules(self.nodes_batch_rules, "node batch", batch=True):
+                mask = self.__batch_mask__(condition(tags,x,y,z,physgroups), tags.shape)
+                if mask.any():
+                    action(tags[mask], x[mask], y[mask], z[mask])
+        pass
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __apply_elements_batch_rules__(self, groups=None, blocks=None):
+        #Batch rules see all the elements of one type at once (those of `groups` only, if given), or those in blocks:
+        #   condition(eletags,eletype,physgrp,nodes) -> boolean mask
+        #   action(eletags,eletype,physgrp,nodes) is called with the selected elements
+        if blocks is None:
+            self.__inform__("Applying batch rules to elements")
+            tags, coords, blocks = self.to_arrays()
+        if groups is not None:
+            blocks = dict((eletype, block.take(np.flatnonzero(np.isin(block.physgrp, groups)))) for eletype, block in blocks.items())
+
+        rules = self.stats.timed_rules(self.elements_batch_rules, "element batch", batch=True)
+        with self.stats.phase("element batch rules", items=sum([len(block) for block in blocks.values()])):
+            for eletype in sorted(blocks):
+                block = blocks[eletype]
+                if len(block) == 0:
+                    continue
+                for condition, action in rules:
+                    mask = self.__batch_mask__(condition(block.tags,eletype,block.physgrp,block.nodes), block.tags.shape)
+                    if mask.any():
+                        action(block.tags[mask], eletype, block.physgrp[mask], block.nodes[mask])
+        pass
+
+
+    def __batch_mask__(self, mask, shape):
+        #Conditions may also return a single True/False for the whole batch
+        mask = np.asarray(mask, dtype=bool)
+        if mask.ndim == 0:
+            mask = np.full(shape, bool(mask))
+        return mask
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def load(self, workers=1):
+        #Read the $Nodes and $Elements sections in one pass and keep them as arrays:
+        #   node_tags      : (Nnodes) integer node tags
+        #   node_coords    : (Nnodes x 3) float64 coordinates
+        #   element_blocks : dictionary eletype -> ElementBlock (tags, physgrp, entity, nodes)
+        #With workers > 1, ASCII MSH 2 sections are split in pieces parsed by that many processes.
+        self.__inform__("Loading nodes and elements as arrays")
+        self.__read_sections__(workers)
+        self.__inform__("Loaded " + str(self.node_tags.size) + " nodes and " +
+            str(sum([len(block) for block in self.element_blocks.values()])) + " elements.")
+        return self
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def to_arrays(self):
+        if self.element_blocks is None:
+            self.load()
+        return self.node_tags, self.node_coords, self.element_blocks
+
+####################################################################################################
+####################################################################################################
+    def iter_nodes(self, chunk_size=100000):
+        #Generator over the nodes, yielding (tags, coords) arrays with at most chunk_size nodes each.
+        #Only one chunk is held in memory at a time.
+        with open_mesh(self.mshfilename) as fid:
+            for tags, coords in self.__node_chunks__(fid, chunk_size):
+                yield tags, coords
+
+
+    def __node_chunks__(self, fid, chunk_size, raw=False):
+        #Iterator over the chunks of the $Nodes section: (tags, coords) arrays or, for MSH 2 ASCII files and
+        #raw = True, unparsed lines (see iter_ascii_line_chunks)
+        if not self.__seek_section__(fid, "Nodes"):
+            self.__error__("No $Nodes section found. Aborting.")
+            exit(-1)
+
+        if self.mshversion >= 4:
+            return iter_node_chunks(fid, self.mshfilename, self.mshformat, chunk_size)
+        nnodes = int(fid.readline())
+        if self.mshbinary:
+            return iter_binary_node_chunks(fid, self.mshfilename, fid.tell(), nnodes, chunk_size, self.mshformat.int.byteorder)
+        if raw:
+            return iter_ascii_line_chunks(fid, nnodes, chunk_size)
+        return iter_ascii_node_chunks(fid, nnodes, chunk_size)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def iter_elements(self, chunk_size=100000, types=None):
+        #Generator over the elements, yielding ElementBlocks (all elements of one type) with at most
+        #chunk_size elements each. If `types` is given, only elements of those types are returned.
+        with open_mesh(self.mshfilename) as fid:
+            for block in self.__element_chunks__(fid, chunk_size, types):
+                yield reorder_block(block, self.ordering)
+
+
+    def __element_chunks__(self, fid, chunk_size, types=None, raw=False):
+        #Iterator over the chunks of the $Elements section, in gmsh node ordering: ElementBlocks or, for MSH 2
+        #ASCII files and raw = True, unparsed lines (see iter_ascii_line_chunks)
+        physicals = {}
+        partitions = {}
+        if self.mshversion >= 4 and self.__seek_section__(fid, "Entities"):
+            physicals = read_entities(fid, self.mshformat)
+        if self.mshversion >= 4 and self.__seek_section__(fid, "PartitionedEntities"):
+            partitions, partitioned_physicals = read_partitioned_entities(fid, self.mshformat)
+            physicals.update(partitioned_physicals)
+
+        if not self.__seek_section__(fid, "Elements"):
+            self.__error__("No $Elements section found. Aborting.")
+            exit(-1)
+
+        if self.mshversion >= 4:
+            return iter_element_chunks(fid, self.mshfilename, self.mshformat, physicals, chunk_size, types, partitions)
+        nelem = int(fid.readline())
+        if self.mshbinary:
+            return iter_binary_element_chunks(fid, self.mshfilename, nelem, chunk_size, self.mshformat.int.byteorder, types)
+        if raw:
+            return iter_ascii_line_chunks(fid, nelem, chunk_size)
+        return iter_ascii_element_chunks(fid, nelem, chunk_size, types)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def __parse_pipelined__(self, groups, chunk_size, queue_size):
+        #parse() streaming the file through a pipeline (see pipeline.py): a thread reads chunks of the file, another
+        #one parses them into arrays, and the rules are applied here as chunks come out. Rules see the nodes and
+        #elements in file order as in parse(); batch rules are called once per chunk.
+        only = None if groups is None else set(groups)
+        raw = self.__is_legacy_ascii__()
+        with open_mesh(self.mshfilename) as fid:
+            self.__inform__("Parsing nodes (pipelined)")
+            if len(self.nodes_rules) + len(self.nodes_batch_rules) == 0:
+                self.__inform__("No rules for nodes... skipping nodes.")
+            else:
+                rules = self.stats.timed_rules(self.nodes_rules, "node")
+                pipeline = Pipeline(self.__node_chunks__(fid, chunk_size, raw), [self.__parse_node_chunk__], queue_size)
+                done = 0
+                seconds = 0.0
+                for tags, coords in pipeline:
+                    start = clock()
+                    self.__apply_node_rules__(rules, tags, coords, only, done, self.Nnodes)
+                    seconds += clock() - start
+                    if len(self.nodes_batch_rules) > 0:
+                        self.__apply_nodes_batch_rules__(groups, tags, coords)
+                    done += tags.size
+                if len(self.nodes_rules) > 0:
+                    self.stats.add("node rules", seconds, done)
+                    self.stats.progress("node rules", done, done)
+                self.__record_pipeline__("Nodes", pipeline, done)
+
+            self.__inform__("Parsing elements (pipelined)")
+            if len(self.elements_rules) + len(self.elements_batch_rules) == 0:
+                self.__inform__("No rules for elements... skipping elements.")
+            else:
+                rules = self.stats.timed_rules(self.elements_rules, "element")
+                dispatcher = RuleDispatcher(self.elements_rules, groups)
+                #the number of elements is not known yet on a lazy translator: asking for it would run the whole scan
+                total = None if self.__dict__.get("lazy_pending") else self.Nelem
+                pipeline = Pipeline(self.__element_chunks__(fid, chunk_size, raw=raw), [self.__parse_element_chunk__], queue_size)
+                done = 0
+                parsed = 0
+                seconds = 0.0
+                for blocks in pipeline:
+                    parsed += sum([len(block) for block in blocks.values()])
+                    start = clock()
+                    done += self.__apply_element_rules__(rules, dispatcher, blocks, done, total)
+                    seconds += clock() - start
+                    if len(self.elements_batch_rules) > 0:
+                        self.__apply_elements_batch_rules__(groups, blocks)
+                if len(self.elements_rules) > 0:
+                    self.stats.add("element rules", seconds, done)
+                    self.stats.progress("element rules", done, done)
+                self.__record_pipeline__("Elements", pipeline, parsed)
+
+
+    def __parse_node_chunk__(self, chunk):
+        #Parse stage for nodes: raw lines are parsed, memory mapped arrays copied (which reads them from the file)
+        if len(chunk) == 3:
+            done, n, data = chunk
+            return parse_ascii_nodes(data, n)
+        tags, coords = chunk
+        return np.array(tags), np.array(coords)
+
+
+    def __parse_element_chunk__(self, chunk):
+        #Parse stage for elements: {eletype : ElementBlock} in the node ordering of this translator
+        if isinstance(chunk, tuple):
+            done, n, data = chunk
+            blocks = parse_ascii_elements(data, n, first_index=done)
+        else:
+            blocks = {chunk.eletype : chunk.take(np.arange(len(chunk)))}
+        return reorder_blocks(blocks, self.ordering)
+
+
+    def __record_pipeline__(self, name, pipeline, items):
+        #Time spent by the threads of a pipeline, and waiting for them
+        self.stats.add("pipeline read " + name, pipeline.seconds[0], items)
+        self.stats.add("pipeline parse " + name, pipeline.seconds[1], items)
+        self.stats.add("pipeline wait " + name, pipeline.wait_seconds)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def async_action(self, action, queue_size=4, loop=None):
+        #Wrap a rule action (normal or batch) so that it runs in a background thread, queue_size calls at most
+        #being pending (see pipeline.py). Coroutine functions are awaited, in `loop` if given. parse() waits for
+        #the pending calls before returning.
+        return AsyncAction(action, queue_size, loop)
+
+
+    def __join_async_actions__(self):
+        for rules in (self.nodes_rules, self.nodes_batch_rules, self.elements_rules, self.elements_batch_rules):
+            for condition, action in rules:
+                if isinstance(action, AsyncAction):
+                    action.join()
+
+
+
+
+####################################################################################################
+####################################################################################################
+    #Bulk writers (see writers.py). `groups` maps physical group (name or number) to what each format
+    #needs to know about the elements of that group; only those groups are written.
+    def write_opensees(self, filename, groups, language="tcl", ndm=3, ndf=3, all_nodes=False):
+        tags, coords, blocks = self.__arrays_in__("opensees")
+        write_opensees(filename, tags, coords, blocks, self.__group_numbers__(groups), language, ndm, ndf, all_nodes)
+        self.__inform__("Wrote " + filename)
+
+
+    def write_essi(self, filename, groups, unit="m", dofs=3, all_nodes=False):
+        tags, coords, blocks = self.__arrays_in__("essi")
+        write_essi(filename, tags, coords, blocks, self.__group_numbers__(groups), unit, dofs, all_nodes)
+        self.__inform__("Wrote " + filename)
+
+
+    def write_abaqus(self, filename, groups, all_nodes=False):
+        tags, coords, blocks = self.__arrays_in__("abaqus")
+        groups = self.__group_numbers__(groups)
+        names = dict((grp, self.physical_group_names.get(grp, "GROUP" + str(grp))) for grp in groups)
+        write_abaqus(filename, tags, coords, blocks, groups, names, all_nodes)
+        self.__inform__("Wrote " + filename)
+
+
+    def write_vtk(self, filename, groups=None):
+        tags, coords, blocks = self.__arrays_in__("vtk")
+        if groups is not None:
+            groups = list(self.__group_numbers__(dict((grp, None) for grp in groups)))
+        write_vtk(filename, tags, coords, blocks, groups)
+        self.__inform__("Wrote " + filename)
+
+
+    def __arrays_in__(self, ordering):
+        #to_arrays() with the connectivity in the node ordering of the output format
+        tags, coords, blocks = self.to_arrays()
+        return tags, coords, reorder_blocks(blocks, ordering, self.ordering)
+
+
+    def __group_numbers__(self, groups):
+        #Replace physical group names by numbers in the keys of `groups`
+        numbers = {}
+        for grp, value in groups.items():
+            if grp in self.physical_groups_by_name:
+                grp = self.physical_groups_by_name[grp]
+            numbers[grp] = value
+        return numbers
+
+
+    def __group_list__(self, groups):
+        #List of physical group numbers from a group or list of groups given by name or number (None stays None)
+        if groups is None:
+            return None
+        if not isinstance(groups, (list, tuple, set)):
+            groups = [groups]
+        for grp in groups:
+            if isinstance(grp, str) and grp not in self.physical_groups_by_name:
+                self.__error__("Unknown physical group \"" + grp + "\". Aborting.")
+                exit(-1)
+        return [self.physical_groups_by_name[grp] if isinstance(grp, str) else grp for grp in groups]
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def renumber(self, method="compact", start=1):
+        #Consecutive numbering of nodes and elements starting at `start`. Nodes are numbered by tag
+        #(method = "compact") or in reverse Cuthill-McKee order (method = "rcm", needs scipy), elements by tag.
+        #Returns (node numbers, coordinates, element_blocks) in the new numbering. gt.node_numbering and
+        #gt.element_numbering convert between original tags and new numbers (.new(tags) and .old(numbers)).
+        tags, coords, blocks = self.to_arrays()
+        if method == "compact":
+            self.node_numbering = compact_renumbering(tags, start)
+        elif method == "rcm":
+            self.node_numbering = rcm_renumbering(tags, blocks, start)
+        else:
+            self.__error__("Unknown renumbering method \"" + str(method) + "\". Use \"compact\" or \"rcm\".")
+            exit(-1)
+        self.element_numbering = compact_renumbering(np.concatenate([np.zeros(0, dtype=np.int64)] +
+            [block.tags for block in blocks.values()]), start)
+        self.__inform__("Renumbered " + str(len(self.node_numbering)) + " nodes (bandwidth " +
+            str(bandwidth(blocks, self.node_numbering)) + ") and " + str(len(self.element_numbering)) + " elements.")
+
+        newcoords = np.empty_like(coords)
+        newcoords[self.node_numbering.new(tags) - start] = coords
+        numbers = np.arange(start, start + len(self.node_numbering))
+        return numbers, newcoords, renumber_blocks(blocks, self.node_numbering, self.element_numbering)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def build_topology(self, types=None):
+        #Node -> element and element -> element adjacency (see topology.py), kept in gt.topology.
+        #`types` restricts it to some element types.
+        tags, coords, blocks = self.to_arrays()
+        self.topology = Topology(tags, blocks, types)
+        self.topology.element_adjacency()
+        self.__inform__("Built topology of " + str(self.topology.element_tags.size) + " elements.")
+        return self.topology
+
+
+    def boundary_faces(self, this_physgrp=None, dim=None):
+        #Facets (faces, or edges for surfaces) on the boundary of the elements of a physical group (name or
+        #number; all elements if None), as a Facets object with element_tags, local_facet and nodes arrays.
+        if self.topology is None:
+            self.build_topology()
+        if this_physgrp in self.physical_groups_by_name:
+            this_physgrp = self.physical_groups_by_name[this_physgrp]
+        return self.topology.boundary_facets(this_physgrp, dim)
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def extract(self, filename, groups=None, types=None, version=None, binary=None, periodic=True):
+        #Write the elements of the physical groups `groups` (names or numbers, all if None) and element types `types`
+        #(all if None), and only the nodes they use, to a new .msh file. version ("2.2" or "4.1") and binary default to
+        #the format of this file. Periodic pairs with both nodes written are kept if periodic is True.
+        tags, coords, blocks = self.__arrays_in__("gmsh")
+        groups = self.__group_list__(groups)
+
+        selected = {}
+        for eletype, block in blocks.items():
+            if types is not None and eletype not in types:
+                continue
+            rows = np.arange(len(block)) if groups is None else np.flatnonzero(np.isin(block.physgrp, groups))
+            if rows.size > 0:
+                selected[eletype] = block.take(rows)
+
+        #the nodes of whole physical groups are known from the membership computed by the initial pass
+        if groups is not None and types is None:
+            used = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + [self.node_groups.nodes_of(grp) for grp in groups]))
+            keep = tag_mask(used, tags)
+            node_tags, node_coords = tags[keep], coords[keep]
+        else:
+            node_tags, node_coords = used_nodes(tags, coords, list(selected.values()))
+        order = np.argsort(node_tags, kind="mergesort")     #written by increasing tag, as gmsh does
+        node_tags, node_coords = node_tags[order], node_coords[order]
+
+        links = []
+        if periodic:
+            for dim, entity, master, affine, pairs in self.periodic_links:
+                pairs = pairs[tag_mask(node_tags, pairs).all(axis=1)]
+                if len(pairs) > 0:
+                    links.append((dim, entity, master, affine, pairs))
+
+        if version is None:
+            version = "4.1" if self.mshversion >= 4 else "2.2"
+        if binary is None:
+            binary = self.mshbinary
+        write_msh(filename, node_tags, node_coords, selected, self.physical_group_names, self.physical_group_dims,
+            str(version), binary, links)
+        nelem = sum([len(block) for block in selected.values()])
+        self.__inform__("Wrote " + str(len(node_tags)) + " nodes and " + str(nelem) + " elements to " + filename)
+        return len(node_tags), nelem
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def spatial_index(self):
+        #Spatial index over the node coordinates (see spatial.py), built on first use
+        if self.spatial is None:
+            tags, coords, blocks = self.to_arrays()
+            self.spatial = SpatialIndex(tags, coords)
+        return self.spatial
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def mesh_quality(self, groups=None, types=None, tolerance=1e-6):
+        #Size, scaled Jacobian and edge ratio of the elements of the physical groups `groups` (names or numbers, all
+        #if None) and element types `types` (all if None), with inverted and degenerate elements flagged and summaries
+        #per physical group (see quality.py). Kept in gt.quality; groups with flagged elements are reported.
+        tags, coords, blocks = self.__arrays_in__("gmsh")
+        groups = self.__group_list__(groups)
+        if groups is not None:
+            blocks = dict((eletype, block.take(np.flatnonzero(np.isin(block.physgrp, groups)))) for eletype, block in blocks.items())
+
+        def progress(done, total):
+            self.stats.progress("quality", done, total)
+        with self.stats.phase("quality", items=sum([len(block) for block in blocks.values()])):
+            self.quality = MeshQuality(tags, coords, blocks, types, tolerance, self.physical_group_names, progress=progress)
+
+        for grp in sorted(self.quality.groups):
+            summary = self.quality.groups[grp]
+            if summary.inverted + summary.degenerate > 0:
+                self.__inform__("Physical group %s has %d inverted and %d degenerate elements" % (grp, summary.inverted, summary.degenerate))
+        self.__inform__("Computed quality of " + str(sum([len(q) for q in self.quality.elements.values()])) + " elements.")
+        return self.quality
+
+
+
+
+####################################################################################################
+####################################################################################################
+    def build_partitions(self):
+        #Elements by owning partition and owned/ghost nodes of every partition (see partitions.py),
+        #kept in gt.partitioning
+        tags, coords, blocks = self.to_arrays()
+        self.partitioning = Partitioning(tags, coords, blocks)
+        self.__inform__("Mesh has " + str(len(self.partitioning.partitions)) + " partitions.")
+        return self.partitioning
+
+
+    def write_partitions(self, pattern, fmt, groups=None, workers=1, ghosts=True, **options):
+        #One file per partition, named pattern % partition (eg. "model.%d.tcl"), in format fmt ("opensees", "essi",
+        #"abaqus" or "vtk", with `groups` and `options` as for the write_* methods). Each file has the elements owned
+        #by the partition and all their nodes; with ghosts = True the nodes owned by other partitions are listed in
+        #pattern % partition + ".ghosts" as lines "tag owner". With workers > 1 partitions are written concurrently.
+        #groups = None writes every physical group in vtk; the other formats need the element of each group.
+        self.__check_writer__(fmt, groups)
+        if self.partitioning is None:
+            self.build_partitions()
+        if fmt == "vtk" and groups is not None:
+            groups = list(self.__group_numbers__(dict((grp, None) for grp in groups)))
+        elif groups is not None:
+            groups = self.__group_numbers__(groups)
+        if fmt == "abaqus" and "names" not in options:
+            options["names"] = dict((grp, self.physical_group_names.get(grp, "GROUP" + str(grp))) for grp in groups)
+
+        def jobs():
+            for partition in self.partitioning.partitions:
+                tags, coords, blocks = self.partitioning.arrays(partition)
+                ghost = self.partitioning.ghost_nodes(partition)
+                filename = pattern % partition
+                yield (fmt, filename, tags, coords, blocks, self.ordering, groups, options,
+                    filename + ".ghosts" if ghosts else None, ghost, self.partitioning.owner_of(ghost))
+
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            written = pool.map(write_partition, jobs())
+            pool.close()
+            pool.join()
+        else:
+            written = [write_partition(job) for job in jobs()]
+        self.__inform__("Wrote " + str(len(written)) + " partitions.")
+        return written
+
+
+    def __check_writer__(self, fmt, groups):
+        #fmt must be one of partition_writers, and groups ({physical group : element}) is only optional for vtk
+        if fmt not in partition_writers:
+            self.__error__("Unknown format \"" + str(fmt) + "\". Available: " + ", ".join(sorted(partition_writers)))
+            exit(-1)
+        if groups is None and fmt != "vtk":
+            self.__error__("Format \"" + fmt + "\" needs groups, {physical group : element} as for write_" + fmt + "()")
+            exit(-1)
+
+
+    def write_groups(self, pattern, fmt, groups, changed=None, **options):
+        #One file per physical group, named pattern % name (or % number for unnamed groups), in format fmt (as
+        #write_partitions), with the elements of the group and the nodes they use. If changed (eg. from changed_groups())
+        #is given, the files of the other groups are kept as they are when they exist.
+        self.__check_writer__(fmt, groups)
+        if fmt == "vtk":
+            groups = dict((grp, None) for grp in self.__group_list__(groups))
+        else:
+            groups = self.__group_numbers__(groups)
+        if fmt == "abaqus" and "names" not in options:
+            options["names"] = dict((grp, self.physical_group_names.get(grp, "GROUP" + str(grp))) for grp in groups)
+        changed = None if changed is None else set(self.__group_list__(changed))
+
+        tags, coords, blocks = self.to_arrays()
+        files = []
+        reused = 0
+        for grp in groups:
+            filename = pattern % self.physical_group_names.get(grp, grp)
+            files.append(filename)
+            if changed is not None and grp not in changed and os.path.exists(filename):
+                reused += 1
+                continue
+            selected = dict((block.eletype, block) for g, block in selected_blocks(blocks, [grp]))
+            group_tags, group_coords = used_nodes(tags, coords, list(selected.values()))
+            write_partition((fmt, filename, group_tags, group_coords, selected, self.ordering,
+                [grp] if fmt == "vtk" else {grp : groups[grp]}, options, None, None, None))
+        self.__inform__("Wrote " + str(len(files) - reused) + " physical group files, kept " + str(reused) + " unchanged.")
+        return files
+
     #Helper functions to do typical tasks, such as checking if node or element is in a group
     def is_element_in(self, this_physgrp):
-        def is_element_in_physgrp(eletag,eletype,physgrp,nodes,npart=0,parts=[]):
-            if this_physgrp == "!any":
-                return True
-            return self.physical_groups_by_name[this_physgrp] == physgrp
-        return is_element_in_physgrp
+        if this_physgrp == "!any":
+            return self.element_selector()
+        return self.element_selector(groups=this_physgrp)
+
+    def is_element_of_type(self, this_eletype):
+        return self.element_selector(eletypes=this_eletype)
+
+    def element_selector(self, groups=None, eletypes=None, dims=None, condition=None):
+        #Element rule condition by physical group (names or numbers), element type and dimension, and
+        #optionally a further condition. parse() only calls it for elements it can select (see dispatch.py).
+        return ElementSelector(self.__group_list__(groups), eletypes, dims, condition)
 
     def is_node_in(self, this_physgrp):
         def is_node_in_physgrp(tag,x,y,z,physgroups):
@@ -372,10 +1544,65 @@ gmshTranslator
             return self.physical_groups_by_name[this_physgrp] in physgroups
         return is_node_in_physgrp
 
+    #Same as above, for batch rules (they produce masks)
+    def are_elements_in(self, this_physgrp):
+        def are_elements_in_physgrp(eletags,eletype,physgrp,nodes):
+            if this_physgrp == "!any":
+                return np.ones(eletags.shape, dtype=bool)
+            return physgrp == self.physical_groups_by_name[this_physgrp]
+        return are_elements_in_physgrp
+
+    def are_elements_of_type(self, this_eletype):
+        def are_elements_of_eletype(eletags,eletype,physgrp,nodes):
+            return np.full(eletags.shape, eletype == this_eletype)
+        return are_elements_of_eletype
+
+    def are_nodes_in(self, this_physgrp):
+        def are_nodes_in_physgrp(tags,x,y,z,physgroups):
+            if this_physgrp == "!any":
+                return np.ones(tags.shape, dtype=bool)
+            return physgroups[self.physical_groups_by_name[this_physgrp]]
+        return are_nodes_in_physgrp
+
+    #Geometric conditions, answered by the spatial index (see spatial_index) with one query each
+    def are_nodes_in_box(self, lower, upper):
+        return self.__spatial_condition__(lambda index: index.in_box(lower, upper))
+
+    def are_nodes_within(self, center, radius):
+        return self.__spatial_condition__(lambda index: index.within(center, radius))
+
+    def are_nodes_on_plane(self, point, normal, tolerance=1e-6):
+        return self.__spatial_condition__(lambda index: index.on_plane(point, normal, tolerance))
+
+    def __spatial_condition__(self, query):
+        selected = []
+        def are_nodes_selected(tags,x,y,z,physgroups):
+            if len(selected) == 0:
+                selected.append(query(self.spatial_index()))
+            return tag_mask(selected[0], tags)
+        return are_nodes_selected
+
+    def is_node_among(self, node_tags):
+        #Normal rule condition true for the nodes in node_tags (eg. the result of a spatial query)
+        selected = set(np.asarray(node_tags).tolist())
+        def is_node_among_tags(tag,x,y,z,physgroups):
+            return tag in selected
+        return is_node_among_tags
+
+    def are_elements_on_nodes(self, node_tags, all_nodes=True):
+        #Elements with all (or, with all_nodes=False, any) of their nodes in node_tags
+        selected = np.unique(node_tags)
+        def are_elements_on_selected_nodes(eletags,eletype,physgrp,nodes):
+            mask = tag_mask(selected, nodes)
+            return mask.all(axis=1) if all_nodes else mask.any(axis=1)
+        return are_elements_on_selected_nodes
+
 
 ####################################################################################################
 ####################################################################################################
     def __inform__(self, msg, headline=True):
+        if not self.verbose:
+            return
         if headline:
             print ("gmshTranslator: " + msg)
         else:
@@ -389,39 +1616,39 @@ gmshTranslator
         sys.stderr.write("gmshTranslator: ERROR! -> " + msg + "\n")
 
     #GMSH element definitions
-    line_2_node                 = sp.int32(1)  # 2-node line.
-    triangle_3_node             = sp.int32(2)  # 3-node triangle.
-    quadrangle_4_node           = sp.int32(3)  # 4-node quadrangle.
-    tetrahedron_4_node          = sp.int32(4)  # 4-node tetrahedron.
-    hexahedron_8_node           = sp.int32(5)  # 8-node hexahedron.
-    prism_6_node                = sp.int32(6)  # 6-node prism.
-    pyramid_5_node              = sp.int32(7)  # 5-node pyramid.
-    line_3_node                 = sp.int32(8)  # 3-node second order line (2 nodes associated with the vertices and 1 with the edge).
-    triangle_6_node             = sp.int32(9)  # 6-node second order triangle (3 nodes associated with the vertices and 3 with the edges).
-    quadrangle_9_node           = sp.int32(10) # 9-node second order quadrangle (4 nodes associated with the vertices, 4 with the edges and 1 with the face).
-    tetrahedron_10_node         = sp.int32(11) # 10-node second order tetrahedron (4 nodes associated with the vertices and 6 with the edges).
-    hexahedron_27_node          = sp.int32(12) # 27-node second order hexahedron (8 nodes associated with the vertices, 12 with the edges, 6 with the faces and 1 with the volume).
-    prism_18_node               = sp.int32(13) # 18-node second order prism (6 nodes associated with the vertices, 9 with the edges and 3 with the quadrangular faces).
-    pyramid_14_node             = sp.int32(14) # 14-node second order pyramid (5 nodes associated with the vertices, 8 with the edges and 1 with the quadrangular face).
-    point_1_node                = sp.int32(15) # 1-node point.
-    quadrangle_8_node           = sp.int32(16) # 8-node second order quadrangle (4 nodes associated with the vertices and 4 with the edges).
-    hexahedron_20_node          = sp.int32(17) # 20-node second order hexahedron (8 nodes associated with the vertices and 12 with the edges).
-    prism_15_node               = sp.int32(18) # 15-node second order prism (6 nodes associated with the vertices and 9 with the edges).
-    pyramid_13_node             = sp.int32(19) # 13-node second order pyramid (5 nodes associated with the vertices and 8 with the edges).
-    triangle_9_node_incomplete  = sp.int32(20) # 9-node third order incomplete triangle (3 nodes associated with the vertices, 6 with the edges)
-    triangle_10_node            = sp.int32(21) # 10-node third order triangle (3 nodes associated with the vertices, 6 with the edges, 1 with the face)
-    triangle_12_node_incomplete = sp.int32(22) # 12-node fourth order incomplete triangle (3 nodes associated with the vertices, 9 with the edges)
-    triangle_15_node            = sp.int32(23) # 15-node fourth order triangle (3 nodes associated with the vertices, 9 with the edges, 3 with the face)
-    triangle_15_node_incomplete = sp.int32(24) # 15-node fifth order incomplete triangle (3 nodes associated with the vertices, 12 with the edges)
-    triangle_21_node            = sp.int32(25) # 21-node fifth order complete triangle (3 nodes associated with the vertices, 12 with the edges, 6 with the face)
-    edge_4_node                 = sp.int32(26) # 4-node third order edge (2 nodes associated with the vertices, 2 internal to the edge)
-    edge_5_node                 = sp.int32(27) # 5-node fourth order edge (2 nodes associated with the vertices, 3 internal to the edge)
-    edge_6_node                 = sp.int32(28) # 6-node fifth order edge (2 nodes associated with the vertices, 4 internal to the edge)
-    tetrahedron_20_node         = sp.int32(29) # 20-node third order tetrahedron (4 nodes associated with the vertices, 12 with the edges, 4 with the faces)
-    tetrahedron_35_node         = sp.int32(30) # 35-node fourth order tetrahedron (4 nodes associated with the vertices, 18 with the edges, 12 with the faces, 1 in the volume)
-    tetrahedron_56_node         = sp.int32(31) # 56-node fifth order tetrahedron (4 nodes associated with the vertices, 24 with the edges, 24 with the faces, 4 in the volume)
-    hexahedron_64_node          = sp.int32(92) # 64-node third order hexahedron (8 nodes associated with the vertices, 24 with the edges, 24 with the faces, 8 in the volume)
-    hexahedron_125_node         = sp.int32(93) # 125-node fourth order hexahedron (8 nodes associated with the vertices, 36 with the edges, 54 with the faces, 27 in the volume)
+    line_2_node                 = np.int32(1)  # 2-node line.
+    triangle_3_node             = np.int32(2)  # 3-node triangle.
+    quadrangle_4_node           = np.int32(3)  # 4-node quadrangle.
+    tetrahedron_4_node          = np.int32(4)  # 4-node tetrahedron.
+    hexahedron_8_node           = np.int32(5)  # 8-node hexahedron.
+    prism_6_node                = np.int32(6)  # 6-node prism.
+    pyramid_5_node              = np.int32(7)  # 5-node pyramid.
+    line_3_node                 = np.int32(8)  # 3-node second order line (2 nodes associated with the vertices and 1 with the edge).
+    triangle_6_node             = np.int32(9)  # 6-node second order triangle (3 nodes associated with the vertices and 3 with the edges).
+    quadrangle_9_node           = np.int32(10) # 9-node second order quadrangle (4 nodes associated with the vertices, 4 with the edges and 1 with the face).
+    tetrahedron_10_node         = np.int32(11) # 10-node second order tetrahedron (4 nodes associated with the vertices and 6 with the edges).
+    hexahedron_27_node          = np.int32(12) # 27-node second order hexahedron (8 nodes associated with the vertices, 12 with the edges, 6 with the faces and 1 with the volume).
+    prism_18_node               = np.int32(13) # 18-node second order prism (6 nodes associated with the vertices, 9 with the edges and 3 with the quadrangular faces).
+    pyramid_14_node             = np.int32(14) # 14-node second order pyramid (5 nodes associated with the vertices, 8 with the edges and 1 with the quadrangular face).
+    point_1_node                = np.int32(15) # 1-node point.
+    quadrangle_8_node           = np.int32(16) # 8-node second order quadrangle (4 nodes associated with the vertices and 4 with the edges).
+    hexahedron_20_node          = np.int32(17) # 20-node second order hexahedron (8 nodes associated with the vertices and 12 with the edges).
+    prism_15_node               = np.int32(18) # 15-node second order prism (6 nodes associated with the vertices and 9 with the edges).
+    pyramid_13_node             = np.int32(19) # 13-node second order pyramid (5 nodes associated with the vertices and 8 with the edges).
+    triangle_9_node_incomplete  = np.int32(20) # 9-node third order incomplete triangle (3 nodes associated with the vertices, 6 with the edges)
+    triangle_10_node            = np.int32(21) # 10-node third order triangle (3 nodes associated with the vertices, 6 with the edges, 1 with the face)
+    triangle_12_node_incomplete = np.int32(22) # 12-node fourth order incomplete triangle (3 nodes associated with the vertices, 9 with the edges)
+    triangle_15_node            = np.int32(23) # 15-node fourth order triangle (3 nodes associated with the vertices, 9 with the edges, 3 with the face)
+    triangle_15_node_incomplete = np.int32(24) # 15-node fifth order incomplete triangle (3 nodes associated with the vertices, 12 with the edges)
+    triangle_21_node            = np.int32(25) # 21-node fifth order complete triangle (3 nodes associated with the vertices, 12 with the edges, 6 with the face)
+    edge_4_node                 = np.int32(26) # 4-node third order edge (2 nodes associated with the vertices, 2 internal to the edge)
+    edge_5_node                 = np.int32(27) # 5-node fourth order edge (2 nodes associated with the vertices, 3 internal to the edge)
+    edge_6_node                 = np.int32(28) # 6-node fifth order edge (2 nodes associated with the vertices, 4 internal to the edge)
+    tetrahedron_20_node         = np.int32(29) # 20-node third order tetrahedron (4 nodes associated with the vertices, 12 with the edges, 4 with the faces)
+    tetrahedron_35_node         = np.int32(30) # 35-node fourth order tetrahedron (4 nodes associated with the vertices, 18 with the edges, 12 with the faces, 1 in the volume)
+    tetrahedron_56_node         = np.int32(31) # 56-node fifth order tetrahedron (4 nodes associated with the vertices, 24 with the edges, 24 with the faces, 4 in the volume)
+    hexahedron_64_node          = np.int32(92) # 64-node third order hexahedron (8 nodes associated with the vertices, 24 with the edges, 24 with the faces, 8 in the volume)
+    hexahedron_125_node         = np.int32(93) # 125-node fourth order hexahedron (8 nodes associated with the vertices, 36 with the edges, 54 with the faces, 27 in the volume)
 
 
 
@@ -0,0 +1,187 @@
+from __future__ import print_function
+from timeit import default_timer as clock
+
+# Instrumentation of the translation: time, items (lines, nodes, elements) and bytes per phase,
+# time spent in every user rule, and a progress callback for long runs. Rule timing wraps each
+# condition and action in a timer, so it is only done when asked for (profile=True).
+
+PROGRESS_INTERVAL = 1.0     # least number of seconds between two progress calls of a phase
+
+
+
+
+####################################################################################################
+####################################################################################################
+class PhaseStats(object):
+    """
+PhaseStats
+
+    Accumulated time, number of runs, items and bytes of one phase.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.runs = 0
+        self.items = 0
+        self.nbytes = 0
+
+    def rate(self, amount):
+        return amount / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self):
+        return {"seconds" : self.seconds, "runs" : self.runs, "items" : self.items, "bytes" : self.nbytes,
+            "items_per_second" : self.rate(self.items), "bytes_per_second" : self.rate(self.nbytes)}
+
+
+class Phase(object):
+    """
+Phase
+
+    Context manager timing one run of a phase: with stats.phase("nodes") as phase: ...
+    Items and bytes may be given at the start or added to `phase` as they are processed.
+    """
+
+    def __init__(self, stats, items=0, nbytes=0):
+        self.stats = stats
+        self.items = items
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.seconds += clock() - self.start
+        self.stats.runs += 1
+        self.stats.items += self.items
+        self.stats.nbytes += self.nbytes
+        return False
+
+
+class RuleStats(object):
+    """
+RuleStats
+
+    Calls, hits and time of the condition and action of one rule. For normal rules hits is
+    the number of times the condition was true; for batch rules, the number of nodes or
+    elements selected.
+    """
+
+    def __init__(self, kind, number, condition, action):
+        self.kind = kind
+        self.number = number
+        self.condition = getattr(condition, "__name__", repr(condition))
+        self.action = getattr(action, "__name__", repr(action))
+        self.condition_calls = 0
+        self.condition_seconds = 0.0
+        self.action_calls = 0
+        self.action_seconds = 0.0
+        self.hits = 0
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Instrumentation(object):
+    """
+Instrumentation
+
+    Phase timers, rule profiles (when profile is True) and progress reporting of a
+    gmshTranslator. progress(phase, done, total) is called at most every PROGRESS_INTERVAL
+    seconds per phase, and when a phase is done; total is None when unknown.
+    """
+
+    def __init__(self, progress=None, profile=False):
+        self.progress_callback = progress
+        self.profile = profile
+        self.phases = {}
+        self.phase_order = []
+        self.rules = {}
+        self.last_progress = {}
+
+    def __phase_stats__(self, name):
+        if name not in self.phases:
+            self.phases[name] = PhaseStats(name)
+            self.phase_order.append(name)
+        return self.phases[name]
+
+    def phase(self, name, items=0, nbytes=0):
+        return Phase(self.__phase_stats__(name), items, nbytes)
+
+    def add(self, name, seconds, items=0, nbytes=0):
+        stats = self.__phase_stats__(name)
+        stats.seconds += seconds
+        stats.runs += 1
+        stats.items += items
+        stats.nbytes += nbytes
+
+    def progress(self, phase, done, total=None):
+        if self.progress_callback is None:
+            return
+        now = clock()
+        if done == total or now - self.last_progress.get(phase, 0.0) >= PROGRESS_INTERVAL:
+            self.last_progress[phase] = now
+            self.progress_callback(phase, int(done), None if total is None else int(total))
+
+    def timed_rules(self, rules, kind, batch=False):
+        # rules ((condition, action) pairs) with their calls timed, or rules as they are if not profiling
+        if not self.profile:
+            return rules
+        timed = []
+        for number, (condition, action) in enumerate(rules):
+            key = (kind, number)
+            if key not in self.rules or self.rules[key].condition != getattr(condition, "__name__", repr(condition)):
+                self.rules[key] = RuleStats(kind, number, condition, action)
+            timed.append((self.__timed_condition__(self.rules[key], condition), self.__timed_action__(self.rules[key], action, batch)))
+        return timed
+
+    def __timed_condition__(self, stats, condition):
+        def timed_condition(*args):
+            start = clock()
+            result = condition(*args)
+            stats.condition_seconds += clock() - start
+            stats.condition_calls += 1
+            return result
+        return timed_condition
+
+    def __timed_action__(self, stats, action, batch):
+        def timed_action(*args):
+            start = clock()
+            result = action(*args)
+            stats.action_seconds += clock() - start
+            stats.action_calls += 1
+            stats.hits += len(args[0]) if batch else 1
+            return result
+        return timed_action
+
+    def reset(self):
+        self.phases = {}
+        self.phase_order = []
+        self.rules = {}
+
+    def as_dict(self):
+        return {
+            "phases" : dict((name, self.phases[name].as_dict()) for name in self.phase_order),
+            "rules" : [self.rules[key].as_dict() for key in sorted(self.rules)],
+        }
+
+    def report(self):
+        # Text table of the phases and, if profiled, of the rules sorted by total time
+        lines = ["%-24s %10s %12s %14s %10s" % ("phase", "seconds", "items", "items/s", "MB/s")]
+        for name in self.phase_order:
+            stats = self.phases[name]
+            lines.append("%-24s %10.3f %12d %14.0f %10.1f" % (name, stats.seconds, stats.items,
+                stats.rate(stats.items), stats.rate(stats.nbytes) / 1e6))
+        if len(self.rules) > 0:
+            lines.append("")
+            lines.append("%-16s %-24s %-24s %10s %10s %10s %10s" % ("rule", "condition", "action", "calls", "cond s", "hits", "action s"))
+            ranked = sorted(self.rules.values(), key=lambda r: -(r.condition_seconds + r.action_seconds))
+            for r in ranked:
+                lines.append("%-16s %-24s %-24s %10d %10.3f %10d %10.3f" % (r.kind + " " + str(r.number), r.condition[:24],
+                    r.action[:24], r.condition_calls, r.condition_seconds, r.hits, r.action_seconds))
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+from __future__ import print_function
+import numpy as np
+
+# Compact storage of which nodes belong to which physical groups. Memory is proportional
+# to the number of (node, group) memberships instead of (number of groups x max node tag).
+
+
+
+
+####################################################################################################
+####################################################################################################
+class PhysicalGroupMembership(object):
+    """
+PhysicalGroupMembership
+
+    Node -> physical groups index in CSR form. For the node node_tags[i], the indices
+    (into `groups`) of the groups it belongs to are group_index[indptr[i]:indptr[i+1]].
+    The transposed index (group -> sorted node tags) is kept as well, so both kinds of
+    queries cost O(log Nnodes + number of hits).
+    """
+
+    def __init__(self, nodes, gidx, groups):
+        # nodes, gidx: (node tag, group index) pairs sorted by node then group, no repetitions
+        self.groups = np.asarray(groups)
+        self.position = dict((grp, g) for g, grp in enumerate(groups))
+        self.node_tags, starts = np.unique(nodes, return_index=True)
+        self.indptr = np.append(starts, nodes.size).astype(np.int64)
+        self.group_index = gidx
+
+        order = np.argsort(gidx, kind="mergesort")
+        self.group_nodes = nodes[order]
+        self.group_indptr = np.searchsorted(gidx[order], np.arange(self.groups.size + 1))
+
+    def groups_of(self, tag):
+        i = np.searchsorted(self.node_tags, tag)
+        if i < self.node_tags.size and self.node_tags[i] == tag:
+            return list(self.groups[self.group_index[self.indptr[i]:self.indptr[i+1]]])
+        return []
+
+    def nodes_of(self, grp):
+        g = self.position.get(grp, -1)
+        if g < 0:
+            return self.group_nodes[:0]
+        return self.group_nodes[self.group_indptr[g]:self.group_indptr[g+1]]
+
+    def contains(self, grp, tags):
+        # Boolean mask: which of `tags` belong to group grp (tags may be a scalar or an array)
+        nodes = self.nodes_of(grp)
+        tags = np.asarray(tags)
+        if nodes.size == 0:
+            return np.zeros(tags.shape, dtype=bool)
+        i = np.minimum(np.searchsorted(nodes, tags), nodes.size - 1)
+        return nodes[i] == tags
+
+    def pairs(self):
+        # All (node tag, group index) pairs, sorted by node
+        return np.repeat(self.node_tags, np.diff(self.indptr)), self.group_index
+
+    def nbytes(self):
+        return (self.node_tags.nbytes + self.indptr.nbytes + self.group_index.nbytes +
+            self.group_nodes.nbytes + self.group_indptr.nbytes)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class MembershipBuilder(object):
+    """
+MembershipBuilder
+
+    Accumulates (nodes, group) memberships element by element or block by block, removing
+    repetitions every `flush_size` entries so that memory stays bounded.
+    """
+
+    def __init__(self, flush_size=1 << 22):
+        self.flush_size = flush_size
+        self.groups = []
+        self.group_position = {}
+        self.nodes = np.zeros(0, dtype=np.int64)
+        self.gidx = np.zeros(0, dtype=np.int64)
+        self.pending_nodes = []
+        self.pending_gidx = []
+        self.pending_lengths = []
+        self.npending = 0
+
+    def __group__(self, grp):
+        g = self.group_position.get(grp)
+        if g is None:
+            g = len(self.groups)
+            self.group_position[grp] = g
+            self.groups.append(grp)
+        return g
+
+    def add(self, nodes, grp):
+        self.pending_nodes.append(nodes)
+        self.pending_gidx.append(self.__group__(grp))
+        self.pending_lengths.append(len(nodes))
+        self.npending += len(nodes)
+        if self.npending >= self.flush_size:
+            self.flush()
+
+    def add_block(self, nodes, physgrp):
+        # nodes: connectivity matrix, physgrp: group of each row
+        for grp in np.unique(physgrp):
+            self.add(np.ravel(nodes[physgrp == grp]), grp)
+
+    def flush(self):
+        if self.npending == 0:
+            return
+        ngroups = max(len(self.groups), 1)
+        newnodes = np.concatenate(self.pending_nodes).astype(np.int64)
+        newgidx = np.repeat(np.array(self.pending_gidx, dtype=np.int64), self.pending_lengths)
+        key = np.concatenate((self.nodes * ngroups + self.gidx, newnodes * ngroups + newgidx))
+        key = np.unique(key)
+        self.nodes = key // ngroups
+        self.gidx = key % ngroups
+        self.pending_nodes = []
+        self.pending_gidx = []
+        self.pending_lengths = []
+        self.npending = 0
+
+    def finish(self):
+        self.flush()
+        return PhysicalGroupMembership(self.nodes, self.gidx, self.groups)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class GroupNodes(object):
+    """
+GroupNodes
+
+    Nodes of one physical group. Indexing by node tag gives 1 if the node belongs to the group
+    and -1 otherwise, like the dense vectors previously stored in nodes_in_physical_groups.
+    """
+
+    def __init__(self, membership, grp, size):
+        self.membership = membership
+        self.grp = grp
+        self.size = size
+
+    @property
+    def nodes(self):
+        return self.membership.nodes_of(self.grp)
+
+    def __getitem__(self, tags):
+        inside = self.membership.contains(self.grp, tags)
+        if inside.ndim == 0:
+            return 1 if inside else -1
+        return np.where(inside, 1, -1).astype(np.int16)
+
+    def __contains__(self, tag):
+        return bool(self.membership.contains(self.grp, tag))
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def __array__(self, dtype=None, copy=None):
+        # Dense -1/1 vector indexed by node tag. Costs O(max node tag) memory.
+        dense = -np.ones(self.size, dtype=np.int16)
+        dense[self.nodes] = 1
+        return dense if dtype is None else dense.astype(dtype)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class NodesInPhysicalGroups(dict):
+    """
+NodesInPhysicalGroups
+
+    Dictionary physical group -> GroupNodes, backed by a single PhysicalGroupMembership.
+    """
+
+    def __init__(self, membership, size):
+        dict.__init__(self)
+        self.membership = membership
+        for grp in membership.groups:
+            self[grp] = GroupNodes(membership, grp, size)
@@ -0,0 +1,331 @@
+from __future__ import print_function
+import numpy as np
+from itertools import islice
+from .readers import ElementBlock, concatenate_blocks, find_line, read_section_body, read_array, \
+    skip_lines, nodes_per_element_type
+from .compressed import open_mesh, map_array
+
+# Readers for the MSH 4.1 format (ASCII and binary). In MSH 4 nodes and elements are
+# written in blocks, one per geometrical entity, so every block is read as a whole into
+# contiguous arrays; python code only runs once per entity block.
+
+
+class MSH4Format(object):
+    """
+MSH4Format
+
+    Binary layout of a MSH 4.1 file, as given in its $MeshFormat section.
+    """
+
+    def __init__(self, binary, datasize=8, byteorder="<"):
+        self.binary = binary
+        self.int = np.dtype(byteorder + "i4")
+        self.size_t = np.dtype(byteorder + "u" + str(datasize))
+        self.double = np.dtype(byteorder + "f8")
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_entities(f, fmt):
+    # Body of $Entities. Returns a dictionary (entity dimension, entity tag) -> list of
+    # physical tags of that entity.
+    physicals = {}
+    if fmt.binary:
+        counts = read_array(f, fmt.size_t, 4)
+        for dim in range(4):
+            for i in range(int(counts[dim])):
+                tag = int(read_array(f, fmt.int, 1)[0])
+                read_array(f, fmt.double, 3 if dim == 0 else 6)
+                nphys = int(read_array(f, fmt.size_t, 1)[0])
+                physicals[(dim, tag)] = [int(p) for p in read_array(f, fmt.int, nphys)]
+                if dim > 0:
+                    nbound = int(read_array(f, fmt.size_t, 1)[0])
+                    read_array(f, fmt.int, nbound)
+        find_line(f, b"$EndEntities")
+    else:
+        counts = [int(c) for c in f.readline().split()]
+        for dim in range(4):
+            for i in range(counts[dim]):
+                sl = f.readline().split()
+                first = 4 if dim == 0 else 7   # position of numPhysicalTags
+                nphys = int(sl[first])
+                physicals[(dim, int(sl[0]))] = [int(p) for p in sl[first+1:first+1+nphys]]
+        find_line(f, b"$EndEntities")
+    return physicals
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_partitioned_entities(f, fmt):
+    # Body of $PartitionedEntities. Returns two dictionaries (entity dimension, entity tag) ->
+    # list of partitions and (entity dimension, entity tag) -> list of physical tags, for the
+    # entities of the partitioned mesh (those referenced by $Nodes and $Elements).
+    partitions = {}
+    physicals = {}
+    if fmt.binary:
+        read_array(f, fmt.size_t, 1)
+        nghost = int(read_array(f, fmt.size_t, 1)[0])
+        read_array(f, fmt.int, 2 * nghost)
+        counts = read_array(f, fmt.size_t, 4)
+        for dim in range(4):
+            for i in range(int(counts[dim])):
+                tag = int(read_array(f, fmt.int, 3)[0])
+                nparts = int(read_array(f, fmt.size_t, 1)[0])
+                partitions[(dim, tag)] = [int(p) for p in read_array(f, fmt.int, nparts)]
+                read_array(f, fmt.double, 3 if dim == 0 else 6)
+                nphys = int(read_array(f, fmt.size_t, 1)[0])
+                physicals[(dim, tag)] = [int(p) for p in read_array(f, fmt.int, nphys)]
+                if dim > 0:
+                    nbound = int(read_array(f, fmt.size_t, 1)[0])
+                    read_array(f, fmt.int, nbound)
+        find_line(f, b"$EndPartitionedEntities")
+    else:
+        tokens = read_section_body(f, b"PartitionedEntities").split()
+        pos = 2 + 2 * int(tokens[1])
+        counts = [int(c) for c in tokens[pos:pos+4]]
+        pos += 4
+        for dim in range(4):
+            for i in range(counts[dim]):
+                tag = int(tokens[pos])
+                nparts = int(tokens[pos+3])
+                partitions[(dim, tag)] = [int(p) for p in tokens[pos+4:pos+4+nparts]]
+                pos += 4 + nparts + (3 if dim == 0 else 6)
+                nphys = int(tokens[pos])
+                physicals[(dim, tag)] = [int(p) for p in tokens[pos+1:pos+1+nphys]]
+                pos += 1 + nphys
+                if dim > 0:
+                    pos += 1 + int(tokens[pos])
+    return partitions, physicals
+
+
+def owner_partition(partitions, dim, entity):
+    # Partition owning the elements of an entity: the first one listed (0 if not partitioned)
+    return (partitions.get((dim, entity)) or [0])[0]
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_nodes(f, fmt):
+    # Body of $Nodes. Returns node tags and (N,3) coordinates, in file order.
+    tags = []
+    coords = []
+    if fmt.binary:
+        nblocks, nnodes, mintag, maxtag = [int(v) for v in read_array(f, fmt.size_t, 4)]
+        for b in range(nblocks):
+            dim, entity, parametric = read_array(f, fmt.int, 3)
+            n = int(read_array(f, fmt.size_t, 1)[0])
+            ncoords = 3 + (dim if parametric else 0)
+            tags.append(read_array(f, fmt.size_t, n).astype(np.int64))
+            coords.append(read_array(f, fmt.double, n * ncoords).reshape(n, ncoords)[:, :3])
+        find_line(f, b"$EndNodes")
+    else:
+        values = np.fromstring(read_section_body(f, b"Nodes"), dtype=np.float64, sep=" ")
+        nblocks, nnodes = int(values[0]), int(values[1])
+        pos = 4
+        for b in range(nblocks):
+            dim, entity, parametric, n = [int(v) for v in values[pos:pos+4]]
+            pos += 4
+            ncoords = 3 + (dim if parametric else 0)
+            tags.append(values[pos:pos+n].astype(np.int64))
+            pos += n
+            coords.append(values[pos:pos+n*ncoords].reshape(n, ncoords)[:, :3])
+            pos += n * ncoords
+
+    if len(tags) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+    tags = np.concatenate(tags)
+    if tags.size != nnodes:
+        raise ValueError("gmshTranslator: malformed $Nodes section")
+    return tags, np.ascontiguousarray(np.concatenate(coords), dtype=np.float64)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_elements(f, fmt, physicals, partitions={}):
+    # Body of $Elements. Returns {eletype : ElementBlock}. The physical group of the elements
+    # comes from their entity (`physicals`, see read_entities): elements of entities without
+    # physical tags get group 0, and elements of entities with several physical tags are
+    # repeated once per tag, just like gmsh does when exporting to MSH 2.2. The partition
+    # comes from `partitions` (see read_partitioned_entities).
+    pieces = []
+    index = 0
+    if fmt.binary:
+        nblocks, nelem = [int(v) for v in read_array(f, fmt.size_t, 2)]
+        read_array(f, fmt.size_t, 2)
+        values = None
+    else:
+        values = np.fromstring(read_section_body(f, b"Elements"), dtype=np.int64, sep=" ")
+        nblocks, nelem = int(values[0]), int(values[1])
+        pos = 4
+
+    for b in range(nblocks):
+        if fmt.binary:
+            dim, entity, eletype = [int(v) for v in read_array(f, fmt.int, 3)]
+            n = int(read_array(f, fmt.size_t, 1)[0])
+        else:
+            dim, entity, eletype, n = [int(v) for v in values[pos:pos+4]]
+            pos += 4
+        if eletype not in nodes_per_element_type:
+            raise ValueError("gmshTranslator: unknown element type " + str(eletype))
+        width = 1 + nodes_per_element_type[eletype]
+
+        if fmt.binary:
+            data = read_array(f, fmt.size_t, n * width).reshape(n, width).astype(np.int64)
+        else:
+            data = values[pos:pos+n*width].reshape(n, width)
+            pos += n * width
+
+        partition = np.full(n, owner_partition(partitions, dim, entity), dtype=np.int32)
+        for physgrp in physicals.get((dim, entity), []) or [0]:
+            pieces.append({eletype : ElementBlock(eletype, data[:, 0],
+                np.full(n, physgrp, dtype=np.int64), np.full(n, entity, dtype=np.int64),
+                data[:, 1:], np.arange(index, index + n), partition)})
+            index += n
+
+    if fmt.binary:
+        find_line(f, b"$EndElements")
+    return concatenate_blocks(pieces)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def iter_node_chunks(f, filename, fmt, chunk_size):
+    # Chunked version of read_nodes: yields (tags, coords) with at most chunk_size nodes.
+    # Binary blocks are memory mapped; in ASCII blocks (all tags first, then all coordinates)
+    # a second file handle follows the coordinates while f reads the tags.
+    if fmt.binary:
+        nblocks = int(read_array(f, fmt.size_t, 4)[0])
+    else:
+        nblocks = int(f.readline().split()[0])
+        coordfid = open_mesh(filename)
+
+    try:
+        for b in range(nblocks):
+            if fmt.binary:
+                dim, entity, parametric = [int(v) for v in read_array(f, fmt.int, 3)]
+                n = int(read_array(f, fmt.size_t, 1)[0])
+            else:
+                dim, entity, parametric, n = [int(v) for v in f.readline().split()]
+            ncoords = 3 + (dim if parametric else 0)
+            if n == 0:
+                continue
+
+            if fmt.binary:
+                position = f.tell()
+                coordstart = position + n * fmt.size_t.itemsize
+                tags = map_array(f, filename, fmt.size_t, position, (n,))
+                for start in range(0, n, chunk_size):
+                    m = min(chunk_size, n - start)
+                    coords = map_array(f, filename, fmt.double, coordstart + start * ncoords * fmt.double.itemsize, (m, ncoords))
+                    yield tags[start:start+m].astype(np.int64), coords[:, :3]
+                f.seek(coordstart + n * ncoords * fmt.double.itemsize)
+            else:
+                coordfid.seek(f.tell())
+                skip_lines(coordfid, n)
+                for start in range(0, n, chunk_size):
+                    m = min(chunk_size, n - start)
+                    tags = np.fromstring(b"".join(islice(f, m)), dtype=np.int64, sep=" ")
+                    coords = np.fromstring(b"".join(islice(coordfid, m)), dtype=np.float64, sep=" ")
+                    yield tags, coords.reshape(m, ncoords)[:, :3]
+                f.seek(coordfid.tell())
+    finally:
+        if not fmt.binary:
+            coordfid.close()
+
+
+
+
+####################################################################################################
+####################################################################################################
+def iter_element_chunks(f, filename, fmt, physicals, chunk_size, types=None, partitions={}):
+    # Chunked version of read_elements, yielding ElementBlocks of at most chunk_size elements.
+    # `index` numbers elements exactly as read_elements does. Blocks of types not in `types`
+    # are skipped without being parsed.
+    if fmt.binary:
+        nblocks = int(read_array(f, fmt.size_t, 4)[0])
+    else:
+        nblocks = int(f.readline().split()[0])
+
+    index = 0
+    for b in range(nblocks):
+        if fmt.binary:
+            dim, entity, eletype = [int(v) for v in read_array(f, fmt.int, 3)]
+            n = int(read_array(f, fmt.size_t, 1)[0])
+        else:
+            dim, entity, eletype, n = [int(v) for v in f.readline().split()]
+        if eletype not in nodes_per_element_type:
+            raise ValueError("gmshTranslator: unknown element type " + str(eletype))
+        width = 1 + nodes_per_element_type[eletype]
+        groups = physicals.get((dim, entity), []) or [0]
+
+        if (types is not None and eletype not in types) or n == 0:
+            if fmt.binary:
+                f.seek(f.tell() + n * width * fmt.size_t.itemsize)
+            else:
+                skip_lines(f, n)
+            index += n * len(groups)
+            continue
+
+        position = f.tell()
+
+        #chunks are yielded in `index` order: the copies for each physical group one after the other
+        #(ASCII blocks of entities with several physical tags are read again for every group)
+        for k, physgrp in enumerate(groups):
+            if not fmt.binary and k > 0:
+                f.seek(position)
+            for start in range(0, n, chunk_size):
+                m = min(chunk_size, n - start)
+                if fmt.binary:
+                    data = map_array(f, filename, fmt.size_t, position + start * width * fmt.size_t.itemsize, (m, width)).astype(np.int64)
+                else:
+                    data = np.fromstring(b"".join(islice(f, m)), dtype=np.int64, sep=" ").reshape(m, width)
+                first = index + k * n + start
+                yield ElementBlock(eletype, data[:, 0], np.full(m, physgrp, dtype=np.int64),
+                    np.full(m, entity, dtype=np.int64), data[:, 1:], np.arange(first, first + m),
+                    np.full(m, owner_partition(partitions, dim, entity), dtype=np.int32))
+        if fmt.binary:
+            f.seek(position + n * width * fmt.size_t.itemsize)
+        index += n * len(groups)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_periodic(f, fmt):
+    # Body of $Periodic. Returns a list with (dimension, entity, master entity, affine, pairs)
+    # per periodic link, pairs being an (N,2) array of (node, master node).
+    links = []
+    if fmt.binary:
+        nlinks = int(read_array(f, fmt.size_t, 1)[0])
+        for i in range(nlinks):
+            dim, entity, master = [int(v) for v in read_array(f, fmt.int, 3)]
+            naffine = int(read_array(f, fmt.size_t, 1)[0])
+            affine = read_array(f, fmt.double, naffine)
+            npairs = int(read_array(f, fmt.size_t, 1)[0])
+            pairs = read_array(f, fmt.size_t, 2 * npairs).reshape(npairs, 2).astype(np.int64)
+            links.append((dim, entity, master, affine, pairs))
+        find_line(f, b"$EndPeriodic")
+    else:
+        nlinks = int(f.readline())
+        for i in range(nlinks):
+            dim, entity, master = [int(v) for v in f.readline().split()]
+            affine = np.array(f.readline().split()[1:], dtype=np.float64)
+            npairs = int(f.readline())
+            pairs = np.zeros((npairs, 2), dtype=np.int64)
+            if npairs > 0:
+                pairs = np.array(b" ".join(f.readline() for p in range(npairs)).split(),
+                    dtype=np.int64).reshape(npairs, 2)
+            links.append((dim, entity, master, affine, pairs))
+        find_line(f, b"$EndPeriodic")
+    return links
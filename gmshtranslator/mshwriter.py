@@ -0,0 +1,343 @@
+from __future__ import print_function
+import numpy as np
+from .writers import write_rows, matrix_columns, node_positions, CHUNK_SIZE
+from .dispatch import element_dimension
+
+# Writer for the gmsh .msh format itself (MSH 2.2 and 4.1, ASCII or binary), from the array
+# representation of a mesh: node_tags, node_coords and element_blocks (in the gmsh node
+# ordering). Like the other writers, text is formatted a chunk of rows at a time and binary
+# data is written straight from the arrays.
+
+COORDINATE_FORMAT = "%.17g"     # round trips doubles exactly
+
+
+
+
+####################################################################################################
+####################################################################################################
+class EncodedFile(object):
+    """
+EncodedFile
+
+    Text interface to a file opened in binary mode, for write_rows.
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, text):
+        self.f.write(text.encode())
+
+
+def write_binary_rows(f, rows, dtype):
+    # Writes a 2D (or 1D) array in chunks, converted to dtype
+    for start in range(0, rows.shape[0], CHUNK_SIZE):
+        f.write(np.ascontiguousarray(rows[start:start+CHUNK_SIZE], dtype=dtype).tobytes())
+
+
+def write_msh(filename, node_tags, node_coords, element_blocks, names=None, dims=None, version="2.2", binary=False,
+        periodic_links=()):
+    # names, dims: {physical group : name}, {physical group : dimension} for $PhysicalNames.
+    # periodic_links: (dimension, entity, master entity, affine, pairs) tuples, as read.
+    if version not in ("2.2", "4.1"):
+        raise ValueError("gmshTranslator: can only write MSH 2.2 and 4.1, not " + str(version))
+    names = names or {}
+    dims = dims or {}
+    blocks = [element_blocks[eletype] for eletype in sorted(element_blocks) if len(element_blocks[eletype]) > 0]
+    used_groups = sorted(set().union(*[np.unique(block.physgrp).tolist() for block in blocks]))
+
+    with open(filename, "wb") as f:
+        f.write(("$MeshFormat\n" + version + (" 1 8\n" if binary else " 0 8\n")).encode())
+        if binary:
+            f.write(np.array([1], dtype="<i4").tobytes() + b"\n")
+        f.write(b"$EndMeshFormat\n")
+
+        named = [grp for grp in used_groups if grp in names]
+        if len(named) > 0:
+            f.write(("$PhysicalNames\n%d\n" % len(named)).encode())
+            for grp in named:
+                f.write(("%d %d \"%s\"\n" % (dims.get(grp, -1), grp, names[grp])).encode())
+            f.write(b"$EndPhysicalNames\n")
+
+        if version == "2.2":
+            write_nodes_v2(f, node_tags, node_coords, binary)
+            write_elements_v2(f, blocks, binary)
+            if len(periodic_links) > 0:
+                write_periodic(f, periodic_links, False, False)
+        else:
+            entities = msh4_entities(blocks)
+            write_entities_v4(f, entities, node_tags, node_coords, binary)
+            write_nodes_v4(f, entities, node_tags, node_coords, binary)
+            write_elements_v4(f, entities, binary)
+            if len(periodic_links) > 0:
+                write_periodic(f, periodic_links, True, binary)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_nodes_v2(f, node_tags, node_coords, binary):
+    f.write(("$Nodes\n%d\n" % len(node_tags)).encode())
+    if binary:
+        for start in range(0, len(node_tags), CHUNK_SIZE):
+            stop = min(len(node_tags), start + CHUNK_SIZE)
+            record = np.zeros(stop - start, dtype=[("tag", "<i4"), ("xyz", "<f8", (3,))])
+            record["tag"] = node_tags[start:stop]
+            record["xyz"] = node_coords[start:stop]
+            f.write(record.tobytes())
+        f.write(b"\n")
+    else:
+        write_rows(EncodedFile(f), "%d" + (" " + COORDINATE_FORMAT) * 3 + "\n", [node_tags] + matrix_columns(node_coords))
+    f.write(b"$EndNodes\n")
+
+
+def write_elements_v2(f, blocks, binary):
+    # Tags: physical group, elementary entity and, for partitioned elements, the partitions (see partition_columns)
+    f.write(("$Elements\n%d\n" % sum([len(block) for block in blocks])).encode())
+    for block in blocks:
+        partitions = partition_columns(block)
+        ntags = 2 + len(partitions)
+        columns = [block.tags, block.physgrp, block.entity] + partitions + matrix_columns(block.nodes)
+        if binary:
+            rows = np.column_stack(columns)
+            for start in range(0, rows.shape[0], CHUNK_SIZE):
+                chunk = rows[start:start+CHUNK_SIZE]
+                f.write(np.array([block.eletype, chunk.shape[0], ntags], dtype="<i4").tobytes())
+                f.write(np.ascontiguousarray(chunk, dtype="<i4").tobytes())
+        else:
+            template = "%d " + str(block.eletype) + " " + str(ntags) + " %d" * ntags + " %d" * block.nodes.shape[1] + "\n"
+            write_rows(EncodedFile(f), template, columns)
+    f.write((b"\n" if binary else b"") + b"$EndElements\n")
+
+
+def partition_columns(block):
+    # Number of partitions and partition tags of the elements of a block, as MSH 2.2 tag columns: the raw
+    # tags if the block has them (ghosts included), otherwise the owner partition. Empty if not partitioned.
+    if block.partition_tags is not None:
+        parts = np.asarray(block.partition_tags)
+    elif np.any(block.partition > 0):
+        parts = np.asarray(block.partition)[:, np.newaxis]
+    else:
+        return []
+    return [(parts != 0).sum(axis=1)] + matrix_columns(parts)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Entity(object):
+    """
+Entity
+
+    A geometrical entity of the written MSH 4.1 file: its elements, by type (each element
+    once), its physical groups and the partition owning it (0 if not partitioned).
+    """
+
+    def __init__(self, dim, tag, partition=0):
+        self.dim = dim
+        self.tag = tag
+        self.partition = partition
+        self.physicals = []
+        self.blocks = {}      # eletype -> (tags, nodes)
+
+
+def msh4_entities(blocks):
+    # {(dim, entity tag) : Entity} from the element blocks. Elements listed once per physical
+    # group (as in MSH 2.2) become a single element of an entity with several physical tags.
+    # An entity with elements owned by several partitions (as in MSH 2.2) is split in one entity
+    # per partition, the extra ones numbered after the largest entity tag of their dimension.
+    pieces = []
+    largest = {}
+    for block in blocks:
+        dim = element_dimension(block.eletype)
+        for tag, partition in np.unique(np.column_stack((block.entity, block.partition)), axis=0).tolist():
+            pieces.append((dim, tag, partition, block))
+            largest[dim] = max(largest.get(dim, 0), tag)
+
+    entities = {}
+    written = {}    # (dim, entity tag, partition) -> entity tag written
+    for dim, tag, partition, block in pieces:
+        if (dim, tag, partition) not in written:
+            if (dim, tag) in entities:
+                largest[dim] += 1
+                written[(dim, tag, partition)] = largest[dim]
+            else:
+                written[(dim, tag, partition)] = tag
+        key = (dim, written[(dim, tag, partition)])
+        entity = entities.setdefault(key, Entity(dim, key[1], partition))
+        rows = np.flatnonzero((block.entity == tag) & (block.partition == partition))
+        for grp in np.unique(block.physgrp[rows]).tolist():
+            if grp != 0 and grp not in entity.physicals:
+                entity.physicals.append(grp)
+        unique, first = np.unique(block.tags[rows], return_index=True)
+        rows = rows[np.sort(first)]
+        entity.blocks[block.eletype] = (block.tags[rows], block.nodes[rows])
+    return entities
+
+
+def entity_nodes(entities, node_tags):
+    # Entity key of every node (in node_tags order): the highest dimension entity using it
+    owner = np.full(len(node_tags), -1, dtype=np.int64)
+    keys = sorted(entities, key=lambda key: (-key[0], key[1]))
+    for k, key in enumerate(keys):
+        used = np.unique(np.concatenate([np.ravel(nodes) for tags, nodes in entities[key].blocks.values()]))
+        positions = node_positions(node_tags, used)
+        positions = positions[owner[positions] < 0]
+        owner[positions] = k
+    return keys, owner
+
+
+def write_entities_v4(f, entities, node_tags, node_coords, binary):
+    # Bounding boxes from the nodes of each entity; no boundary entities are listed. Partitioned meshes
+    # list their entities in $PartitionedEntities, with one parent entity per dimension and set of
+    # physical groups in $Entities.
+    boxes = {}
+    for key, entity in entities.items():
+        used = np.concatenate([np.ravel(nodes) for tags, nodes in entity.blocks.values()])
+        coords = node_coords[node_positions(node_tags, used)]
+        boxes[key] = np.concatenate((coords.min(axis=0), coords.max(axis=0)))
+    partitions = max([entity.partition for entity in entities.values()] + [0])
+    if partitions == 0:
+        records = [(entity.dim, entity.tag, boxes[key], entity.physicals, None) for key, entity in sorted(entities.items())]
+        write_entity_section(f, "Entities", records, binary)
+        return
+
+    parents = {}
+    for key, entity in sorted(entities.items()):
+        parent = (entity.dim, tuple(entity.physicals))
+        if parent in parents:
+            box = parents[parent]
+            parents[parent] = np.concatenate((np.minimum(box[:3], boxes[key][:3]), np.maximum(box[3:], boxes[key][3:])))
+        else:
+            parents[parent] = boxes[key]
+    numbers = {}
+    records = []
+    for (dim, physicals), box in sorted(parents.items()):
+        numbers[(dim, physicals)] = len([parent for parent in numbers if parent[0] == dim]) + 1
+        records.append((dim, numbers[(dim, physicals)], box, list(physicals), None))
+    write_entity_section(f, "Entities", records, binary)
+
+    records = []
+    for key, entity in sorted(entities.items()):
+        parent = (entity.dim, numbers[(entity.dim, tuple(entity.physicals))])
+        records.append((entity.dim, entity.tag, boxes[key], entity.physicals, (parent, [entity.partition] if entity.partition > 0 else [])))
+    write_entity_section(f, "PartitionedEntities", records, binary, partitions)
+
+
+def write_entity_section(f, name, records, binary, partitions=None):
+    # records: (dim, tag, box, physicals, partitioned) sorted by dimension, where partitioned is None or
+    # ((parent dim, parent tag), partitions) for $PartitionedEntities, whose header gives the number of
+    # partitions (and no ghost entities)
+    counts = [len([record for record in records if record[0] == dim]) for dim in range(4)]
+    f.write(("$" + name + "\n").encode())
+    if binary:
+        if partitions is not None:
+            f.write(np.array([partitions, 0], dtype="<u8").tobytes())
+        f.write(np.array(counts, dtype="<u8").tobytes())
+    else:
+        if partitions is not None:
+            f.write(("%d\n0\n" % partitions).encode())
+        f.write(("%d %d %d %d\n" % tuple(counts)).encode())
+    for dim, tag, box, physicals, partitioned in records:
+        if dim == 0:
+            box = box[:3]
+        if binary:
+            head = np.array([tag], dtype="<i4").tobytes()
+            if partitioned is not None:
+                (parent_dim, parent_tag), parts = partitioned
+                head = (np.array([tag, parent_dim, parent_tag], dtype="<i4").tobytes() + np.array([len(parts)], dtype="<u8").tobytes() +
+                    np.array(parts, dtype="<i4").tobytes())
+            f.write(head + box.astype("<f8").tobytes() +
+                np.array([len(physicals)], dtype="<u8").tobytes() + np.array(physicals, dtype="<i4").tobytes())
+            if dim > 0:
+                f.write(np.array([0], dtype="<u8").tobytes())
+        else:
+            head = "%d" % tag
+            if partitioned is not None:
+                (parent_dim, parent_tag), parts = partitioned
+                head += " %d %d %d" % (parent_dim, parent_tag, len(parts)) + "".join([" %d" % p for p in parts])
+            f.write((head + " " + " ".join([COORDINATE_FORMAT % v for v in box]) + " %d" % len(physicals) +
+                "".join([" %d" % grp for grp in physicals]) + (" 0\n" if dim > 0 else "\n")).encode())
+    f.write((b"\n" if binary else b"") + ("$End" + name + "\n").encode())
+
+
+def write_nodes_v4(f, entities, node_tags, node_coords, binary):
+    # One block per entity with the nodes it owns (see entity_nodes)
+    keys, owner = entity_nodes(entities, node_tags)
+    order = np.argsort(owner, kind="mergesort")
+    bounds = np.searchsorted(owner[order], np.arange(len(keys) + 1))
+    nblocks = int((np.diff(bounds) > 0).sum())
+    header = [nblocks, len(node_tags), int(np.min(node_tags)) if len(node_tags) > 0 else 0,
+        int(np.max(node_tags)) if len(node_tags) > 0 else 0]
+
+    f.write(b"$Nodes\n")
+    if binary:
+        f.write(np.array(header, dtype="<u8").tobytes())
+    else:
+        f.write(("%d %d %d %d\n" % tuple(header)).encode())
+    for k, key in enumerate(keys):
+        positions = order[bounds[k]:bounds[k+1]]
+        if positions.size == 0:
+            continue
+        if binary:
+            f.write(np.array([key[0], key[1], 0], dtype="<i4").tobytes() + np.array([positions.size], dtype="<u8").tobytes())
+            write_binary_rows(f, np.asarray(node_tags)[positions], "<u8")
+            write_binary_rows(f, np.asarray(node_coords)[positions], "<f8")
+        else:
+            f.write(("%d %d 0 %d\n" % (key[0], key[1], positions.size)).encode())
+            write_rows(EncodedFile(f), "%d\n", [np.asarray(node_tags)[positions]])
+            write_rows(EncodedFile(f), " ".join([COORDINATE_FORMAT] * 3) + "\n", matrix_columns(np.asarray(node_coords)[positions]))
+    f.write((b"\n" if binary else b"") + b"$EndNodes\n")
+
+
+def write_elements_v4(f, entities, binary):
+    blocks = [(key, eletype) for key in sorted(entities) for eletype in sorted(entities[key].blocks)]
+    tags = np.concatenate([np.zeros(0, dtype=np.int64)] + [entities[key].blocks[eletype][0] for key, eletype in blocks])
+    header = [len(blocks), tags.size, int(tags.min()) if tags.size > 0 else 0, int(tags.max()) if tags.size > 0 else 0]
+
+    f.write(b"$Elements\n")
+    if binary:
+        f.write(np.array(header, dtype="<u8").tobytes())
+    else:
+        f.write(("%d %d %d %d\n" % tuple(header)).encode())
+    for key, eletype in blocks:
+        tags, nodes = entities[key].blocks[eletype]
+        if binary:
+            f.write(np.array([key[0], key[1], eletype], dtype="<i4").tobytes() + np.array([tags.size], dtype="<u8").tobytes())
+            write_binary_rows(f, np.column_stack((tags, nodes)), "<u8")
+        else:
+            f.write(("%d %d %d %d\n" % (key[0], key[1], eletype, tags.size)).encode())
+            write_rows(EncodedFile(f), "%d" + " %d" * nodes.shape[1] + "\n", [tags] + matrix_columns(nodes))
+    f.write((b"\n" if binary else b"") + b"$EndElements\n")
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_periodic(f, links, msh4, binary):
+    # MSH 2.2 (always ASCII) writes "Affine" and the 16 values, MSH 4.1 the number of values
+    f.write(b"$Periodic\n")
+    if binary:
+        f.write(np.array([len(links)], dtype="<u8").tobytes())
+    else:
+        f.write(("%d\n" % len(links)).encode())
+    for dim, entity, master, affine, pairs in links:
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        if binary:
+            f.write(np.array([dim, entity, master], dtype="<i4").tobytes() + np.array([len(affine)], dtype="<u8").tobytes() +
+                np.asarray(affine, dtype="<f8").tobytes() + np.array([pairs.shape[0]], dtype="<u8").tobytes())
+            write_binary_rows(f, pairs, "<u8")
+        else:
+            values = " ".join([COORDINATE_FORMAT % v for v in affine])
+            if msh4:
+                f.write(("%d %d %d\n%d%s\n" % (dim, entity, master, len(affine), " " + values if len(affine) > 0 else "")).encode())
+            elif len(affine) > 0:
+                f.write(("%d %d %d\nAffine %s\n" % (dim, entity, master, values)).encode())
+            else:
+                f.write(("%d %d %d\n" % (dim, entity, master)).encode())
+            f.write(("%d\n" % pairs.shape[0]).encode())
+            write_rows(EncodedFile(f), "%d %d\n", matrix_columns(pairs))
+    f.write((b"\n" if binary else b"") + b"$EndPeriodic\n")
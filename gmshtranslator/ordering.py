@@ -0,0 +1,88 @@
+from __future__ import print_function
+import numpy as np
+from .readers import ElementBlock, nodes_per_element_type
+
+# Node ordering conventions. For each convention and gmsh element type, node_orderings holds
+# the permutation p such that nodes_convention = nodes_gmsh[:, p], so that a whole
+# connectivity matrix is reordered with one fancy indexing operation. Element types not
+# listed use the gmsh ordering (all first order elements, for the conventions below).
+
+node_orderings = {
+    "gmsh" : {},
+    "vtk" : {
+        11 : [0, 1, 2, 3, 4, 5, 6, 7, 9, 8],                                                   # 10-node tetrahedron
+        17 : [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 13, 9, 16, 18, 19, 17, 10, 12, 14, 15],           # 20-node hexahedron
+        12 : [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 13, 9, 16, 18, 19, 17, 10, 12, 14, 15,
+              22, 23, 21, 24, 20, 25, 26],                                                     # 27-node hexahedron
+        18 : [0, 1, 2, 3, 4, 5, 6, 9, 7, 12, 14, 13, 8, 10, 11],                               # 15-node prism
+        19 : [0, 1, 2, 3, 4, 5, 8, 10, 6, 7, 9, 11, 12],                                       # 13-node pyramid
+    },
+    "abaqus" : {
+        11 : [0, 1, 2, 3, 4, 5, 6, 7, 9, 8],                                                   # C3D10
+        17 : [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 13, 9, 16, 18, 19, 17, 10, 12, 14, 15],           # C3D20
+        18 : [0, 1, 2, 3, 4, 5, 6, 9, 7, 12, 14, 13, 8, 10, 11],                               # C3D15
+    },
+    "opensees" : {
+        11 : [0, 1, 2, 3, 4, 5, 6, 7, 9, 8],                                                   # TenNodeTetrahedron
+    },
+    "essi" : {},
+}
+
+# Conventions of which only the first order elements are known to follow the gmsh ordering. The
+# permutations of their higher order elements have not been checked, so reordering those raises
+# an error instead of silently keeping the gmsh ordering, until register_ordering() gives one.
+partial_orderings = set(["essi"])
+first_order_types = set([1, 2, 3, 4, 5, 6, 7, 15])
+
+
+
+
+####################################################################################################
+####################################################################################################
+def register_ordering(convention, eletype, permutation):
+    # Add (or replace) the permutation of element type `eletype` for `convention`
+    permutation = np.asarray(permutation, dtype=np.intp)
+    n = nodes_per_element_type[eletype]
+    if permutation.shape != (n,) or not (np.sort(permutation) == np.arange(n)).all():
+        raise ValueError("gmshTranslator: not a permutation of the " + str(n) + " nodes of element type " + str(eletype))
+    node_orderings.setdefault(convention, {})[eletype] = permutation
+
+
+def permutation(eletype, target, source="gmsh"):
+    # Permutation p such that nodes_target = nodes_source[:, p], or None if the orderings coincide
+    for convention in (target, source):
+        if convention not in node_orderings:
+            raise ValueError("gmshTranslator: unknown node ordering \"" + str(convention) + "\"")
+    for convention in (target, source):
+        if convention in partial_orderings and eletype not in first_order_types and eletype not in node_orderings[convention]:
+            raise ValueError("gmshTranslator: the \"" + convention + "\" node ordering of element type " + str(eletype) +
+                " is not known, see register_ordering()")
+    n = nodes_per_element_type[eletype]
+    to_target = np.asarray(node_orderings[target].get(eletype, np.arange(n)), dtype=np.intp)
+    to_source = np.asarray(node_orderings[source].get(eletype, np.arange(n)), dtype=np.intp)
+    p = np.argsort(to_source)[to_target]
+    if (p == np.arange(n)).all():
+        return None
+    return p
+
+
+def reorder(nodes, eletype, target, source="gmsh"):
+    # Connectivity matrix (or single element) `nodes` of element type eletype, reordered
+    p = permutation(eletype, target, source)
+    if p is None:
+        return nodes
+    return np.asarray(nodes)[..., p]
+
+
+def reorder_blocks(blocks, target, source="gmsh"):
+    # {eletype : ElementBlock} with the connectivity of every block in the `target` ordering
+    if target == source:
+        return blocks
+    return dict((eletype, reorder_block(block, target, source)) for eletype, block in blocks.items())
+
+
+def reorder_block(block, target, source="gmsh"):
+    p = permutation(block.eletype, target, source)
+    if p is None:
+        return block
+    return ElementBlock(block.eletype, block.tags, block.physgrp, block.entity, block.nodes[:, p], block.index, block.partition, block.partition_tags)
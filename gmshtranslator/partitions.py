@@ -0,0 +1,99 @@
+from __future__ import print_function
+import numpy as np
+from .membership import MembershipBuilder
+from .ordering import reorder_blocks
+from .writers import write_opensees, write_essi, write_abaqus, write_vtk
+
+# Partitioned meshes: elements grouped by the partition owning them, and the nodes each
+# partition needs split into owned nodes and ghost nodes (owned by another partition). A node
+# shared by several partitions is owned by the lowest numbered one.
+
+# output format -> (writer, node ordering of the format)
+partition_writers = {
+    "opensees" : (write_opensees, "opensees"),
+    "essi" : (write_essi, "essi"),
+    "abaqus" : (write_abaqus, "abaqus"),
+    "vtk" : (write_vtk, "vtk"),
+}
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Partitioning(object):
+    """
+Partitioning
+
+    Partitions of a mesh (`partitions`, sorted) and, for every node used by some element, the
+    partition owning it (node_owner[i] for node node_tags[i]). Partition 0 holds the elements
+    of meshes (or parts of meshes) which are not partitioned.
+    """
+
+    def __init__(self, node_tags, node_coords, element_blocks):
+        self.all_node_tags = node_tags
+        self.all_node_coords = node_coords
+        self.element_blocks = element_blocks
+
+        builder = MembershipBuilder()
+        for block in element_blocks.values():
+            builder.add_block(block.nodes, block.partition)
+        self.membership = builder.finish()
+        self.partitions = np.sort(self.membership.groups)
+
+        nodes, gidx = self.membership.pairs()
+        self.node_tags = self.membership.node_tags
+        if nodes.size > 0:
+            self.node_owner = np.minimum.reduceat(self.membership.groups[gidx], self.membership.indptr[:-1])
+        else:
+            self.node_owner = np.zeros(0, dtype=np.int64)
+
+    def owner_of(self, tags):
+        return self.node_owner[np.searchsorted(self.node_tags, tags)]
+
+    def nodes(self, partition):
+        # Sorted tags of all the nodes of the elements of `partition`
+        return self.membership.nodes_of(partition)
+
+    def owned_nodes(self, partition):
+        nodes = self.nodes(partition)
+        return nodes[self.owner_of(nodes) == partition]
+
+    def ghost_nodes(self, partition):
+        nodes = self.nodes(partition)
+        return nodes[self.owner_of(nodes) != partition]
+
+    def elements(self, partition):
+        # {eletype : ElementBlock} with the elements owned by `partition`
+        blocks = {}
+        for eletype, block in self.element_blocks.items():
+            selection = np.flatnonzero(block.partition == partition)
+            if selection.size > 0:
+                blocks[eletype] = block.take(selection)
+        return blocks
+
+    def arrays(self, partition):
+        # node_tags, node_coords, element_blocks of one partition (owned and ghost nodes)
+        nodes = self.nodes(partition)
+        order = np.argsort(self.all_node_tags, kind="mergesort")
+        position = order[np.searchsorted(self.all_node_tags, nodes, sorter=order)]
+        return nodes, np.asarray(self.all_node_coords[position]), self.elements(partition)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_partition(args):
+    # Writes one partition (called directly or by a worker process): its mesh in format `fmt`
+    # and, if ghosts_filename is given, its ghost nodes as lines "tag owner".
+    fmt, filename, node_tags, node_coords, element_blocks, ordering, groups, options, ghosts_filename, ghosts, owners = args
+    writer, target = partition_writers[fmt]
+    element_blocks = reorder_blocks(element_blocks, target, ordering)
+    if fmt == "vtk":
+        writer(filename, node_tags, node_coords, element_blocks, groups, **options)
+    else:
+        writer(filename, node_tags, node_coords, element_blocks, groups, all_nodes=True, **options)
+    if ghosts_filename is not None:
+        np.savetxt(ghosts_filename, np.column_stack((ghosts, owners)), fmt="%d")
+    return filename
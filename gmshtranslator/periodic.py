@@ -0,0 +1,107 @@
+from __future__ import print_function
+import numpy as np
+
+# Periodic node constraints. The (node, master node) pairs of all the periodic links of a mesh
+# are kept concatenated in flat arrays, with the link each pair comes from, so that
+# constraints are selected, resolved and written with whole-array operations.
+
+
+
+
+####################################################################################################
+####################################################################################################
+class PeriodicConstraints(object):
+    """
+PeriodicConstraints
+
+    Periodic links of a mesh, built from the (dimension, entity, master entity, affine, pairs)
+    tuples given by the readers. Link k maps entity link_entities[k] (dimension link_dims[k])
+    to link_masters[k], with the 4x4 affine transformation affine[k] (identity and
+    has_affine[k] False when the file gives none). Its node pairs are
+    slaves[i], masters[i] for i in link_indptr[k]:link_indptr[k+1], and link[i] = k.
+    """
+
+    def __init__(self, links):
+        nlinks = len(links)
+        self.link_dims = np.array([link[0] for link in links], dtype=np.int64)
+        self.link_entities = np.array([link[1] for link in links], dtype=np.int64)
+        self.link_masters = np.array([link[2] for link in links], dtype=np.int64)
+        self.has_affine = np.array([len(link[3]) == 16 for link in links], dtype=bool)
+        self.affine = np.tile(np.eye(4), (nlinks, 1, 1))
+        if self.has_affine.any():
+            self.affine[self.has_affine] = np.array([link[3] for link in links if len(link[3]) == 16]).reshape(-1, 4, 4)
+
+        counts = np.array([len(link[4]) for link in links], dtype=np.int64)
+        self.link_indptr = np.zeros(nlinks + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.link_indptr[1:])
+        pairs = np.concatenate([np.zeros((0, 2), dtype=np.int64)] + [np.asarray(link[4], dtype=np.int64).reshape(-1, 2) for link in links])
+        self.slaves = pairs[:, 0]
+        self.masters = pairs[:, 1]
+        self.link = np.repeat(np.arange(nlinks), counts)
+        self.resolved = None
+
+    def __len__(self):
+        return self.slaves.size
+
+    def pairs_of(self, k):
+        # (slave, master) node pairs of link k, as an (N,2) array
+        i, j = self.link_indptr[k], self.link_indptr[k+1]
+        return np.column_stack((self.slaves[i:j], self.masters[i:j]))
+
+    def transform(self, k, coords):
+        # Applies the affine transformation of link k to the points `coords` (N,3), ie. gives the
+        # slave positions from the master positions
+        coords = np.asarray(coords, dtype=np.float64)
+        return coords.dot(self.affine[k][:3, :3].T) + self.affine[k][:3, 3]
+
+    def resolve(self):
+        # Transitive master of every constrained node. Nodes tied together by periodic pairs,
+        # directly or through other nodes (corners and edges shared by several links), form a
+        # group; the group is driven by one independent node, the lowest tag among the nodes
+        # that are never slaves (the lowest tag of the group if there is none, for cyclic links).
+        # Returns (nodes, final masters), sorted by node, for every dependent node.
+        if self.resolved is not None:
+            return self.resolved
+        keep = self.slaves != self.masters
+        slaves, masters = self.slaves[keep], self.masters[keep]
+        nodes = np.unique(np.concatenate((slaves, masters)))
+        a = np.searchsorted(nodes, slaves)
+        b = np.searchsorted(nodes, masters)
+
+        #connected components: propagate the smallest index along the pairs, with pointer jumping
+        label = np.arange(nodes.size)
+        while True:
+            new = label.copy()
+            np.minimum.at(new, a, label[b])
+            np.minimum.at(new, b, label[a])
+            new = new[new]
+            if (new == label).all():
+                break
+            label = new
+
+        #driving node of every component: independent nodes first, then lowest tag
+        dependent = np.zeros(nodes.size, dtype=bool)
+        dependent[a] = True
+        order = np.lexsort((nodes, dependent, label))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = label[order][1:] != label[order][:-1]
+        driver = np.empty(nodes.size, dtype=np.int64)
+        driver[label[order][first]] = nodes[order][first]
+        final = driver[label]
+
+        constrained = final != nodes
+        self.resolved = (nodes[constrained], final[constrained])
+        return self.resolved
+
+    def master_of(self, tags):
+        # Final master of each of `tags` (the tag itself for nodes which are not constrained)
+        nodes, final = self.resolve()
+        tags = np.asarray(tags, dtype=np.int64)
+        if nodes.size == 0:
+            return tags.copy()
+        i = np.minimum(np.searchsorted(nodes, tags), nodes.size - 1)
+        return np.where(nodes[i] == tags, final[i], tags)
+
+    def independent_nodes(self):
+        # Tags of the nodes driving at least one constrained node
+        return np.unique(self.resolve()[1])
@@ -0,0 +1,198 @@
+from __future__ import print_function
+import inspect
+import threading
+from .instrumentation import clock
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Threaded pipeline for parse(pipeline=True): a source (reading chunks of the file) and a chain of
+# stages (parsing them into arrays) run in their own threads, connected by bounded queues, while
+# the calling thread applies the rules. File reads and numpy parsing release the GIL for most of
+# their time, so reading, parsing and the rules overlap. A stage which gets ahead of the next one
+# blocks on its full output queue, which bounds memory to about queue_size chunks per stage.
+#
+# AsyncAction moves a rule action out of the pipeline too: calls are queued and run by a thread
+# of their own (or awaited, for coroutine functions), so that slow sinks do not stall the rules.
+
+QUEUE_SIZE = 4          # chunks waiting between two stages
+POLL_INTERVAL = 0.1     # seconds between checks for a stopped pipeline while blocked on a queue
+
+END = object()          # end of the items of a queue
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Failure(object):
+    """
+Failure
+
+    An exception raised in a stage, passed down the queues to be raised again by the consumer.
+    """
+
+    def __init__(self, error):
+        self.error = error
+
+
+class Pipeline(object):
+    """
+Pipeline
+
+    Iterating over it yields stages[-1](...(stages[0](item))) for every item of `source`, in
+    order. The source and every stage run in their own thread; seconds[k] is the time spent
+    in the source (k = 0) and in each stage, wait_seconds the time the consumer waited for
+    items. Leaving the loop early stops the threads.
+    """
+
+    def __init__(self, source, stages=(), queue_size=QUEUE_SIZE):
+        self.source = source
+        self.stages = list(stages)
+        self.queues = [queue.Queue(queue_size) for k in range(len(self.stages) + 1)]
+        self.seconds = [0.0] * (len(self.stages) + 1)
+        self.wait_seconds = 0.0
+        self.items = 0
+        self.stopped = threading.Event()
+
+    def __iter__(self):
+        threads = [threading.Thread(target=self.__run_source__)]
+        threads += [threading.Thread(target=self.__run_stage__, args=(k,)) for k in range(len(self.stages))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            while True:
+                start = clock()
+                item = self.queues[-1].get()
+                self.wait_seconds += clock() - start
+                if item is END:
+                    break
+                if isinstance(item, Failure):
+                    raise item.error
+                self.items += 1
+                yield item
+        finally:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
+
+    def __put__(self, output, item):
+        # False if the pipeline was stopped before there was room for item
+        while not self.stopped.is_set():
+            try:
+                output.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __get__(self, source):
+        while not self.stopped.is_set():
+            try:
+                return source.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return END
+
+    def __run_source__(self):
+        output = self.queues[0]
+        try:
+            items = iter(self.source)
+            while True:
+                start = clock()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                self.seconds[0] += clock() - start
+                if not self.__put__(output, item):
+                    return
+        except Exception as error:
+            self.__put__(output, Failure(error))
+            return
+        self.__put__(output, END)
+
+    def __run_stage__(self, k):
+        function, source, output = self.stages[k], self.queues[k], self.queues[k+1]
+        while True:
+            item = self.__get__(source)
+            if item is END or isinstance(item, Failure):
+                self.__put__(output, item)
+                return
+            try:
+                start = clock()
+                item = function(item)
+                self.seconds[k+1] += clock() - start
+            except Exception as error:
+                self.__put__(output, Failure(error))
+                return
+            if not self.__put__(output, item):
+                return
+
+
+
+
+####################################################################################################
+####################################################################################################
+class AsyncAction(object):
+    """
+AsyncAction
+
+    Rule action run in the background. Calling it queues its arguments (waiting while queue_size
+    calls are pending) and returns at once; a thread makes the calls in order. Coroutine
+    functions are awaited, in an event loop of that thread or, if given, in `loop` (which must
+    be running in another thread). join() waits for the pending calls and raises the first
+    error of the action; parse() calls it at the end.
+    """
+
+    def __init__(self, action, queue_size=QUEUE_SIZE, loop=None):
+        self.action = action
+        self.coroutine = getattr(inspect, "iscoroutinefunction", lambda f: False)(action)
+        self.loop = loop
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self.error = None
+        self.__name__ = getattr(action, "__name__", "async_action")
+
+    def __call__(self, *args):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run__)
+            self.thread.daemon = True
+            self.thread.start()
+        self.queue.put(args)
+
+    def __run__(self):
+        own_loop = None
+        if self.coroutine and self.loop is None:
+            import asyncio
+            own_loop = asyncio.new_event_loop()
+        while True:
+            args = self.queue.get()
+            if args is END:
+                break
+            if self.error is not None:
+                continue        # the remaining calls are dropped after an error
+            try:
+                if not self.coroutine:
+                    self.action(*args)
+                elif own_loop is not None:
+                    own_loop.run_until_complete(self.action(*args))
+                else:
+                    import asyncio
+                    asyncio.run_coroutine_threadsafe(self.action(*args), self.loop).result()
+            except Exception as error:
+                self.error = error
+        if own_loop is not None:
+            own_loop.close()
+
+    def join(self):
+        if self.thread is not None:
+            self.queue.put(END)
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
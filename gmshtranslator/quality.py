@@ -0,0 +1,323 @@
+from __future__ import print_function
+import numpy as np
+from .renumbering import Renumbering
+
+# Element quality metrics computed in bulk: for every element its size (length, area or volume),
+# its scaled Jacobian and its edge ratio, with inverted and degenerate elements flagged, and
+# summaries (including bounding boxes) per physical group. Elements are processed a chunk of
+# one type at a time with numpy, so the cost is a few array operations per chunk.
+#
+# The metrics use the corner nodes of the elements only (higher order elements start with the
+# corner nodes of the first order element), so the curvature of higher order elements is not
+# taken into account.
+#
+# The scaled Jacobian at a corner is the determinant of the edges leaving it divided by the
+# product of their lengths, scaled so that the ideal (equilateral) element has 1; an element
+# gets the smallest value over its corners. Simplices have one determinant, divided by the
+# largest product over the corners, so that a mirror image gets exactly the opposite value.
+# It is negative for inverted elements and close to 0 for degenerate (flat) ones. Surface elements have no orientation of their own: the sign is
+# taken with respect to the z axis for meshes in the xy plane, and is always positive otherwise.
+# The edge ratio is the longest edge over the shortest one.
+
+CHUNK_SIZE = 10000      # elements processed at once (small enough for the temporaries to stay in cache)
+TOLERANCE = 1e-6        # |scaled Jacobian| below which an element is degenerate
+
+
+# Corners as lists [corner, a, b(, c)] such that the edges corner->a, corner->b(, corner->c) form
+# a right handed frame in a positively oriented element, with the gmsh node ordering. Pyramid
+# apexes are left out (their four edges have no single frame).
+tetrahedron_corners = [[0, 1, 2, 3], [1, 2, 0, 3], [2, 0, 1, 3], [3, 0, 2, 1]]
+hexahedron_corners = [[0, 1, 3, 4], [1, 2, 0, 5], [2, 3, 1, 6], [3, 0, 2, 7],
+    [4, 7, 5, 0], [5, 4, 6, 1], [6, 5, 7, 2], [7, 6, 4, 3]]
+prism_corners = [[0, 1, 2, 3], [1, 2, 0, 4], [2, 0, 1, 5], [3, 5, 4, 0], [4, 3, 5, 1], [5, 4, 3, 2]]
+pyramid_corners = [[0, 1, 3, 4], [1, 2, 0, 4], [2, 3, 1, 4], [3, 0, 2, 4]]
+triangle_corners = [[0, 1, 2], [1, 2, 0], [2, 0, 1]]
+quadrangle_corners = [[0, 1, 3], [1, 2, 0], [2, 3, 1], [3, 0, 2]]
+line_corners = [[0, 1]]
+
+# Edges by local corner node numbers
+tetrahedron_edges = [[0, 1], [1, 2], [2, 0], [0, 3], [1, 3], [2, 3]]
+hexahedron_edges = [[0, 1], [1, 2], [2, 3], [3, 0], [4, 5], [5, 6], [6, 7], [7, 4], [0, 4], [1, 5], [2, 6], [3, 7]]
+prism_edges = [[0, 1], [1, 2], [2, 0], [3, 4], [4, 5], [5, 3], [0, 3], [1, 4], [2, 5]]
+pyramid_edges = [[0, 1], [1, 2], [2, 3], [3, 0], [0, 4], [1, 4], [2, 4], [3, 4]]
+triangle_edges = [[0, 1], [1, 2], [2, 0]]
+quadrangle_edges = [[0, 1], [1, 2], [2, 3], [3, 0]]
+line_edges = [[0, 1]]
+
+# Prisms and pyramids are integrated as hexahedra with collapsed nodes
+prism_as_hexahedron = [0, 1, 2, 2, 3, 4, 5, 5]
+pyramid_as_hexahedron = [0, 1, 2, 3, 4, 4, 4, 4]
+
+def corner_frames(corners, edges):
+    # Frames of the corners as edge numbers [corner, k] and the product of their signs [corner]
+    # (-1 for the edge corner->k stored as k->corner): the determinant of a frame is the sign
+    # times the determinant of the edge vectors.
+    numbers = dict((tuple(edge), k) for k, edge in enumerate(edges))
+    frames = [[numbers[(c[0], k)] if (c[0], k) in numbers else numbers[(k, c[0])] for k in c[1:]] for c in corners]
+    signs = [np.prod([1. if (c[0], k) in numbers else -1. for k in c[1:]]) for c in corners]
+    return np.array(frames), np.array(signs)[:, np.newaxis]
+
+
+# gmsh element type -> (dimension, scale of the scaled Jacobian, edges, corner frames and signs (see corner_frames),
+# simplex, nodes as a hexahedron). Simplices have the same determinant at all their corners.
+element_shapes = {}
+for eletypes, dim, corners, scale, edges, hexahedron in [
+        ((4, 11, 29, 30, 31), 3, tetrahedron_corners, np.sqrt(2.), tetrahedron_edges, None),
+        ((5, 12, 17, 92, 93), 3, hexahedron_corners, 1., hexahedron_edges, list(range(8))),
+        ((6, 13, 18), 3, prism_corners, 2. / np.sqrt(3.), prism_edges, prism_as_hexahedron),
+        ((7, 14, 19), 3, pyramid_corners, np.sqrt(2.), pyramid_edges, pyramid_as_hexahedron),
+        ((2, 9, 20, 21, 22, 23, 24, 25), 2, triangle_corners, 2. / np.sqrt(3.), triangle_edges, None),
+        ((3, 10, 16), 2, quadrangle_corners, 1., quadrangle_edges, None),
+        ((1, 8, 26, 27, 28), 1, line_corners, 1., line_edges, None)]:
+    frames, signs = corner_frames(corners, edges)
+    for eletype in eletypes:
+        element_shapes[eletype] = (dim, scale, np.array(edges), frames, signs, np.max(edges) == dim, hexahedron)
+
+
+def hexahedron_gauss_derivatives():
+    # Derivatives of the trilinear shape functions at the 2x2x2 Gauss points (all weights 1):
+    # array [point, direction, node]. This rule integrates the Jacobian determinant exactly.
+    reference = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+        [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]], dtype=float)
+    g = 1. / np.sqrt(3.)
+    points = reference * g
+    derivatives = np.empty((8, 3, 8))
+    for d in range(3):
+        factors = 1. + reference[np.newaxis, :, :] * points[:, np.newaxis, :]
+        factors[:, :, d] = reference[np.newaxis, :, d]
+        derivatives[:, d, :] = np.prod(factors, axis=2) / 8.
+    return derivatives
+
+hexahedron_derivatives = hexahedron_gauss_derivatives()
+
+
+
+
+####################################################################################################
+####################################################################################################
+def cross(a, b):
+    # Cross products of vectors given by components a[0], a[1], a[2] (arrays of any shape)
+    return np.array([a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]])
+
+
+def triple(a, b, c):
+    # Determinants [a, b, c] = a . (b x c), vectors given by components
+    return a[0] * (b[1] * c[2] - b[2] * c[1]) + a[1] * (b[2] * c[0] - b[0] * c[2]) + a[2] * (b[0] * c[1] - b[1] * c[0])
+
+
+def norm(a):
+    return np.sqrt(a[0] * a[0] + a[1] * a[1] + a[2] * a[2])
+
+
+def element_metrics(eletype, corners, planar=False):
+    # Size, scaled Jacobian and edge ratio of elements of type eletype with corner coordinates
+    # `corners` [xyz, corner, element]: components first and elements last, so that every
+    # operation runs over long contiguous rows.
+    dim, scale, edges, frames, signs, simplex, hexahedron = element_shapes[eletype]
+    vectors = corners[:, edges[:, 1]] - corners[:, edges[:, 0]]     #[xyz, edge, element]
+    lengths = norm(vectors)
+    shortest = lengths.min(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(shortest > 0, lengths.max(axis=0) / np.where(shortest > 0, shortest, 1.), np.inf)
+
+    if dim == 1:
+        return lengths[0], (lengths[0] > 0).astype(float), ratio
+
+    norms = lengths[frames].prod(axis=1)     #[corner, element]
+    if simplex:
+        #one determinant, divided by the largest product over the corners whatever its sign: the
+        #worst corner of the element, and a mirror image scores exactly minus the element
+        frames, signs = frames[:1], signs[:1]
+        norms = norms.max(axis=0)[np.newaxis]
+    edge = [vectors[:, frames[:, k]] for k in range(frames.shape[1])]     #[xyz, corner, element]
+    if dim == 2:
+        normals = cross(edge[0], edge[1]) * signs
+        if simplex:
+            area = 0.5 * normals[:, 0]
+        else:
+            area = 0.5 * cross(corners[:, 2] - corners[:, 0], corners[:, 3] - corners[:, 1])
+        if planar:
+            size = area[2]
+            determinants = normals[2]
+        else:
+            size = norm(area)
+            unit = area / np.where(size > 0, size, 1.)
+            determinants = normals[0] * unit[0] + normals[1] * unit[1] + normals[2] * unit[2]
+    else:
+        determinants = triple(edge[0], edge[1], edge[2]) * signs
+        if hexahedron is None:
+            size = determinants[0] / 6.
+        else:
+            #Jacobians [direction, xyz, point, element] at the Gauss points, with a single matrix product
+            nodes = corners[:, hexahedron].transpose(1, 0, 2).reshape(8, -1)
+            jacobians = np.dot(hexahedron_derivatives.reshape(24, 8), nodes).reshape(8, 3, 3, -1).transpose(1, 2, 0, 3)
+            size = triple(jacobians[0], jacobians[1], jacobians[2]).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = np.where(norms > 0, determinants / np.where(norms > 0, norms, 1.), 0.)
+    return size, np.clip(scale * scaled.min(axis=0), -1., 1.), ratio
+
+
+def group_reduce(keys, values, ufunc):
+    # (unique keys, ufunc reduction of the rows of values with each key)
+    if keys.size > 0 and (keys == keys[0]).all():
+        return keys[:1], ufunc.reduce(values, axis=0)[np.newaxis]
+    order = np.argsort(keys, kind="mergesort")
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[starts], ufunc.reduceat(values[order], starts, axis=0)
+
+
+
+
+####################################################################################################
+####################################################################################################
+class ElementQuality(object):
+    """
+ElementQuality
+
+    Metrics of the elements of one gmsh element type: `tags` and `physgrp` as in the ElementBlock,
+    and one value per element in `size` (signed length, area or volume), `jacobian` (smallest
+    scaled Jacobian) and `aspect_ratio` (longest over shortest edge). `inverted` and `degenerate`
+    are boolean masks of the flagged elements.
+    """
+
+    def __init__(self, eletype, tags, physgrp, size, jacobian, aspect_ratio, tolerance=TOLERANCE):
+        self.eletype = eletype
+        self.tags = tags
+        self.physgrp = physgrp
+        self.size = size
+        self.jacobian = jacobian
+        self.aspect_ratio = aspect_ratio
+        self.inverted = jacobian < -tolerance
+        self.degenerate = np.abs(jacobian) <= tolerance
+
+    def __len__(self):
+        return self.tags.shape[0]
+
+
+class GroupQuality(object):
+    """
+GroupQuality
+
+    Summary of the metrics of the elements of one physical group: number of elements, total,
+    smallest and largest size, smallest scaled Jacobian, largest and mean edge ratio, number of
+    inverted and degenerate elements, and bounding box (lower and upper corner) of their nodes.
+    """
+
+    def __init__(self, physgrp, name=None):
+        self.physgrp = physgrp
+        self.name = name
+        self.elements = 0
+        self.size = 0.0
+        self.min_size = np.inf
+        self.max_size = -np.inf
+        self.min_jacobian = np.inf
+        self.max_aspect_ratio = 0.0
+        self.aspect_ratio_sum = 0.0
+        self.inverted = 0
+        self.degenerate = 0
+        self.lower = np.full(3, np.inf)
+        self.upper = np.full(3, -np.inf)
+
+    def mean_aspect_ratio(self):
+        return self.aspect_ratio_sum / self.elements if self.elements > 0 else 0.0
+
+    def as_dict(self):
+        return {"physgrp" : self.physgrp, "name" : self.name, "elements" : self.elements, "size" : float(self.size),
+            "min_size" : float(self.min_size), "max_size" : float(self.max_size), "min_jacobian" : float(self.min_jacobian),
+            "max_aspect_ratio" : float(self.max_aspect_ratio), "mean_aspect_ratio" : float(self.mean_aspect_ratio()),
+            "inverted" : self.inverted, "degenerate" : self.degenerate,
+            "bounds" : (self.lower.tolist(), self.upper.tolist())}
+
+
+
+
+####################################################################################################
+####################################################################################################
+class MeshQuality(object):
+    """
+MeshQuality
+
+    Element metrics of a mesh given as arrays (node_tags, node_coords, element_blocks in gmsh node
+    ordering): `elements` maps each element type to an ElementQuality, `groups` each physical
+    group to a GroupQuality. `types` restricts the element types (points are always left out).
+    progress(done, total) is called after every chunk.
+    """
+
+    def __init__(self, node_tags, node_coords, element_blocks, types=None, tolerance=TOLERANCE, names=None,
+            chunk_size=CHUNK_SIZE, progress=None):
+        self.tolerance = tolerance
+        self.elements = {}
+        self.groups = {}
+        names = names or {}
+        positions = Renumbering(node_tags, 0)
+        coordinates = np.ascontiguousarray(np.asarray(node_coords, dtype=float).T)
+        self.planar = node_coords.shape[0] == 0 or bool(np.all(node_coords[:, 2] == node_coords[0, 2]))
+
+        blocks = [block for eletype, block in sorted(element_blocks.items())
+            if eletype in element_shapes and (types is None or eletype in types)]
+        total = sum([len(block) for block in blocks])
+        done = 0
+        for block in blocks:
+            ncorners = element_shapes[block.eletype][2].max() + 1
+            n = len(block)
+            size, jacobian, ratio = np.empty(n), np.empty(n), np.empty(n)
+            for start in range(0, n, chunk_size):
+                stop = min(n, start + chunk_size)
+                nodes = np.asarray(block.nodes[start:stop])
+                points = coordinates[:, positions.new(nodes.T)]      #[xyz, node, element]
+                size[start:stop], jacobian[start:stop], ratio[start:stop] = element_metrics(block.eletype,
+                    points[:, :ncorners], self.planar)
+                self.__summarize__(np.asarray(block.physgrp[start:stop]), size[start:stop], jacobian[start:stop],
+                    ratio[start:stop], points.min(axis=1).T, points.max(axis=1).T, names)
+                done += stop - start
+                if progress is not None:
+                    progress(done, total)
+            self.elements[block.eletype] = ElementQuality(block.eletype, block.tags, block.physgrp, size, jacobian,
+                ratio, tolerance)
+
+
+    def __summarize__(self, physgrp, size, jacobian, ratio, lower, upper, names):
+        finite = np.where(np.isfinite(ratio), ratio, 0.)
+        counts = np.column_stack([np.ones(size.shape), size, finite, jacobian < -self.tolerance,
+            np.abs(jacobian) <= self.tolerance])
+        keys, sums = group_reduce(physgrp, counts, np.add)
+        keys, minima = group_reduce(physgrp, np.column_stack([size, jacobian, lower]), np.minimum)
+        keys, maxima = group_reduce(physgrp, np.column_stack([size, ratio, upper]), np.maximum)
+        for k, grp in enumerate(keys.tolist()):
+            if grp not in self.groups:
+                self.groups[grp] = GroupQuality(grp, names.get(grp))
+            summary = self.groups[grp]
+            summary.elements += int(sums[k, 0])
+            summary.size += sums[k, 1]
+            summary.aspect_ratio_sum += sums[k, 2]
+            summary.inverted += int(sums[k, 3])
+            summary.degenerate += int(sums[k, 4])
+            summary.min_size = min(summary.min_size, minima[k, 0])
+            summary.min_jacobian = min(summary.min_jacobian, minima[k, 1])
+            summary.lower = np.minimum(summary.lower, minima[k, 2:])
+            summary.max_size = max(summary.max_size, maxima[k, 0])
+            summary.max_aspect_ratio = max(summary.max_aspect_ratio, maxima[k, 1])
+            summary.upper = np.maximum(summary.upper, maxima[k, 2:])
+
+
+    def flagged(self, kind="inverted"):
+        # Sorted tags of the inverted (kind = "inverted") or degenerate (kind = "degenerate") elements
+        tags = [quality.tags[getattr(quality, kind)] for quality in self.elements.values()]
+        return np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + tags))
+
+
+    def as_dict(self):
+        return dict((grp, self.groups[grp].as_dict()) for grp in sorted(self.groups))
+
+
+    def report(self):
+        # Text table of the group summaries
+        lines = ["%-8s %-20s %10s %14s %10s %10s %10s %10s" % ("group", "name", "elements", "size", "min jac",
+            "max ratio", "inverted", "degenerate")]
+        for grp in sorted(self.groups):
+            s = self.groups[grp]
+            lines.append("%-8s %-20s %10d %14.6g %10.4f %10.4g %10d %10d" % (grp, (s.name or "")[:20], s.elements, s.size,
+                s.min_jacobian, s.max_aspect_ratio, s.inverted, s.degenerate))
+        return "\n".join(lines)
@@ -0,0 +1,622 @@
+from __future__ import print_function
+import numpy as np
+from itertools import islice
+from .compressed import open_mesh, map_array
+
+# Bulk (array based) readers for the sections of a .msh file. These work on whole
+# sections at a time instead of line by line, so that no per-node or per-element
+# python code is executed.
+
+BLOCKSIZE = 1 << 24   # 16 MB reads when scanning the file
+
+# Number of nodes for each gmsh element type
+nodes_per_element_type = {
+    1  : 2,    # 2-node line.
+    2  : 3,    # 3-node triangle.
+    3  : 4,    # 4-node quadrangle.
+    4  : 4,    # 4-node tetrahedron.
+    5  : 8,    # 8-node hexahedron.
+    6  : 6,    # 6-node prism.
+    7  : 5,    # 5-node pyramid.
+    8  : 3,    # 3-node second order line.
+    9  : 6,    # 6-node second order triangle.
+    10 : 9,    # 9-node second order quadrangle.
+    11 : 10,   # 10-node second order tetrahedron.
+    12 : 27,   # 27-node second order hexahedron.
+    13 : 18,   # 18-node second order prism.
+    14 : 14,   # 14-node second order pyramid.
+    15 : 1,    # 1-node point.
+    16 : 8,    # 8-node second order quadrangle.
+    17 : 20,   # 20-node second order hexahedron.
+    18 : 15,   # 15-node second order prism.
+    19 : 13,   # 13-node second order pyramid.
+    20 : 9,    # 9-node third order incomplete triangle.
+    21 : 10,   # 10-node third order triangle.
+    22 : 12,   # 12-node fourth order incomplete triangle.
+    23 : 15,   # 15-node fourth order triangle.
+    24 : 15,   # 15-node fifth order incomplete triangle.
+    25 : 21,   # 21-node fifth order complete triangle.
+    26 : 4,    # 4-node third order edge.
+    27 : 5,    # 5-node fourth order edge.
+    28 : 6,    # 6-node fifth order edge.
+    29 : 20,   # 20-node third order tetrahedron.
+    30 : 35,   # 35-node fourth order tetrahedron.
+    31 : 56,   # 56-node fifth order tetrahedron.
+    92 : 64,   # 64-node third order hexahedron.
+    93 : 125,  # 125-node fourth order hexahedron.
+}
+
+
+
+
+####################################################################################################
+####################################################################################################
+class ElementBlock(object):
+    """
+ElementBlock
+
+    All the elements of one gmsh element type. `tags`, `physgrp`, `entity`, `index` and
+    `partition` are vectors with one entry per element, `nodes` is the (Nelements x Nnodes)
+    connectivity matrix. `index` is the position of each element within the $Elements
+    section, so that file order can be recovered after grouping by type. `partition` is the
+    partition owning the element (0 if the mesh is not partitioned). `partition_tags` keeps the
+    raw MSH 2.2 partition tags (owner, then the negated ghost partitions) as a matrix padded
+    with zeros, or is None when the elements have no such tags.
+    """
+
+    def __init__(self, eletype, tags, physgrp, entity, nodes, index, partition=None, partition_tags=None):
+        self.eletype = eletype
+        self.tags = tags
+        self.physgrp = physgrp
+        self.entity = entity
+        self.nodes = nodes
+        self.index = index
+        if partition is None:
+            partition = np.zeros(len(tags), dtype=np.int32)
+        self.partition = partition
+        self.partition_tags = partition_tags
+
+    def __len__(self):
+        return self.tags.shape[0]
+
+    def take(self, selection):
+        return ElementBlock(self.eletype, self.tags[selection], self.physgrp[selection],
+            self.entity[selection], self.nodes[selection], self.index[selection], self.partition[selection],
+            None if self.partition_tags is None else self.partition_tags[selection])
+
+    def partitions_of(self, i):
+        # (npartitions, parts) of element i as the line parser gives them to element rules: the number
+        # of partition tags and the tags as strings. (0, []) if the element has no partitions.
+        if self.partition_tags is not None:
+            parts = self.partition_tags[i]
+            parts = parts[parts != 0]
+        elif self.partition[i] > 0:
+            parts = self.partition[i:i + 1]
+        else:
+            parts = []
+        return np.int32(len(parts)), [str(p) for p in parts]
+
+
+
+
+####################################################################################################
+####################################################################################################
+def concatenate_blocks(blocklists):
+    # Merge several {eletype : ElementBlock} dictionaries (eg. read in pieces) into one.
+    merged = {}
+    for blocks in blocklists:
+        for eletype, block in blocks.items():
+            merged.setdefault(eletype, []).append(block)
+
+    result = {}
+    for eletype, pieces in merged.items():
+        if len(pieces) == 1:
+            result[eletype] = pieces[0]
+        else:
+            result[eletype] = ElementBlock(eletype,
+                np.concatenate([b.tags for b in pieces]),
+                np.concatenate([b.physgrp for b in pieces]),
+                np.concatenate([b.entity for b in pieces]),
+                np.concatenate([b.nodes for b in pieces]),
+                np.concatenate([b.index for b in pieces]),
+                np.concatenate([b.partition for b in pieces]),
+                concatenate_partition_tags(pieces))
+    return result
+
+
+def concatenate_partition_tags(pieces):
+    # Partition tags of several blocks, padded with zeros to the widest one (None if no block has them)
+    if all(b.partition_tags is None for b in pieces):
+        return None
+    width = max(b.partition_tags.shape[1] for b in pieces if b.partition_tags is not None)
+    padded = []
+    for b in pieces:
+        tags = np.zeros((len(b), width), dtype=np.int64)
+        if b.partition_tags is not None:
+            tags[:, :b.partition_tags.shape[1]] = b.partition_tags
+        padded.append(tags)
+    return np.concatenate(padded)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def find_line(f, token):
+    # Advance f (binary mode) until the line starting with `token`. Leaves the file
+    # positioned right after that line and returns the line, or None at end of file.
+    for line in iter(f.readline, b""):
+        if line.startswith(token):
+            return line
+    return None
+
+
+def find_marker(f, marker, blocksize=BLOCKSIZE):
+    # Offset of the next occurrence of `marker` starting at the current position of f.
+    # The position of f is not changed.
+    start = f.tell()
+    position = start
+    tail = b""
+    try:
+        while True:
+            chunk = f.read(blocksize)
+            if not chunk:
+                return -1
+            window = tail + chunk
+            found = window.find(marker)
+            if found >= 0:
+                return position - len(tail) + found
+            position += len(chunk)
+            tail = window[-(len(marker) - 1):]
+    finally:
+        f.seek(start)
+
+
+def skip_lines(f, nlines, blocksize=BLOCKSIZE):
+    # Advances f by nlines lines, counting newlines in large blocks
+    position = f.tell()
+    while nlines > 0:
+        chunk = f.read(blocksize)
+        if not chunk:
+            raise IOError("gmshTranslator: unexpected end of file")
+        count = chunk.count(b"\n")
+        if count >= nlines:
+            end = -1
+            for i in range(nlines):
+                end = chunk.find(b"\n", end + 1)
+            f.seek(position + end + 1)
+            return
+        nlines -= count
+        position += len(chunk)
+
+
+def read_section_body(f, name, blocksize=BLOCKSIZE):
+    # Reads everything from the current position up to the "$End<name>" line with a single
+    # read call. Leaves the file positioned after the "$End<name>" line.
+    end = find_marker(f, b"$End" + name, blocksize)
+    if end < 0:
+        raise IOError("gmshTranslator: could not find $End" + name.decode())
+    data = f.read(end - f.tell())
+    f.readline()
+    return data
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Section(object):
+    """
+Section
+
+    Location of a "$Name" ... "$EndName" section in the file: `header` is the byte offset of the
+    "$Name" line, `start` the offset of the first byte after it and `end` the offset of the
+    "$EndName" line. `line` is the line number of the first line of the section body and `nlines`
+    the number of lines in the body (both None when not counted, eg. for binary files).
+    """
+
+    def __init__(self, header, start, end=None, line=None, nlines=None):
+        self.header = header
+        self.start = start
+        self.end = end
+        self.line = line
+        self.nlines = nlines
+
+    def __repr__(self):
+        return "Section(header=%s, start=%s, end=%s, line=%s, nlines=%s)" % (self.header, self.start, self.end, self.line, self.nlines)
+
+
+def count_lines(f, start, end, blocksize=BLOCKSIZE):
+    # Number of newlines between byte offsets start and end
+    f.seek(start)
+    count = 0
+    while start < end:
+        chunk = f.read(min(blocksize, end - start))
+        if not chunk:
+            break
+        count += chunk.count(b"\n")
+        start += len(chunk)
+    return count
+
+
+def end_marker_offset(f, name):
+    # f was just positioned after the "$End<name>" line: returns the offset of that line
+    after = f.tell()
+    back = min(after, len(name) + 64)
+    f.seek(after - back)
+    tail = f.read(back)
+    return after - back + tail.rfind(b"$End" + name)
+
+
+def index_sections(f, count=True, blocksize=BLOCKSIZE):
+    # Locates all the sections of the file, returning {name : Section}. Section bodies are not
+    # read line by line: the "$End<name>" marker is searched for in large blocks. With
+    # count=True (ASCII files) the lines of every section are counted too.
+    sections = {}
+    f.seek(0)
+    nline = 0
+    for line in iter(f.readline, b""):
+        nline += 1
+        if not line.startswith(b"$"):
+            continue
+        name = line.strip()[1:]
+        start = f.tell()
+        end = find_marker(f, b"$End" + name, blocksize)
+        if end < 0:
+            break
+        nlines = count_lines(f, start, end, blocksize) if count else None
+        sections[name.decode()] = Section(start - len(line), start, end, nline + 1 if count else None, nlines)
+        f.seek(end)
+        f.readline()
+        if count:
+            nline += nlines + 1
+    return sections
+
+
+
+
+####################################################################################################
+####################################################################################################
+def count_tokens_per_line(data):
+    # Number of whitespace separated tokens in every line of `data` (bytes), computed
+    # on the raw characters without splitting into python strings.
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    blank = buf <= 32
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    newlines = np.flatnonzero(buf == 10)
+    line_of_token = np.searchsorted(newlines, np.flatnonzero(starts))
+    counts = np.bincount(line_of_token, minlength=newlines.size + 1)
+    return counts[counts > 0]
+
+
+def parse_ascii_nodes(data, nnodes=None):
+    # data holds lines "tag x y z". Returns tags (int64) and an (N,3) float64 array.
+    values = np.fromstring(data, dtype=np.float64, sep=" ") if len(data) > 0 else np.zeros(0)
+    if values.size % 4 != 0 or (nnodes is not None and values.size != 4 * nnodes):
+        raise ValueError("gmshTranslator: malformed $Nodes section")
+    values = values.reshape(-1, 4)
+    tags = values[:, 0].astype(np.int64)
+    coords = np.ascontiguousarray(values[:, 1:])
+    return tags, coords
+
+
+def parse_ascii_elements(data, nelem=None, first_index=0):
+    # data holds lines "tag type ntags tags... nodes...". Returns {eletype : ElementBlock}.
+    # Elements with different numbers of tags or types can be mixed freely, every
+    # column is located with index arithmetic over the whole token array.
+    if len(data) == 0:
+        return {}
+    tokens = np.fromstring(data, dtype=np.int64, sep=" ")
+    counts = count_tokens_per_line(data)
+    if counts.sum() != tokens.size or (nelem is not None and counts.size != nelem):
+        raise ValueError("gmshTranslator: malformed $Elements section")
+
+    linestart = np.cumsum(counts) - counts
+    eletypes = tokens[linestart + 1]
+    ntags = tokens[linestart + 2]
+    if np.any(ntags < 2):
+        bad = tokens[linestart[np.flatnonzero(ntags < 2)[0]]]
+        raise ValueError("gmshTranslator: .msh file has < 2 tags element with tag " + str(bad))
+
+    blocks = {}
+    for eletype in np.unique(eletypes):
+        eletype = int(eletype)
+        if eletype not in nodes_per_element_type:
+            raise ValueError("gmshTranslator: unknown element type " + str(eletype))
+        nnodes = nodes_per_element_type[eletype]
+
+        which = np.flatnonzero(eletypes == eletype)
+        start = linestart[which]
+        if np.any(counts[which] != 3 + ntags[which] + nnodes):
+            raise ValueError("gmshTranslator: wrong number of nodes for element type " + str(eletype))
+
+        firstnode = start + 3 + ntags[which]
+        nodes = tokens[firstnode[:, np.newaxis] + np.arange(nnodes)]
+        #partitioned meshes: tags are physical, elementary, number of partitions, owner, -ghost partitions...
+        partition = np.zeros(which.size, dtype=np.int32)
+        partitioned = ntags[which] >= 4
+        partition[partitioned] = np.abs(tokens[start[partitioned] + 6])
+        blocks[eletype] = ElementBlock(eletype, tokens[start], tokens[start + 3],
+            tokens[start + 4], nodes, which + first_index, partition,
+            ascii_partition_tags(tokens, start, ntags[which]))
+    return blocks
+
+
+def ascii_partition_tags(tokens, start, ntags):
+    # Raw partition tags of the elements starting at tokens[start] (see ElementBlock), None if none has any
+    npartitions = np.where(ntags >= 3, tokens[np.minimum(start + 5, tokens.size - 1)], 0)
+    width = int(npartitions.max()) if npartitions.size > 0 else 0
+    if width == 0:
+        return None
+    columns = np.arange(width)
+    position = np.minimum(start[:, np.newaxis] + 6 + columns, tokens.size - 1)
+    return np.where(columns < npartitions[:, np.newaxis], tokens[position], 0)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def read_mesh_format(f):
+    # Reads the $MeshFormat section (f positioned anywhere before it). Returns
+    # (version, binary, datasize, byteorder) where byteorder is "<" or ">".
+    if find_line(f, b"$MeshFormat") is None:
+        return 2.2, False, 8, "<"
+    sl = f.readline().split()
+    version = float(sl[0])
+    binary = int(sl[1]) == 1
+    datasize = int(sl[2])
+    byteorder = "<"
+    if binary:
+        one = f.read(4)
+        byteorder = "<" if np.frombuffer(one, dtype="<i4")[0] == 1 else ">"
+        f.readline()
+    find_line(f, b"$EndMeshFormat")
+    return version, binary, datasize, byteorder
+
+
+def read_physical_names(f):
+    # Reads the body of $PhysicalNames (f positioned after the "$PhysicalNames" line).
+    # Returns two dictionaries: physical group -> dimension and physical group -> name.
+    dims = {}
+    names = {}
+    nphys = int(f.readline())
+    for i in range(nphys):
+        sl = f.readline().decode().split()
+        grpdim  = np.int32(sl[0])  # spatial dimension of the physical group (0 = point, 1 = line, 2 = surface, 3 = volume)
+        physgrp = np.int32(sl[1])  # group number
+        grpname = ( " ".join(sl[2:]) )[1:-1]  # strip quotation marks
+        dims[physgrp] = grpdim
+        names[physgrp] = grpname
+    return dims, names
+
+
+def read_array(f, dtype, count):
+    # Reads `count` binary values of type dtype from f
+    dtype = np.dtype(dtype)
+    data = f.read(dtype.itemsize * count)
+    if len(data) != dtype.itemsize * count:
+        raise IOError("gmshTranslator: unexpected end of file")
+    return np.frombuffer(data, dtype=dtype, count=count)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def map_binary_nodes(f, filename, offset, nnodes, byteorder="<"):
+    # Binary MSH 2.2 $Nodes: nnodes records (int tag, 3 doubles) starting at byte `offset`.
+    # The records are memory mapped, so the returned tags and (N,3) coordinates are views
+    # on the file: nothing is read until the data is used (compressed files are read, see
+    # map_array).
+    dtype = np.dtype([("tag", byteorder + "i4"), ("xyz", byteorder + "f8", (3,))])
+    if nnodes == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros((0, 3)), offset
+    records = map_array(f, filename, dtype, offset, (nnodes,))
+    return records["tag"], records["xyz"], offset + dtype.itemsize * nnodes
+
+
+def map_binary_elements(f, filename, nelem, byteorder="<"):
+    # Binary MSH 2.2 $Elements (f positioned after the number of elements). Elements come in
+    # runs of a single type, each run preceded by a header (type, number of elements, number
+    # of tags). Every run is memory mapped as an array of records and its columns are used
+    # directly as tags, physical groups and connectivity. Types spanning several runs are
+    # concatenated. Leaves f positioned after the elements.
+    header = np.dtype(byteorder + "i4")
+    pieces = []
+    index = 0
+    position = f.tell()
+    while index < nelem:
+        f.seek(position)
+        eletype, n, ntags = [int(v) for v in read_array(f, header, 3)]
+        if eletype not in nodes_per_element_type:
+            raise ValueError("gmshTranslator: unknown element type " + str(eletype))
+        if ntags < 2:
+            raise ValueError("gmshTranslator: .msh file has < 2 tags element of type " + str(eletype))
+        dtype = np.dtype([("tag", header), ("tags", header, (ntags,)),
+            ("nodes", header, (nodes_per_element_type[eletype],))])
+        records = map_array(f, filename, dtype, position + 12, (n,))
+        pieces.append({eletype : ElementBlock(eletype, records["tag"], records["tags"][:, 0],
+            records["tags"][:, 1], records["nodes"], np.arange(index, index + n), binary_partition(records["tags"]),
+            binary_partition_tags(records["tags"]))})
+        index += n
+        position += 12 + dtype.itemsize * n
+    f.seek(position)
+    return concatenate_blocks(pieces)
+
+
+def binary_partition(tags):
+    # Owner partition from the (N x ntags) tags of binary elements, see parse_ascii_elements
+    if tags.shape[1] >= 4:
+        return np.abs(tags[:, 3]).astype(np.int32)
+    return None
+
+
+def binary_partition_tags(tags):
+    # Raw partition tags from the (N x ntags) tags of binary elements, see ElementBlock
+    if tags.shape[1] < 4:
+        return None
+    columns = np.arange(tags.shape[1] - 3)
+    return np.where(columns < tags[:, 2, np.newaxis], tags[:, 3:], 0).astype(np.int64)
+
+
+def read_periodic_v2(f):
+    # Body of $Periodic in MSH 2.2 (always ASCII). Same output as msh4.read_periodic.
+    links = []
+    nlinks = int(f.readline())
+    for i in range(nlinks):
+        dim, entity, master = [int(v) for v in f.readline().split()]
+        line = f.readline()
+        affine = np.zeros(0)
+        if line.startswith(b"Affine"):
+            affine = np.array(line.split()[1:], dtype=np.float64)
+            line = f.readline()
+        npairs = int(line)
+        pairs = np.zeros((npairs, 2), dtype=np.int64)
+        if npairs > 0:
+            pairs = np.array(b" ".join(f.readline() for p in range(npairs)).split(),
+                dtype=np.int64).reshape(npairs, 2)
+        links.append((dim, entity, master, affine, pairs))
+    find_line(f, b"$EndPeriodic")
+    return links
+
+
+
+
+####################################################################################################
+####################################################################################################
+# Chunked readers. Each of these yields at most chunk_size nodes or elements at a time, so that
+# memory use does not depend on the size of the mesh. Element chunks are ElementBlocks of a
+# single type; their `index` member gives the position of the elements in the file.
+
+def iter_ascii_line_chunks(f, nlines, chunk_size):
+    # Unparsed chunks of an ASCII section: (lines before the chunk, lines in the chunk, bytes)
+    done = 0
+    while done < nlines:
+        n = min(chunk_size, nlines - done)
+        yield done, n, b"".join(islice(f, n))
+        done += n
+
+
+def iter_ascii_node_chunks(f, nnodes, chunk_size):
+    done = 0
+    while done < nnodes:
+        n = min(chunk_size, nnodes - done)
+        yield parse_ascii_nodes(b"".join(islice(f, n)), n)
+        done += n
+
+
+def iter_ascii_element_chunks(f, nelem, chunk_size, types=None):
+    done = 0
+    while done < nelem:
+        n = min(chunk_size, nelem - done)
+        blocks = parse_ascii_elements(b"".join(islice(f, n)), n, first_index=done)
+        for eletype in sorted(blocks):
+            if types is None or eletype in types:
+                yield blocks[eletype]
+        done += n
+
+
+def iter_binary_node_chunks(f, filename, offset, nnodes, chunk_size, byteorder="<"):
+    itemsize = 4 + 3 * 8
+    for start in range(0, nnodes, chunk_size):
+        n = min(chunk_size, nnodes - start)
+        tags, coords, end = map_binary_nodes(f, filename, offset + start * itemsize, n, byteorder)
+        yield tags, coords
+
+
+def iter_binary_element_chunks(f, filename, nelem, chunk_size, byteorder="<", types=None):
+    # Same layout as in map_binary_elements. Runs of types not in `types` are skipped without
+    # being read.
+    header = np.dtype(byteorder + "i4")
+    index = 0
+    position = f.tell()
+    while index < nelem:
+        f.seek(position)
+        eletype, n, ntags = [int(v) for v in read_array(f, header, 3)]
+        if eletype not in nodes_per_element_type:
+            raise ValueError("gmshTranslator: unknown element type " + str(eletype))
+        dtype = np.dtype([("tag", header), ("tags", header, (ntags,)),
+            ("nodes", header, (nodes_per_element_type[eletype],))])
+        if (types is None or eletype in types) and n > 0:
+            for start in range(0, n, chunk_size):
+                chunk = map_array(f, filename, dtype, position + 12 + start * dtype.itemsize, (min(chunk_size, n - start),))
+                yield ElementBlock(eletype, chunk["tag"], chunk["tags"][:, 0], chunk["tags"][:, 1],
+                    chunk["nodes"], np.arange(index + start, index + start + len(chunk)), binary_partition(chunk["tags"]),
+                    binary_partition_tags(chunk["tags"]))
+        index += n
+        position += 12 + dtype.itemsize * n
+    f.seek(position)
+
+
+
+
+####################################################################################################
+####################################################################################################
+# Parallel parsing of ASCII sections. The section is split into byte ranges that start and end
+# at line boundaries; each range is parsed by a worker process and the results are joined in
+# range order, so the outcome is identical to a sequential read.
+
+def split_byte_range(f, start, end, nparts):
+    bounds = [start]
+    for k in range(1, nparts):
+        target = start + (end - start) * k // nparts
+        if target <= bounds[-1]:
+            continue
+        f.seek(target - 1)
+        f.readline()    # move to the beginning of the next line
+        position = min(f.tell(), end)
+        if position > bounds[-1]:
+            bounds.append(position)
+    if bounds[-1] < end:
+        bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_byte_range(filename, start, end):
+    with open_mesh(filename) as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def parse_node_range(args):
+    filename, start, end = args
+    return parse_ascii_nodes(read_byte_range(filename, start, end))
+
+
+def parse_element_range(args):
+    filename, start, end = args
+    data = read_byte_range(filename, start, end)
+    return parse_ascii_elements(data), count_tokens_per_line(data).size
+
+
+def parallel_parse_nodes(pool, filename, f, end, nnodes, nparts):
+    # Nodes from the current position of f up to byte `end`
+    ranges = split_byte_range(f, f.tell(), end, nparts)
+    results = pool.map(parse_node_range, [(filename, a, b) for a, b in ranges])
+    if len(results) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+    tags = np.concatenate([r[0] for r in results])
+    if tags.size != nnodes:
+        raise ValueError("gmshTranslator: malformed $Nodes section")
+    return tags, np.concatenate([r[1] for r in results])
+
+
+def parallel_parse_elements(pool, filename, f, end, nelem, nparts):
+    # Elements from the current position of f up to byte `end`. Each worker numbers its elements
+    # from 0; the index is shifted by the number of elements in the preceding ranges.
+    ranges = split_byte_range(f, f.tell(), end, nparts)
+    results = pool.map(parse_element_range, [(filename, a, b) for a, b in ranges])
+    first = 0
+    pieces = []
+    for blocks, count in results:
+        for block in blocks.values():
+            block.index += first
+        pieces.append(blocks)
+        first += count
+    if first != nelem:
+        raise ValueError("gmshTranslator: malformed $Elements section")
+    return concatenate_blocks(pieces)
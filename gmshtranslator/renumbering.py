@@ -0,0 +1,112 @@
+from __future__ import print_function
+import numpy as np
+from .readers import ElementBlock
+
+# Dense renumbering of node and element tags. gmsh tags may be sparse (merged or partitioned
+# meshes) while solvers usually want consecutive numbers, so a Renumbering maps the original
+# tags to start, start+1, ... and back, vectorized in both directions.
+
+try:
+    import scipy.sparse
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+except ImportError:
+    reverse_cuthill_mckee = None
+
+TABLE_FILL = 4     # use a direct lookup table when max tag < TABLE_FILL x number of tags
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Renumbering(object):
+    """
+Renumbering
+
+    Map between original tags and new numbers: the entity numbered start+i had the original
+    tag old_tags[i]. new(tags) and old(numbers) convert arrays (or scalars) in either direction.
+    """
+
+    def __init__(self, old_tags, start=1):
+        self.old_tags = np.asarray(old_tags, dtype=np.int64)
+        self.start = start
+        self.size = self.old_tags.size
+        maxtag = int(self.old_tags.max()) if self.size > 0 else -1
+        if maxtag < TABLE_FILL * self.size + 1024:
+            self.table = -np.ones(maxtag + 1, dtype=np.int64)
+            self.table[self.old_tags] = np.arange(self.size)
+            self.order = None
+        else:
+            self.table = None
+            self.order = np.argsort(self.old_tags, kind="mergesort")
+
+    def new(self, tags):
+        tags = np.asarray(tags, dtype=np.int64)
+        if self.table is not None:
+            inside = (tags >= 0) & (tags < self.table.size)
+            index = np.where(inside, self.table[np.where(inside, tags, 0)], -1)
+        elif self.size > 0:
+            i = self.order[np.minimum(np.searchsorted(self.old_tags, tags, sorter=self.order), self.size - 1)]
+            index = np.where(self.old_tags[i] == tags, i, -1)
+        else:
+            index = -np.ones(tags.shape, dtype=np.int64)
+        if (index < 0).any():
+            raise ValueError("gmshTranslator: tag " + str(tags[index < 0].ravel()[0]) + " is not renumbered")
+        return index + self.start
+
+    def old(self, numbers):
+        return self.old_tags[np.asarray(numbers) - self.start]
+
+    def __len__(self):
+        return self.size
+
+
+
+
+####################################################################################################
+####################################################################################################
+def compact_renumbering(tags, start=1):
+    # Numbers following the order of the original tags
+    return Renumbering(np.unique(tags), start)
+
+
+def rcm_renumbering(node_tags, element_blocks, start=1):
+    # Reverse Cuthill-McKee order of the node adjacency graph (nodes sharing an element),
+    # which reduces the bandwidth of the stiffness matrix. Needs scipy.
+    if reverse_cuthill_mckee is None:
+        raise ImportError("gmshTranslator: reverse Cuthill-McKee renumbering needs scipy")
+    node_tags = np.asarray(node_tags, dtype=np.int64)
+    position = Renumbering(node_tags, start=0)
+    rows = []
+    cols = []
+    nelem = 0
+    for block in element_blocks.values():
+        n, k = block.nodes.shape
+        rows.append(np.repeat(np.arange(nelem, nelem + n), k))
+        cols.append(position.new(np.ravel(block.nodes)))
+        nelem += n
+    rows = np.concatenate([np.zeros(0, dtype=np.int64)] + rows)
+    cols = np.concatenate([np.zeros(0, dtype=np.int64)] + cols)
+    incidence = scipy.sparse.csr_matrix((np.ones(rows.size, dtype=np.int32), (rows, cols)), shape=(nelem, node_tags.size))
+    adjacency = incidence.T.dot(incidence).tocsr()
+    permutation = reverse_cuthill_mckee(adjacency, symmetric_mode=True)
+    return Renumbering(node_tags[permutation], start)
+
+
+def bandwidth(element_blocks, renumbering):
+    # Largest difference between the new numbers of two nodes of the same element
+    width = 0
+    for block in element_blocks.values():
+        if len(block) > 0:
+            numbers = renumbering.new(block.nodes)
+            width = max(width, int((numbers.max(axis=1) - numbers.min(axis=1)).max()))
+    return width
+
+
+def renumber_blocks(element_blocks, nodes, elements):
+    # element_blocks with element tags and connectivity given by the new numbers
+    result = {}
+    for eletype, block in element_blocks.items():
+        result[eletype] = ElementBlock(eletype, elements.new(block.tags), block.physgrp, block.entity,
+            nodes.new(block.nodes), block.index, block.partition, block.partition_tags)
+    return result
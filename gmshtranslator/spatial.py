@@ -0,0 +1,109 @@
+from __future__ import print_function
+import numpy as np
+
+# Spatial queries over the node coordinates, to select nodes by position with a few array
+# operations instead of calling a condition for every node. Nodes are kept sorted by x, so
+# boxes (and axis aligned planes) only look at the nodes in a slab of x. Radius and nearest
+# node queries use a k-d tree when scipy is available, and the same slabs otherwise.
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+
+
+####################################################################################################
+####################################################################################################
+def tag_mask(selected, tags):
+    # Boolean mask: which of `tags` are in the sorted array `selected`
+    tags = np.asarray(tags)
+    if selected.size == 0:
+        return np.zeros(tags.shape, dtype=bool)
+    i = np.minimum(np.searchsorted(selected, tags), selected.size - 1)
+    return selected[i] == tags
+
+
+
+
+####################################################################################################
+####################################################################################################
+class SpatialIndex(object):
+    """
+SpatialIndex
+
+    Index over the coordinates of the nodes node_tags. Queries return the sorted tags of the
+    nodes found (nearest() returns them by increasing distance).
+    """
+
+    def __init__(self, node_tags, node_coords):
+        self.node_tags = np.asarray(node_tags, dtype=np.int64)
+        self.node_coords = np.asarray(node_coords, dtype=np.float64)
+        self.order = np.argsort(self.node_coords[:, 0], kind="mergesort")
+        self.sorted_x = self.node_coords[self.order, 0]
+        self.tree = None
+
+    def __len__(self):
+        return self.node_tags.size
+
+    def __kdtree__(self):
+        if self.tree is None and cKDTree is not None:
+            self.tree = cKDTree(self.node_coords)
+        return self.tree
+
+    def __slab__(self, xmin, xmax):
+        # Positions of the nodes with xmin <= x <= xmax
+        return self.order[np.searchsorted(self.sorted_x, xmin, side="left"):np.searchsorted(self.sorted_x, xmax, side="right")]
+
+    def __tags__(self, positions):
+        return np.sort(self.node_tags[positions])
+
+    def in_box(self, lower, upper):
+        # Nodes with lower <= coordinates <= upper (both 3-vectors, use -inf/inf for open sides)
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        positions = self.__slab__(lower[0], upper[0])
+        coords = self.node_coords[positions]
+        inside = ((coords[:, 1:] >= lower[1:]) & (coords[:, 1:] <= upper[1:])).all(axis=1)
+        return self.__tags__(positions[inside])
+
+    def within(self, center, radius):
+        # Nodes at distance <= radius from center
+        center = np.asarray(center, dtype=np.float64)
+        tree = self.__kdtree__()
+        if tree is not None:
+            positions = np.asarray(tree.query_ball_point(center, radius), dtype=np.int64)
+        else:
+            positions = self.__slab__(center[0] - radius, center[0] + radius)
+            distance = np.sqrt(((self.node_coords[positions] - center)**2).sum(axis=1))
+            positions = positions[distance <= radius]
+        return self.__tags__(positions)
+
+    def on_plane(self, point, normal, tolerance=1e-6):
+        # Nodes at distance <= tolerance from the plane through `point` with normal `normal`
+        point = np.asarray(point, dtype=np.float64)
+        normal = np.asarray(normal, dtype=np.float64)
+        normal = normal / np.sqrt((normal**2).sum())
+        axis = np.flatnonzero(normal != 0)
+        if axis.size == 1:
+            #x, y or z = constant: a thin box
+            lower = np.full(3, -np.inf)
+            upper = np.full(3, np.inf)
+            lower[axis[0]] = point[axis[0]] - tolerance
+            upper[axis[0]] = point[axis[0]] + tolerance
+            return self.in_box(lower, upper)
+        distance = np.abs((self.node_coords - point).dot(normal))
+        return self.__tags__(np.flatnonzero(distance <= tolerance))
+
+    def nearest(self, point, k=1):
+        # The k nodes closest to `point`, closest first
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, self.node_tags.size)
+        tree = self.__kdtree__()
+        if tree is not None:
+            distance, positions = tree.query(point, k=k)
+            return self.node_tags[np.atleast_1d(positions)]
+        distance = ((self.node_coords - point)**2).sum(axis=1)
+        positions = np.argpartition(distance, k - 1)[:k] if k > 0 else np.zeros(0, dtype=np.int64)
+        return self.node_tags[positions[np.argsort(distance[positions], kind="mergesort")]]
@@ -0,0 +1,233 @@
+from __future__ import print_function
+import numpy as np
+from .renumbering import Renumbering
+
+# Mesh topology from the connectivity arrays: node -> element and element -> element (across
+# shared faces, or edges for surface meshes) adjacency in CSR form, and boundary faces. All of
+# it is computed with sorts over the whole mesh, never element by element.
+
+
+# Facets (faces of volume elements, edges of surface elements, end points of lines) by local
+# corner node numbers, with the gmsh node ordering. Higher order elements start with the
+# corner nodes of the first order element, so they share these tables.
+tetrahedron_facets = [[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]
+hexahedron_facets = [[0, 3, 2, 1], [0, 1, 5, 4], [0, 4, 7, 3], [1, 2, 6, 5], [2, 3, 7, 6], [4, 5, 6, 7]]
+prism_facets = [[0, 2, 1], [3, 4, 5], [0, 1, 4, 3], [0, 3, 5, 2], [1, 2, 5, 4]]
+pyramid_facets = [[0, 3, 2, 1], [0, 1, 4], [1, 2, 4], [2, 3, 4], [3, 0, 4]]
+triangle_facets = [[0, 1], [1, 2], [2, 0]]
+quadrangle_facets = [[0, 1], [1, 2], [2, 3], [3, 0]]
+line_facets = [[0], [1]]
+
+# gmsh element type -> (dimension, facets)
+element_facets = {}
+for eletypes, dim, facets in [
+        ((4, 11, 29, 30, 31), 3, tetrahedron_facets),
+        ((5, 12, 17, 92, 93), 3, hexahedron_facets),
+        ((6, 13, 18), 3, prism_facets),
+        ((7, 14, 19), 3, pyramid_facets),
+        ((2, 9, 20, 21, 22, 23, 24, 25), 2, triangle_facets),
+        ((3, 10, 16), 2, quadrangle_facets),
+        ((1, 8, 26, 27, 28), 1, line_facets)]:
+    for eletype in eletypes:
+        element_facets[eletype] = (dim, facets)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def csr_from_pairs(rows, cols, nrows):
+    # CSR (indptr, indices) of the (rows[i], cols[i]) pairs, sorted by row then column
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(nrows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=nrows), out=indptr[1:])
+    return indptr, cols[order]
+
+
+class Facets(object):
+    """
+Facets
+
+    A set of element facets: facet i is local facet local_facet[i] of the element with tag
+    element_tags[i] (type element_types[i]). nodes[i] holds the tags of its corner nodes,
+    padded with -1 when triangles and quadrangles are mixed.
+    """
+
+    def __init__(self, element_tags, element_types, local_facet, nodes):
+        self.element_tags = element_tags
+        self.element_types = element_types
+        self.local_facet = local_facet
+        self.nodes = nodes
+
+    def __len__(self):
+        return self.element_tags.size
+
+
+
+
+####################################################################################################
+####################################################################################################
+class Topology(object):
+    """
+Topology
+
+    Elements are numbered 0..Nelements-1 by type and file order: element i has tag
+    element_tags[i], type element_types[i] and physical group element_physgrp[i] (the first
+    one listed). Nodes are numbered by their position in node_tags.
+
+    group_indptr, element_groups : element -> all its physical groups (CSR), for elements
+        repeated once per physical group (MSH 4 entities with several physical tags).
+    node_indptr, node_elements  : node -> elements containing it (CSR)
+    element_indptr, element_neighbours : element -> elements sharing a facet with it (CSR),
+        built by element_adjacency() for elements of the same dimension.
+    """
+
+    def __init__(self, node_tags, element_blocks, types=None):
+        self.node_tags = np.asarray(node_tags, dtype=np.int64)
+        self.node_position = Renumbering(self.node_tags, start=0)
+
+        tags, eletypes, physgrp, connectivity = [], [], [], []
+        members, groups = [], []
+        nelements = 0
+        for eletype in sorted(element_blocks):
+            if types is not None and eletype not in types:
+                continue
+            block = element_blocks[eletype]
+            #elements repeated once per physical group (MSH 4) are counted once
+            unique, first, inverse = np.unique(block.tags, return_index=True, return_inverse=True)
+            #number of each element (by its first row) in file order, for every row
+            rank = np.empty(first.size, dtype=np.int64)
+            rank[np.argsort(first)] = np.arange(nelements, nelements + first.size)
+            members.append(rank[np.ravel(inverse)])
+            groups.append(np.asarray(block.physgrp, dtype=np.int64))
+            nelements += first.size
+            first = np.sort(first)
+            tags.append(np.asarray(block.tags[first], dtype=np.int64))
+            eletypes.append(np.full(first.size, eletype, dtype=np.int64))
+            physgrp.append(np.asarray(block.physgrp[first], dtype=np.int64))
+            connectivity.append(self.node_position.new(block.nodes[first]))
+
+        self.element_tags = np.concatenate([np.zeros(0, dtype=np.int64)] + tags)
+        self.element_types = np.concatenate([np.zeros(0, dtype=np.int64)] + eletypes)
+        self.element_physgrp = np.concatenate([np.zeros(0, dtype=np.int64)] + physgrp)
+        self.block_types = [int(e[0]) if e.size > 0 else 0 for e in eletypes]
+        self.connectivity = connectivity          # per type, node positions
+        self.first_element = np.cumsum([0] + [c.shape[0] for c in connectivity])
+        self.element_position = Renumbering(self.element_tags, start=0)
+
+        #element -> physical groups, each (element, group) pair once
+        pairs = np.unique(np.column_stack((np.concatenate([np.zeros(0, dtype=np.int64)] + members),
+            np.concatenate([np.zeros(0, dtype=np.int64)] + groups))), axis=0)
+        self.group_indptr, self.element_groups = csr_from_pairs(pairs[:, 0], pairs[:, 1], self.element_tags.size)
+
+        #node -> element
+        rows = np.concatenate([np.zeros(0, dtype=np.int64)] + [np.ravel(c) for c in connectivity])
+        cols = np.concatenate([np.zeros(0, dtype=np.int64)] +
+            [np.repeat(np.arange(self.first_element[k], self.first_element[k+1]), c.shape[1]) for k, c in enumerate(connectivity)])
+        self.node_indptr, self.node_elements = csr_from_pairs(rows, cols, self.node_tags.size)
+        self.element_indptr = None
+        self.element_neighbours = None
+
+    def elements_of(self, node_tag):
+        # Tags of the elements containing node `node_tag`
+        i = int(self.node_position.new(node_tag))
+        return self.element_tags[self.node_elements[self.node_indptr[i]:self.node_indptr[i+1]]]
+
+    def groups_of(self, element_tag):
+        # Physical groups of element `element_tag`
+        i = int(self.element_position.new(element_tag))
+        return self.element_groups[self.group_indptr[i]:self.group_indptr[i+1]]
+
+    def in_groups(self, physgrp):
+        # Boolean mask over elements: which belong to one of the physical groups physgrp
+        hits = np.isin(self.element_groups, np.atleast_1d(physgrp))
+        selection = np.zeros(self.element_tags.size, dtype=bool)
+        selection[np.repeat(np.arange(self.element_tags.size), np.diff(self.group_indptr))[hits]] = True
+        return selection
+
+    def node_valence(self):
+        # Number of elements containing each node (in node_tags order)
+        return np.diff(self.node_indptr)
+
+    def facets(self, selection=None):
+        # Facets of the elements in `selection` (boolean mask over elements), or of all of them:
+        # element numbers, local facet numbers and corner node positions (padded with -1 to 4).
+        elements, local, corners = [], [], []
+        for k, c in enumerate(self.connectivity):
+            eletype = self.block_types[k]
+            if eletype not in element_facets:
+                continue
+            numbers = np.arange(self.first_element[k], self.first_element[k+1])
+            if selection is not None:
+                keep = selection[numbers]
+                numbers, c = numbers[keep], c[keep]
+            for f, facet in enumerate(element_facets[eletype][1]):
+                corner = -np.ones((c.shape[0], 4), dtype=np.int64)
+                corner[:, :len(facet)] = c[:, facet]
+                elements.append(numbers)
+                local.append(np.full(numbers.size, f, dtype=np.int64))
+                corners.append(corner)
+        if len(elements) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.int64)
+        return np.concatenate(elements), np.concatenate(local), np.concatenate(corners)
+
+    def __match_facets__(self, selection):
+        # Facets grouped by their (unordered) corner nodes: returns elements, local facet, corners,
+        # and for every facet the index of its group and the number of facets in the group.
+        elements, local, corners = self.facets(selection)
+        key = np.sort(corners, axis=1)
+        if key.shape[0] == 0:
+            return elements, local, corners, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        order = np.lexsort(key.T[::-1])
+        key = key[order]
+        new = np.ones(key.shape[0], dtype=bool)
+        new[1:] = (key[1:] != key[:-1]).any(axis=1)
+        group = np.empty(key.shape[0], dtype=np.int64)
+        group[order] = np.cumsum(new) - 1
+        return elements, local, corners, group, np.bincount(group)
+
+    def element_adjacency(self, dim=None):
+        # element -> element CSR through shared facets, for the elements of dimension dim (the
+        # highest dimension present by default)
+        dims = self.element_dims()
+        if dim is None:
+            dim = dims.max() if dims.size > 0 else 0
+        elements, local, corners, group, count = self.__match_facets__(dims == dim)
+        shared = count[group] == 2
+        elements, group = elements[shared], group[shared]
+        order = np.argsort(group, kind="mergesort")
+        pairs = elements[order].reshape(-1, 2)
+        rows = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        cols = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        self.element_indptr, self.element_neighbours = csr_from_pairs(rows, cols, self.element_tags.size)
+        return self.element_indptr, self.element_neighbours
+
+    def neighbours_of(self, element_tag):
+        # Tags of the elements sharing a facet with element `element_tag`
+        if self.element_indptr is None:
+            self.element_adjacency()
+        i = int(self.element_position.new(element_tag))
+        return self.element_tags[self.element_neighbours[self.element_indptr[i]:self.element_indptr[i+1]]]
+
+    def element_dims(self):
+        # Dimension of every element (0 for types without facets, eg. points)
+        dims = [element_facets.get(eletype, (0, None))[0] for eletype in self.block_types]
+        return np.repeat(np.array(dims, dtype=np.int64), np.diff(self.first_element))
+
+    def boundary_facets(self, physgrp=None, dim=None):
+        # Facets belonging to only one of the selected elements: the elements of physical group
+        # physgrp (any group if None) and dimension dim (the highest present if None).
+        dims = self.element_dims()
+        selection = np.ones(self.element_tags.size, dtype=bool)
+        if physgrp is not None:
+            selection &= self.in_groups(physgrp)
+        if dim is None:
+            dim = dims[selection].max() if selection.any() else 0
+        selection &= dims == dim
+
+        elements, local, corners, group, count = self.__match_facets__(selection)
+        boundary = count[group] == 1 if group.size > 0 else np.zeros(0, dtype=bool)
+        elements, local, corners = elements[boundary], local[boundary], corners[boundary]
+        width = int((corners >= 0).sum(axis=1).max()) if corners.shape[0] > 0 else 0
+        nodes = np.where(corners[:, :width] >= 0, self.node_tags[np.maximum(corners[:, :width], 0)], -1)
+        return Facets(self.element_tags[elements], self.element_types[elements], local, nodes)
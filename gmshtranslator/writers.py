@@ -0,0 +1,261 @@
+from __future__ import print_function
+import numpy as np
+
+# Bulk writers for solver input formats, driven by the array representation of the mesh
+# (node_tags, node_coords, element_blocks, see readers.py). Lines are not formatted one by
+# one: a template for a whole chunk of rows is built and filled with a single % operation,
+# so python code runs once per chunk and writing is limited by the disk.
+
+CHUNK_SIZE = 100000          # rows formatted at once
+FLOAT_FORMAT = "%.16g"
+
+# gmsh element type -> VTK cell type
+vtk_cell_types = {
+    1  : 3,     # line
+    2  : 5,     # triangle
+    3  : 9,     # quadrangle
+    4  : 10,    # tetrahedron
+    5  : 12,    # hexahedron
+    6  : 13,    # prism (wedge)
+    7  : 14,    # pyramid
+    8  : 21,    # 3-node line
+    9  : 22,    # 6-node triangle
+    10 : 28,    # 9-node quadrangle
+    11 : 24,    # 10-node tetrahedron
+    12 : 29,    # 27-node hexahedron
+    15 : 1,     # point
+    16 : 23,    # 8-node quadrangle
+    17 : 25,    # 20-node hexahedron
+    18 : 26,    # 15-node prism
+    19 : 27,    # 13-node pyramid
+}
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_rows(f, template, columns, chunk_size=CHUNK_SIZE):
+    # Writes one line per row: `template` % (columns[0][i], columns[1][i], ...). columns are
+    # vectors of the same length (numpy arrays, memmaps or lists).
+    n = len(columns[0]) if len(columns) > 0 else 0
+    k = len(columns)
+    for start in range(0, n, chunk_size):
+        stop = min(n, start + chunk_size)
+        values = [None] * ((stop - start) * k)
+        for j, column in enumerate(columns):
+            values[j::k] = np.asarray(column[start:stop]).tolist()
+        f.write((template * (stop - start)) % tuple(values))
+
+
+def matrix_columns(matrix):
+    return [matrix[:, j] for j in range(matrix.shape[1])]
+
+
+def selected_blocks(element_blocks, groups):
+    # Yields (grp, ElementBlock) with the elements of each physical group in `groups` (any
+    # iterable of group numbers), by element type and in file order.
+    for eletype in sorted(element_blocks):
+        block = element_blocks[eletype]
+        for grp in groups:
+            selection = np.flatnonzero(block.physgrp == grp)
+            if selection.size > 0:
+                yield grp, block.take(selection)
+
+
+def used_nodes(node_tags, node_coords, blocks):
+    # Nodes connected to at least one of the elements in `blocks`
+    if len(blocks) == 0:
+        return node_tags[:0], node_coords[:0]
+    used = np.unique(np.concatenate([np.ravel(block.nodes) for block in blocks]))
+    keep = np.isin(node_tags, used)
+    return node_tags[keep], node_coords[keep]
+
+
+def node_positions(node_tags, nodes):
+    # Positions in node_tags (0 based) of the node tags in `nodes`
+    order = np.argsort(node_tags, kind="mergesort")
+    return order[np.searchsorted(node_tags, nodes, sorter=order)]
+
+
+def as_tuple(args):
+    if args is None:
+        return ()
+    if isinstance(args, (tuple, list)):
+        return tuple(args)
+    return (args,)
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_opensees(filename, node_tags, node_coords, element_blocks, groups, language="tcl", ndm=3, ndf=3,
+        all_nodes=False):
+    # groups: {physical group : (OpenSees element name, extra arguments)}, the extra arguments
+    # (a tuple, eg. (matTag,) or (thickness, "PlaneStrain", matTag)) follow the element nodes.
+    # language is "tcl" (element stdBrick 1 ...) or "python" (ops.element('stdBrick', 1, ...)).
+    python = language in ("py", "python")
+    blocks = list(selected_blocks(element_blocks, groups))
+    if not all_nodes:
+        node_tags, node_coords = used_nodes(node_tags, node_coords, [block for grp, block in blocks])
+
+    with open(filename, "w") as f:
+        if python:
+            f.write("import openseespy.opensees as ops\n\n")
+            f.write("ops.model('basic', '-ndm', %d, '-ndf', %d)\n\n" % (ndm, ndf))
+            template = "ops.node(%d" + (", " + FLOAT_FORMAT) * ndm + ")\n"
+        else:
+            f.write("model BasicBuilder -ndm %d -ndf %d\n\n" % (ndm, ndf))
+            template = "node %d" + (" " + FLOAT_FORMAT) * ndm + "\n"
+        write_rows(f, template, [node_tags] + matrix_columns(node_coords[:, :ndm]))
+        f.write("\n")
+
+        for grp, block in blocks:
+            name, args = groups[grp]
+            args = as_tuple(args)
+            nnodes = block.nodes.shape[1]
+            if python:
+                extra = "".join(", " + repr(a).replace("%", "%%") for a in args)
+                template = "ops.element(" + repr(name) + ", %d" + ", %d" * nnodes + extra + ")\n"
+            else:
+                extra = "".join(" " + str(a).replace("%", "%%") for a in args)
+                template = "element " + name + " %d" + " %d" * nnodes + extra + "\n"
+            write_rows(f, template, [block.tags] + matrix_columns(block.nodes))
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_essi(filename, node_tags, node_coords, element_blocks, groups, unit="m", dofs=3, all_nodes=False):
+    # Real-ESSI (.fei) input. groups: {physical group : (element type, material)} where
+    # material is a material number (written as "use material # N") or a string written as is,
+    # eg. (("4NodeShell_ANDES", "use material # 1 thickness = 0.1*m")).
+    blocks = list(selected_blocks(element_blocks, groups))
+    if not all_nodes:
+        node_tags, node_coords = used_nodes(node_tags, node_coords, [block for grp, block in blocks])
+
+    with open(filename, "w") as f:
+        coordinate = FLOAT_FORMAT + "*" + unit
+        template = "add node # %d at (" + ", ".join([coordinate] * 3) + ") with " + str(dofs) + " dofs;\n"
+        write_rows(f, template, [node_tags] + matrix_columns(node_coords))
+        f.write("\n")
+
+        for grp, block in blocks:
+            name, material = groups[grp]
+            if isinstance(material, str):
+                material = material.replace("%", "%%")
+            else:
+                material = "use material # %d" % material
+            nodes = ", ".join(["%d"] * block.nodes.shape[1])
+            template = "add element # %d type " + name + " with nodes (" + nodes + ") " + material + ";\n"
+            write_rows(f, template, [block.tags] + matrix_columns(block.nodes))
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_abaqus(filename, node_tags, node_coords, element_blocks, groups, names=None, all_nodes=False):
+    # Abaqus .inp mesh (nodes and elements only). groups: {physical group : Abaqus element type},
+    # eg. {1 : "C3D8"}. Each group is written to the element set names[grp] (default "GROUP<grp>").
+    names = names or {}
+    blocks = list(selected_blocks(element_blocks, groups))
+    if not all_nodes:
+        node_tags, node_coords = used_nodes(node_tags, node_coords, [block for grp, block in blocks])
+
+    with open(filename, "w") as f:
+        f.write("*NODE\n")
+        write_rows(f, "%d" + (", " + FLOAT_FORMAT) * 3 + "\n", [node_tags] + matrix_columns(node_coords))
+
+        for grp, block in blocks:
+            eltype = groups[grp]
+            if isinstance(eltype, (tuple, list)):
+                eltype = eltype[0]
+            f.write("*ELEMENT, TYPE=%s, ELSET=%s\n" % (eltype, names.get(grp, "GROUP" + str(grp))))
+            #data lines hold at most 16 entries, longer elements continue on the next line
+            entries = ["%d"] * (1 + block.nodes.shape[1])
+            lines = [", ".join(entries[i:i+16]) for i in range(0, len(entries), 16)]
+            write_rows(f, ",\n".join(lines) + "\n", [block.tags] + matrix_columns(block.nodes))
+
+
+
+
+####################################################################################################
+####################################################################################################
+def write_vtk(filename, node_tags, node_coords, element_blocks, groups=None):
+    # Unstructured grid with the elements of `groups` (all elements if None) and their physical
+    # group and tag as cell data. ".vtu" files are VTK XML with raw binary data appended, other
+    # names get the legacy ASCII format.
+    if groups is None:
+        groups = sorted(set().union(*[np.unique(block.physgrp).tolist() for block in element_blocks.values()]))
+    blocks = [block for grp, block in selected_blocks(element_blocks, groups)]
+    for block in blocks:
+        if block.eletype not in vtk_cell_types:
+            raise ValueError("gmshTranslator: element type " + str(block.eletype) + " has no VTK equivalent")
+
+    if filename.endswith(".vtu"):
+        write_vtu(filename, node_tags, node_coords, blocks)
+        return
+
+    ncells = sum([len(block) for block in blocks])
+    size = sum([block.nodes.size + len(block) for block in blocks])
+    with open(filename, "w") as f:
+        f.write("# vtk DataFile Version 3.0\ngmshtranslator\nASCII\nDATASET UNSTRUCTURED_GRID\n")
+        f.write("POINTS %d double\n" % len(node_tags))
+        write_rows(f, " ".join([FLOAT_FORMAT] * 3) + "\n", matrix_columns(node_coords))
+
+        f.write("CELLS %d %d\n" % (ncells, size))
+        for block in blocks:
+            nnodes = block.nodes.shape[1]
+            cells = node_positions(node_tags, block.nodes)
+            write_rows(f, str(nnodes) + " %d" * nnodes + "\n", matrix_columns(cells))
+
+        f.write("CELL_TYPES %d\n" % ncells)
+        for block in blocks:
+            f.write(("%d\n" % vtk_cell_types[block.eletype]) * len(block))
+
+        f.write("CELL_DATA %d\n" % ncells)
+        for field in ("physgrp", "tags"):
+            f.write("SCALARS %s int 1\nLOOKUP_TABLE default\n" % field)
+            for block in blocks:
+                write_rows(f, "%d\n", [getattr(block, field)])
+
+
+def write_vtu(filename, node_tags, node_coords, blocks):
+    ncells = sum([len(block) for block in blocks])
+    offsets = np.cumsum([0] + [block.nodes.size for block in blocks])
+    # (name, dtype, number of values, number of components, pieces of the array in order)
+    arrays = [
+        ("Points", "<f8", node_coords.shape[0] * 3, 3, [node_coords]),
+        ("connectivity", "<i8", offsets[-1], 1, (node_positions(node_tags, block.nodes) for block in blocks)),
+        ("offsets", "<i8", ncells, 1,
+            (offsets[b] + block.nodes.shape[1] * np.arange(1, len(block) + 1) for b, block in enumerate(blocks))),
+        ("types", "u1", ncells, 1, (np.full(len(block), vtk_cell_types[block.eletype]) for block in blocks)),
+        ("physgrp", "<i8", ncells, 1, (block.physgrp for block in blocks)),
+        ("tags", "<i8", ncells, 1, (block.tags for block in blocks)),
+    ]
+    vtktype = {"<f8" : "Float64", "<i8" : "Int64", "u1" : "UInt8"}
+
+    position = 0
+    dataarrays = {}
+    for name, dtype, count, ncomp, pieces in arrays:
+        dataarrays[name] = '<DataArray type="%s" Name="%s" NumberOfComponents="%d" format="appended" offset="%d"/>\n' % (
+            vtktype[dtype], name, ncomp, position)
+        position += 8 + count * np.dtype(dtype).itemsize
+
+    with open(filename, "wb") as f:
+        f.write(('<?xml version="1.0"?>\n'
+            '<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64">\n'
+            '<UnstructuredGrid>\n<Piece NumberOfPoints="%d" NumberOfCells="%d">\n' % (node_coords.shape[0], ncells) +
+            '<Points>\n' + dataarrays["Points"] + '</Points>\n' +
+            '<Cells>\n' + dataarrays["connectivity"] + dataarrays["offsets"] + dataarrays["types"] + '</Cells>\n' +
+            '<CellData Scalars="physgrp">\n' + dataarrays["physgrp"] + dataarrays["tags"] + '</CellData>\n' +
+            '</Piece>\n</UnstructuredGrid>\n<AppendedData encoding="raw">\n_').encode())
+        #raw appended data: every array is preceded by its size in bytes
+        for name, dtype, count, ncomp, pieces in arrays:
+            f.write(np.array([count * np.dtype(dtype).itemsize], dtype="<u8").tobytes())
+            for piece in pieces:
+                f.write(np.asarray(piece, dtype=dtype).tobytes())
+        f.write(b"\n</AppendedData>\n</VTKFile>\n")
@@ -0,0 +1,52 @@
+from __future__ import print_function
+import bz2
+import gzip
+import os
+import sys
+import pytest
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# Meshes for the tests are written by the benchmark generator (benchmarks/generate.py): small
+# structured grids as MSH 2.2 or 4.1, ASCII or binary, optionally partitioned, periodic or
+# compressed. Each mesh is written once per test session.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from generate import SyntheticMesh, write_mesh
+
+compressors = {"gzip" : (".gz", gzip.open), "bz2" : (".bz2", bz2.BZ2File)}
+if lzma is not None:
+    compressors["xz"] = (".xz", lzma.open)
+
+
+@pytest.fixture(scope="session")
+def make_mesh(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("meshes")
+    made = {}
+
+    def make(version="2.2", binary=False, n=3, kind="hex", groups=2, partitions=0, periodic=False, sparse=False,
+            compression=None):
+        key = (version, binary, n, kind, groups, partitions, periodic, sparse, compression)
+        if key not in made:
+            name = "mesh_%s_%s_%d_%s_g%d_p%d%s%s.msh" % (version, "bin" if binary else "ascii", n, kind, groups,
+                partitions, "_periodic" if periodic else "", "_sparse" if sparse else "")
+            filename = str(directory / name)
+            if not os.path.exists(filename):
+                write_mesh(filename, SyntheticMesh(n, kind, groups, partitions, periodic, sparse), version, binary)
+            if compression is not None:
+                extension, opener = compressors[compression]
+                with open(filename, "rb") as source:
+                    data = source.read()
+                filename += extension
+                with opener(filename, "wb") as target:
+                    target.write(data)
+            made[key] = filename
+        return made[key]
+
+    return make
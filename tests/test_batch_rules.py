@@ -0,0 +1,65 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+# The default generated mesh: 3 x 3 x 3 hexahedra in the unit cube, group1 the layer z <= 1/3
+# (elements 1..9) and group2 the rest (elements 10..27)
+
+formats = [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)]
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_node_batch_rules(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary), verbose=False)
+    calls = []
+    gt.add_nodes_batch_rule(lambda tags, x, y, z, physgroups: x < 0.5, lambda *args: calls.append(("x", args)))
+    gt.add_nodes_batch_rule(gt.are_nodes_in("group1"), lambda *args: calls.append(("group1", args)))
+    gt.add_nodes_batch_rule(lambda tags, x, y, z, physgroups: False, lambda *args: calls.append(("none", args)))
+    gt.parse()
+
+    assert [name for name, args in calls] == ["x", "group1"]
+    tags, x, y, z = calls[0][1]
+    assert tags.size == 32 and (x < 0.5).all()
+    tags, x, y, z = calls[1][1]
+    assert tags.size == 32 and (z < 0.5).all()
+    assert sorted(tags.tolist()) == sorted(gt.nodes_in_physical_groups[1].nodes.tolist())
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_element_batch_rules(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary), verbose=False)
+    calls = []
+    gt.add_elements_batch_rule(gt.are_elements_in("group1"), lambda *args: calls.append(("group1", args)))
+    gt.add_elements_batch_rule(gt.are_elements_of_type(gt.tetrahedron_4_node), lambda *args: calls.append(("tet", args)))
+    gt.add_elements_batch_rule(lambda eletags, eletype, physgrp, nodes: True, lambda *args: calls.append(("all", args)))
+    gt.parse()
+
+    assert [name for name, args in calls] == ["group1", "all"]
+    eletags, eletype, physgrp, nodes = calls[0][1]
+    assert eletype == gt.hexahedron_8_node
+    assert eletags.tolist() == list(range(1, 10)) and (physgrp == 1).all() and nodes.shape == (9, 8)
+    eletags, eletype, physgrp, nodes = calls[1][1]
+    assert eletags.tolist() == list(range(1, 28)) and sorted(set(physgrp.tolist())) == [1, 2]
+
+
+def test_batch_rules_run_after_normal_rules(make_mesh):
+    gt = gmshTranslator(make_mesh("2.2", False), verbose=False)
+    order = []
+    gt.add_nodes_rule(lambda *args: True, lambda *args: order.append("node"))
+    gt.add_nodes_batch_rule(lambda *args: True, lambda *args: order.append("node batch"))
+    gt.add_elements_rule(lambda *args: True, lambda *args: order.append("element"))
+    gt.add_elements_batch_rule(lambda *args: True, lambda *args: order.append("element batch"))
+    gt.parse()
+    assert order == ["node"] * 64 + ["node batch"] + ["element"] * 27 + ["element batch"]
+
+
+def test_batch_rules_of_some_groups(make_mesh):
+    gt = gmshTranslator(make_mesh("4.1", True), verbose=False)
+    nodes, elements = [], []
+    gt.add_nodes_batch_rule(lambda *args: True, lambda tags, x, y, z: nodes.append(tags))
+    gt.add_elements_batch_rule(lambda *args: True, lambda eletags, eletype, physgrp, n: elements.append(eletags))
+    gt.parse(groups=["group2"])
+    assert np.concatenate(nodes).size == 48
+    assert np.concatenate(elements).tolist() == list(range(10, 28))
@@ -0,0 +1,56 @@
+from __future__ import print_function
+import os
+import numpy as np
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.cache import cache_key, load_cache
+
+
+def recorded_parse(gt):
+    nodes, elements = [], []
+    gt.add_nodes_rule(lambda tag, x, y, z, physgroups: True, lambda tag, x, y, z: nodes.append((int(tag), x, y, z)))
+    gt.add_elements_rule(lambda *args: True, lambda *args: elements.append((int(args[0]), int(args[1]), int(args[2]), list(args[3]))))
+    gt.parse()
+    return nodes, elements
+
+
+def test_restored_ascii_mesh_is_parsed_from_the_arrays(make_mesh, tmp_path):
+    filename = make_mesh("2.2", False, groups=2)
+    reference = recorded_parse(gmshTranslator(filename, cache=True, cache_dir=str(tmp_path), verbose=False))
+
+    gt = gmshTranslator(filename, cache=True, cache_dir=str(tmp_path), verbose=False)
+    assert gt.element_blocks is not None
+
+    def read_again(*args):
+        raise AssertionError("restored mesh read line by line")
+    gt.__parse_lines__ = read_again
+    assert recorded_parse(gt) == reference
+
+
+def test_load_cache_closes_the_file(make_mesh, tmp_path, monkeypatch):
+    filename = make_mesh("2.2", True, periodic=True)
+    gt = gmshTranslator(filename, cache=True, cache_dir=str(tmp_path), verbose=False)
+    opened = []
+
+    def load(*args, **kwargs):
+        opened.append(np_load(*args, **kwargs))
+        return opened[-1]
+    np_load = np.load
+    monkeypatch.setattr(np, "load", load)
+    data = load_cache(gt.__cache_path__(), cache_key(filename, True))
+    assert len(data["periodic_links"]) == 3
+    assert len(opened) == 1 and opened[0].fid is None
+    assert data["node_coords"].shape == (gt.Nnodes, 3)
+
+
+def test_mtime_key_has_nanoseconds(make_mesh, tmp_path):
+    filename = str(tmp_path / "mesh.msh")
+    with open(make_mesh("2.2", False), "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data)
+    mtime = 1700000000123456789
+    os.utime(filename, ns=(mtime, mtime))
+    key = cache_key(filename)
+    assert key.endswith(":%d" % mtime)
+    os.utime(filename, ns=(mtime + 1, mtime + 1))
+    assert cache_key(filename) != key
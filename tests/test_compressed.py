@@ -0,0 +1,90 @@
+from __future__ import print_function
+import bz2
+import gzip
+import numpy as np
+import pytest
+from gmshtranslator import compressed
+from gmshtranslator.compressed import open_mesh, is_compressed, map_array, shared_index, MAX_INDEXES
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+def test_shared_indexes_are_bounded(tmp_path):
+    filenames = []
+    for i in range(MAX_INDEXES + 3):
+        filenames.append(str(tmp_path / ("mesh%d.msh.gz" % i)))
+        with gzip.open(filenames[-1], "wb") as f:
+            f.write(b"$MeshFormat\n2.2 0 8\n$EndMeshFormat\n")
+    first = shared_index(filenames[0])
+    for filename in filenames[1:]:
+        assert shared_index(filename) is shared_index(filename)
+        assert shared_index(filenames[0]) is first      #recently used, kept
+    assert len(compressed.indexes) == MAX_INDEXES
+    kept = set(key[0] for key in compressed.indexes)
+    assert filenames[0] in kept and filenames[-1] in kept and filenames[1] not in kept
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Blocks, history and checkpoints of a few hundred bytes, so that small files go through them all
+    monkeypatch.setattr(compressed, "INPUT_BLOCK", 256)
+    monkeypatch.setattr(compressed, "HISTORY", 512)
+    monkeypatch.setattr(compressed, "CHECKPOINT_INTERVAL", 1024)
+
+
+def payload():
+    random = np.random.RandomState(5)
+    return b"".join(b"%d %.6f\n" % (i, x) for i, x in enumerate(random.uniform(size=4000)))
+
+
+@pytest.mark.parametrize("method", ["gzip", "bz2", "xz"])
+def test_random_access(tmp_path, small_blocks, method):
+    if method == "xz" and lzma is None:
+        pytest.skip("no lzma module")
+    data = payload()
+    filename = str(tmp_path / "data.bin")     #recognized by its contents, not its name
+    opener = {"gzip" : gzip.open, "bz2" : bz2.BZ2File, "xz" : getattr(lzma, "open", None)}[method]
+    with opener(filename, "wb") as f:
+        f.write(data)
+    assert compressed.compression_of(filename) == method and compressed.mesh_size(filename) is None
+
+    f = open_mesh(filename)
+    assert is_compressed(f) and f.read() == data
+    random = np.random.RandomState(7)
+    for offset in random.randint(0, len(data), 50).tolist() + [0, len(data) - 1]:
+        f.seek(offset)
+        assert f.read(100) == data[offset:offset+100]
+    f.seek(-10, 2)
+    assert f.read() == data[-10:] and f.tell() == len(data)
+    f.close()
+    if method == "gzip":
+        assert len(shared_index(filename).checkpoints) > 10
+
+
+def test_gzip_members_and_padding(tmp_path):
+    filename = str(tmp_path / "members.msh.gz")
+    with open(filename, "wb") as f:
+        for part in (b"first part\n", b"second part\n"):
+            f.write(gzip.compress(part))
+        f.write(b"\x00" * 16)
+    with open_mesh(filename) as f:
+        assert f.read() == b"first part\nsecond part\n"
+
+
+def test_uncompressed_files(tmp_path):
+    filename = str(tmp_path / "plain.msh")
+    with open(filename, "wb") as f:
+        f.write(np.arange(10, dtype="<i4").tobytes())
+    assert compressed.compression_of(filename) is None and compressed.mesh_size(filename) == 40
+    with open_mesh(filename) as f:
+        assert not is_compressed(f)
+        assert map_array(f, filename, "<i4", 8, (2, 3)).tolist() == [[2, 3, 4], [5, 6, 7]]
+    with gzip.open(filename + ".gz", "wb") as f:
+        f.write(np.arange(10, dtype="<i4").tobytes())
+    with open_mesh(filename + ".gz") as f:
+        assert map_array(f, filename + ".gz", "<i4", 8, (2, 3)).tolist() == [[2, 3, 4], [5, 6, 7]]
+        with pytest.raises(IOError):
+            map_array(f, filename + ".gz", "<i4", 8, (4, 3))
@@ -0,0 +1,66 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.dispatch import ElementSelector, RuleDispatcher, element_dimension
+from gmshtranslator.readers import ElementBlock
+from test_fixtures import MSH41
+
+
+def test_selectors():
+    selector = ElementSelector(physgrps=[1, 2], eletypes=5)
+    assert selector.matches(5, 2) and not selector.matches(5, 3) and not selector.matches(4, 1)
+    assert selector(1, 5, 1, [1, 2]) is True and selector(1, 4, 1, [1, 2]) is False
+    surfaces = ElementSelector(dims=2, condition=lambda eletag, eletype, physgrp, nodes: eletag > 10)
+    assert [element_dimension(t) for t in (15, 1, 3, 5)] == [0, 1, 2, 3]
+    assert surfaces.matches(3, 7) and not surfaces.matches(5, 7)
+    assert not surfaces(3, 3, 7, []) and surfaces(11, 3, 7, []) and surfaces.__name__ == "<lambda>"
+
+
+def test_dispatch_table():
+    other = lambda *args: True
+    rules = [(ElementSelector(physgrps=1), None), (other, None), (ElementSelector(eletypes=3, condition=other), None)]
+    dispatcher = RuleDispatcher(rules)
+    assert dispatcher.rules_for(3, 1) == [(0, False), (1, True), (2, True)]
+    assert dispatcher.rules_for(5, 2) == [(1, True)]
+    assert sorted(dispatcher.table) == [(3, 1), (5, 2)]
+    assert RuleDispatcher(rules, physgrps=[2]).rules_for(3, 1) == []
+
+    block = ElementBlock(3, np.arange(4), np.array([1, 2, 1, 3]), np.ones(4), np.zeros((4, 4)), np.arange(4))
+    assert RuleDispatcher(rules[:1]).selected_rows(block).tolist() == [True, False, True, False]
+
+
+@pytest.fixture
+def fixture_msh(tmp_path):
+    filename = str(tmp_path / "fixture.msh")
+    with open(filename, "w") as f:
+        f.write(MSH41)
+    return filename
+
+
+@pytest.mark.parametrize("version,binary,options", [("2.2", False, {}), ("2.2", False, dict(workers=2)),
+    ("4.1", True, {}), ("2.2", False, dict(pipeline=True, chunk_size=5))])
+def test_parse_only_evaluates_selected_pairs(make_mesh, version, binary, options):
+    gt = gmshTranslator(make_mesh(version, binary, kind="tet", groups=3), verbose=False)
+    seen, selected, plain = [], [], []
+
+    def is_odd(eletag, eletype, physgrp, nodes):
+        seen.append(physgrp)
+        return eletag % 2 == 1
+    gt.add_elements_rule(gt.element_selector(groups=["group2", 3], condition=is_odd), lambda *args: selected.append(args[0]))
+    gt.add_elements_rule(lambda eletag, eletype, physgrp, nodes: physgrp in (2, 3) and eletag % 2 == 1,
+        lambda *args: plain.append(args[0]))
+    gt.add_elements_rule(gt.is_element_of_type(gt.hexahedron_8_node), lambda *args: selected.append("hexahedron"))
+    gt.parse(**options)
+
+    assert set(seen) == set([2, 3]) and len(seen) == 108
+    assert selected == plain and len(selected) == 54
+
+
+def test_is_element_in(fixture_msh):
+    gt = gmshTranslator(fixture_msh, verbose=False)
+    calls = {"left" : [], "!any" : []}
+    for name in calls:
+        gt.add_elements_rule(gt.is_element_in(name), (lambda name: lambda *args: calls[name].append(int(args[0])))(name))
+    gt.parse()
+    assert calls == {"left" : [3], "!any" : [3, 4, 1, 2]}
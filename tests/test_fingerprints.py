@@ -0,0 +1,66 @@
+from __future__ import print_function
+import os
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.fingerprints import fingerprint_path, load_fingerprints
+from test_fixtures import MSH41
+
+
+def write(tmp_path, name, text):
+    filename = str(tmp_path / name)
+    with open(filename, "w") as f:
+        f.write(text)
+    return filename
+
+
+def test_changed_groups(tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    gt = gmshTranslator(write(tmp_path, "a.msh", MSH41), verbose=False)
+    assert gt.changed_groups(path) == [1, 2, 3]
+    gt.save_fingerprints(path)
+    assert load_fingerprints(path) == gt.fingerprints
+    assert gt.fingerprints[2]["name"] == "left" and (gt.fingerprints[1]["elements"], gt.fingerprints[1]["nodes"]) == (2, 6)
+    assert gmshTranslator(write(tmp_path, "b.msh", MSH41), verbose=False).changed_groups(path) == []
+
+    #node 3 moved: the groups using it changed
+    moved = MSH41.replace("2 0 0\n2 1 0\n", "2.5 0 0\n2 1 0\n")
+    assert gmshTranslator(write(tmp_path, "c.msh", moved), verbose=False).changed_groups(path) == [1, 3]
+    #line 3 reversed: only its group changed
+    reversed_line = MSH41.replace("\n3 1 4\n", "\n3 4 1\n")
+    assert gmshTranslator(write(tmp_path, "d.msh", reversed_line), verbose=False).changed_groups(path) == [2]
+
+
+def test_fingerprints_do_not_depend_on_the_format(make_mesh, tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    reference = gmshTranslator(make_mesh("2.2", False, groups=3), verbose=False)
+    assert reference.changed_groups(path) == [1, 2, 3]
+    reference.save_fingerprints(path)
+    for version, binary in [("2.2", True), ("4.1", False), ("4.1", True)]:
+        assert gmshTranslator(make_mesh(version, binary, groups=3), verbose=False).changed_groups(path) == []
+    assert gmshTranslator(make_mesh("2.2", False, groups=3, sparse=True), verbose=False).changed_groups(path) == [1, 2, 3]
+
+
+def test_fingerprint_files(tmp_path):
+    filename = write(tmp_path, "model.msh", MSH41)
+    assert fingerprint_path(filename) == filename + ".fingerprints.json"
+    other = fingerprint_path(filename, str(tmp_path / "cache"))
+    assert os.path.dirname(other) == str(tmp_path / "cache") and os.path.basename(other).startswith("model.msh.")
+    gmshTranslator(filename, cache_dir=str(tmp_path / "cache"), verbose=False).save_fingerprints()
+    assert os.path.exists(other) and load_fingerprints(filename + ".fingerprints.json") is None
+    with open(other, "w") as f:
+        f.write("{")
+    assert load_fingerprints(other) is None
+
+
+def test_write_groups_keeps_unchanged_files(tmp_path):
+    gt = gmshTranslator(write(tmp_path, "model.msh", MSH41), verbose=False)
+    pattern = str(tmp_path / "model_%s.inp")
+    groups = {"body" : "S4", "left" : "T3D2", "right" : "T3D2"}
+    written = gt.write_groups(pattern, "abaqus", groups)
+    assert sorted(written) == sorted(pattern % name for name in ("body", "left", "right"))
+    for filename in written:
+        with open(filename, "w") as f:
+            f.write("old")
+    gt.write_groups(pattern, "abaqus", groups, changed=["right"])
+    assert open(pattern % "body").read() == "old" and open(pattern % "left").read() == "old"
+    assert open(pattern % "right").read() == "*NODE\n3, 2, 0, 0\n6, 2, 1, 0\n*ELEMENT, TYPE=T3D2, ELSET=right\n4, 3, 6\n"
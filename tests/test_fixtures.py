@@ -0,0 +1,196 @@
+from __future__ import print_function
+import struct
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from test_mshwriter import contents
+from test_partitions import element_calls
+
+
+# Hand-written MSH 4.1 files, independent of mshwriter and benchmarks/generate.py. Two quads
+# (tags 1 and 2) in surface 1, group "body"; a line on the left (curve 1, group "left") and one
+# on the right (curve 2, group "right"), which is periodic with the left one.
+#
+#   4---5---6
+#   | 1 | 2 |
+#   1---2---3
+MSH41 = """$MeshFormat
+4.1 0 8
+$EndMeshFormat
+$PhysicalNames
+3
+1 2 "left"
+1 3 "right"
+2 1 "body"
+$EndPhysicalNames
+$Entities
+0 2 1 0
+1 0 0 0 0 1 0 1 2 0
+2 2 0 0 2 1 0 1 3 0
+1 0 0 0 2 1 0 1 1 0
+$EndEntities
+$Nodes
+3 6 1 6
+1 1 0 2
+1
+4
+0 0 0
+0 1 0
+1 2 0 2
+3
+6
+2 0 0
+2 1 0
+2 1 0 2
+2
+5
+1 0 0
+1 1 0
+$EndNodes
+$Elements
+3 4 1 4
+1 1 1 1
+3 1 4
+1 2 1 1
+4 3 6
+2 1 3 2
+1 1 2 5 4
+2 2 3 6 5
+$EndElements
+$Periodic
+1
+1 2 1
+0
+2
+3 1
+6 4
+$EndPeriodic
+"""
+
+# The same mesh split in two partitions: quad 1 and the left line in partition 1, quad 2 and the
+# right line in partition 2 (partitioned entities 11, 12, 21 and 22 of the model entities above)
+PARTITIONED41 = """$MeshFormat
+4.1 0 8
+$EndMeshFormat
+$PhysicalNames
+3
+1 2 "left"
+1 3 "right"
+2 1 "body"
+$EndPhysicalNames
+$PartitionedEntities
+2
+0
+0 2 2 0
+11 1 1 1 1 0 0 0 0 1 0 1 2 0
+12 1 2 1 2 2 0 0 2 1 0 1 3 0
+21 2 1 1 1 0 0 0 1 1 0 1 1 0
+22 2 1 1 2 1 0 0 2 1 0 1 1 0
+$EndPartitionedEntities
+$Nodes
+2 6 1 6
+2 21 0 4
+1
+2
+4
+5
+0 0 0
+1 0 0
+0 1 0
+1 1 0
+2 22 0 2
+3
+6
+2 0 0
+2 1 0
+$EndNodes
+$Elements
+4 4 1 4
+1 11 1 1
+3 1 4
+1 12 1 1
+4 3 6
+2 21 3 1
+1 1 2 5 4
+2 22 3 1
+2 2 3 6 5
+$EndElements
+"""
+
+NODES = [(1, [0.0, 0.0, 0.0]), (2, [1.0, 0.0, 0.0]), (3, [2.0, 0.0, 0.0]),
+    (4, [0.0, 1.0, 0.0]), (5, [1.0, 1.0, 0.0]), (6, [2.0, 1.0, 0.0])]
+NAMES = [(1, "body"), (2, "left"), (3, "right")]
+
+
+def binary_msh41():
+    # MSH41 in binary: sizes as size_t (8 bytes), tags and types as int, coordinates as double
+    def ints(*values):
+        return struct.pack("<%di" % len(values), *values)
+
+    def sizes(*values):
+        return struct.pack("<%dQ" % len(values), *values)
+
+    def doubles(*values):
+        return struct.pack("<%dd" % len(values), *values)
+
+    data = b"$MeshFormat\n4.1 1 8\n" + ints(1) + b"\n$EndMeshFormat\n"
+    data += MSH41[MSH41.index("$PhysicalNames"):MSH41.index("$Entities")].encode()
+    data += b"$Entities\n" + sizes(0, 2, 1, 0)
+    data += ints(1) + doubles(0, 0, 0, 0, 1, 0) + sizes(1) + ints(2) + sizes(0)
+    data += ints(2) + doubles(2, 0, 0, 2, 1, 0) + sizes(1) + ints(3) + sizes(0)
+    data += ints(1) + doubles(0, 0, 0, 2, 1, 0) + sizes(1) + ints(1) + sizes(0)
+    data += b"\n$EndEntities\n$Nodes\n" + sizes(3, 6, 1, 6)
+    data += ints(1, 1, 0) + sizes(2) + sizes(1, 4) + doubles(0, 0, 0, 0, 1, 0)
+    data += ints(1, 2, 0) + sizes(2) + sizes(3, 6) + doubles(2, 0, 0, 2, 1, 0)
+    data += ints(2, 1, 0) + sizes(2) + sizes(2, 5) + doubles(1, 0, 0, 1, 1, 0)
+    data += b"\n$EndNodes\n$Elements\n" + sizes(3, 4, 1, 4)
+    data += ints(1, 1, 1) + sizes(1) + sizes(3, 1, 4)
+    data += ints(1, 2, 1) + sizes(1) + sizes(4, 3, 6)
+    data += ints(2, 1, 3) + sizes(2) + sizes(1, 1, 2, 5, 4, 2, 2, 3, 6, 5)
+    data += b"\n$EndElements\n$Periodic\n" + sizes(1)
+    data += ints(1, 2, 1) + sizes(0) + sizes(2) + sizes(3, 1, 6, 4)
+    data += b"\n$EndPeriodic\n"
+    return data
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    def write(name):
+        filename = str(tmp_path / (name + ".msh"))
+        data = {"ascii" : MSH41.encode(), "binary" : binary_msh41(), "partitioned" : PARTITIONED41.encode()}[name]
+        with open(filename, "wb") as f:
+            f.write(data)
+        return filename
+    return write
+
+
+@pytest.mark.parametrize("name", ["ascii", "binary"])
+def test_msh41_fixture(fixture_file, name):
+    filename = fixture_file(name)
+    nodes, elements, names, periodic = contents(filename)
+    assert nodes == NODES
+    assert elements == [(1, 3, 1, 0, [1, 2, 5, 4]), (2, 3, 1, 0, [2, 3, 6, 5]), (3, 1, 2, 0, [1, 4]), (4, 1, 3, 0, [3, 6])]
+    assert names == NAMES
+    assert periodic == [((1, 2, 1), [], [[3, 1], [6, 4]])]
+
+    gt = gmshTranslator(filename, verbose=False)
+    assert (gt.mshversion, gt.mshbinary) == (4.1, name == "binary")
+    assert (gt.Nphys, gt.Nnodes, gt.Nelem, gt.maxNodeTag) == (3, 6, 4, 6)
+    assert gt.nodes_in_physical_groups[2].nodes.tolist() == [1, 4]
+    assert gt.nodes_in_physical_groups[1].nodes.tolist() == [1, 2, 3, 4, 5, 6]
+    assert element_calls(filename) == [(3, 1, 2, [1, 4]), (4, 1, 3, [3, 6]), (1, 3, 1, [1, 2, 5, 4]), (2, 3, 1, [2, 3, 6, 5])]
+
+
+@pytest.mark.parametrize("options", [dict(), dict(workers=2), dict(options=dict(lazy=True))])
+def test_binary_fixture_matches_ascii(fixture_file, options):
+    assert element_calls(fixture_file("binary"), **dict(options)) == element_calls(fixture_file("ascii"))
+
+
+def test_partitioned_msh41_fixture(fixture_file):
+    filename = fixture_file("partitioned")
+    nodes, elements, names, periodic = contents(filename)
+    assert nodes == NODES
+    assert elements == [(1, 3, 1, 1, [1, 2, 5, 4]), (2, 3, 1, 2, [2, 3, 6, 5]), (3, 1, 2, 1, [1, 4]), (4, 1, 3, 2, [3, 6])]
+    assert names == NAMES and periodic == []
+    calls = element_calls(filename)
+    assert [call[0] for call in calls] == [3, 4, 1, 2]
+    assert [call[4:] for call in calls] == [(1, ["1"]), (1, ["2"]), (1, ["1"]), (1, ["2"])]
@@ -0,0 +1,70 @@
+from __future__ import print_function
+import os
+import subprocess
+import sys
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+def test_import_writes_nothing():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for module in ("gmshtranslator", "gmshtranslator.gmshtranslator"):
+        output = subprocess.check_output([sys.executable, "-c", "import " + module], cwd=root)
+        assert output == b""
+
+
+def test_quiet_translator_writes_nothing(make_mesh, capsys):
+    gt = gmshTranslator(make_mesh("2.2", False), verbose=False)
+    gt.add_elements_rule(lambda *args: True, lambda *args: None)
+    gt.parse()
+    assert capsys.readouterr().out == ""
+    gmshTranslator(make_mesh("2.2", False))
+    assert "gmshTranslator: " in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("4.1", True)])
+def test_phases_and_rule_profiles(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary), verbose=False, profile=True)
+
+    def in_group1(eletag, eletype, physgrp, nodes):
+        return physgrp == 1
+
+    def low_nodes(tags, x, y, z, physgroups):
+        return z < 0.5
+    gt.add_elements_rule(in_group1, lambda *args: None)
+    gt.add_nodes_batch_rule(low_nodes, lambda *args: None)
+    gt.parse()
+
+    phases = gt.stats.as_dict()["phases"]
+    assert phases["element rules"]["items"] == 27 and phases["node batch rules"]["items"] == 64
+    if version == "2.2":
+        assert phases["initial pass"]["bytes"] > 0
+    else:
+        assert phases["read Nodes"]["bytes"] > 0 and phases["read Elements"]["runs"] == 1
+    rules = dict((rule["condition"], rule) for rule in gt.stats.as_dict()["rules"])
+    assert (rules["in_group1"]["condition_calls"], rules["in_group1"]["hits"]) == (27, 9)
+    assert (rules["low_nodes"]["condition_calls"], rules["low_nodes"]["action_calls"], rules["low_nodes"]["hits"]) == (1, 1, 32)
+    report = gt.stats.report()
+    assert "element rules" in report and "in_group1" in report
+
+
+def test_rules_are_not_timed_without_profile(make_mesh):
+    gt = gmshTranslator(make_mesh(), verbose=False)
+    condition = lambda *args: True
+    gt.add_elements_rule(condition, lambda *args: None)
+    gt.parse()
+    assert gt.stats.rules == {} and gt.stats.timed_rules(gt.elements_rules, "element")[0][0] is condition
+    assert "condition" not in gt.stats.report()
+
+
+def test_progress_ends_every_phase(make_mesh):
+    calls = []
+    gt = gmshTranslator(make_mesh("4.1", False), verbose=False, progress=lambda *args: calls.append(args))
+    gt.add_nodes_rule(lambda *args: True, lambda *args: None)
+    gt.parse()
+    last = {}
+    for phase, done, total in calls:
+        assert total is None or 0 <= done <= total
+        last[phase] = (done, total)
+    assert last["node rules"] == (64, 64)
+    assert all(done == total for done, total in last.values())
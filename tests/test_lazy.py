@@ -0,0 +1,55 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+formats = [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)]
+
+
+def same_links(a, b):
+    return len(a) == len(b) and all(la[:3] == lb[:3] and np.array_equal(la[3], lb[3]) and np.array_equal(la[4], lb[4])
+        for la, lb in zip(a, b))
+
+
+@pytest.mark.parametrize("version,binary", formats)
+@pytest.mark.parametrize("compression", [None, "gzip", "xz"])
+def test_parse_before_lazy_attributes_keeps_periodic_links(make_mesh, version, binary, compression):
+    filename = make_mesh(version, binary, periodic=True, compression=compression)
+    reference = gmshTranslator(filename, verbose=False)
+    gt = gmshTranslator(filename, lazy=True, verbose=False)
+    gt.parse()
+    assert gt.Nperiodic == 3
+    assert same_links(gt.periodic_links, reference.periodic_links)
+    assert [len(p) for p in gt.Periodic_nodes] == [len(p) for p in reference.Periodic_nodes]
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_lazy_attributes_before_parse(make_mesh, version, binary):
+    filename = make_mesh(version, binary, periodic=True)
+    gt = gmshTranslator(filename, lazy=True, verbose=False)
+    assert gt.Nperiodic == 3
+    gt.parse()
+    assert gt.Nperiodic == 3
+    assert gt.Nelem == gmshTranslator(filename, verbose=False).Nelem
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_lazy_mesh_without_periodic_section(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary), lazy=True, verbose=False)
+    gt.parse()
+    assert gt.Nperiodic == 0
+    assert gt.periodic_links == []
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_pipelined_parse_does_not_complete_lazy_scan(make_mesh, version, binary):
+    filename = make_mesh(version, binary)
+    reported = []
+    gt = gmshTranslator(filename, lazy=True, verbose=False, progress=lambda phase, done, total: reported.append((phase, total)))
+    elements = []
+    gt.add_elements_rule(lambda *args: True, lambda *args: elements.append(args[0]))
+    gt.parse(pipeline=True, chunk_size=10)
+    assert gt.lazy_pending
+    assert set(total for phase, total in reported if phase == "element rules") <= set([None, len(elements)])
+    assert len(elements) == gmshTranslator(filename, verbose=False).Nelem
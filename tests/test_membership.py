@@ -0,0 +1,40 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.membership import MembershipBuilder
+
+
+@pytest.mark.parametrize("flush_size", [1, 5, 1 << 22])
+def test_builder_removes_repetitions(flush_size):
+    builder = MembershipBuilder(flush_size)
+    builder.add([3, 1, 2], 20)
+    builder.add([2, 3], 20)
+    builder.add_block(np.array([[2, 5], [7, 5], [1, 2]]), np.array([10, 10, 20]))
+    membership = builder.finish()
+    assert list(membership.groups) == [20, 10]
+    assert membership.node_tags.tolist() == [1, 2, 3, 5, 7]
+    assert membership.groups_of(2) == [20, 10] and membership.groups_of(7) == [10] and membership.groups_of(4) == []
+    assert membership.nodes_of(20).tolist() == [1, 2, 3] and membership.nodes_of(10).tolist() == [2, 5, 7]
+    assert membership.nodes_of(30).tolist() == []
+    assert membership.contains(10, np.array([1, 2, 5, 8])).tolist() == [False, True, True, False]
+    assert bool(membership.contains(20, 3))
+    nodes, gidx = membership.pairs()
+    assert list(zip(nodes.tolist(), gidx.tolist())) == [(1, 0), (2, 0), (2, 1), (3, 0), (5, 1), (7, 1)]
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("4.1", True)])
+def test_nodes_in_physical_groups(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary, sparse=True), verbose=False)
+    group1 = gt.nodes_in_physical_groups[1]
+    assert group1.nodes.size == 32 and len(gt.nodes_in_physical_groups[2].nodes) == 48
+    assert len(group1) == gt.maxNodeTag + 1
+    inside, outside = int(group1.nodes[0]), int(group1.nodes[0]) + 1     #tags are multiples of 7 plus 1
+    assert group1[inside] == 1 and group1[outside] == -1
+    assert inside in group1 and outside not in group1
+    dense = np.asarray(group1)
+    assert dense.shape == (gt.maxNodeTag + 1,) and np.flatnonzero(dense == 1).tolist() == group1.nodes.tolist()
+    assert group1[np.array([inside, outside])].tolist() == [1, -1]
+    shared = set(group1.nodes.tolist()) & set(gt.nodes_in_physical_groups[2].nodes.tolist())
+    assert len(shared) == 16
+    assert all(sorted(gt.node_groups.groups_of(tag)) == [1, 2] for tag in shared)
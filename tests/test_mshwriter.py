@@ -0,0 +1,81 @@
+from __future__ import print_function
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.mshwriter import write_msh
+from test_partitions import element_calls, ghosts
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_msh2_keeps_ghost_partitions(ghosts, tmp_path, binary):
+    filename = str(tmp_path / "copy.msh")
+    gmshTranslator(ghosts, verbose=False).extract(filename, version="2.2", binary=binary)
+    assert sorted(element_calls(filename)) == sorted(element_calls(ghosts))
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_msh4_splits_entities_by_partition(ghosts, tmp_path, binary):
+    filename = str(tmp_path / "copy.msh")
+    gmshTranslator(ghosts, verbose=False).extract(filename, version="4.1", binary=binary)
+    tags, coords, blocks = gmshTranslator(filename, verbose=False).to_arrays()
+    owners = dict(zip(blocks[2].tags.tolist(), blocks[2].partition.tolist()))
+    assert owners == {2 : 1, 3 : 3, 4 : 0}
+    entities = dict(zip(blocks[2].tags.tolist(), blocks[2].entity.tolist()))
+    assert entities[2] == 2 and entities[3] != entities[4]
+    assert sorted(call[:4] for call in element_calls(filename)) == sorted(call[:4] for call in element_calls(ghosts))
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_generated_partitions(make_mesh, binary):
+    tags, coords, blocks = gmshTranslator(make_mesh("4.1", binary, partitions=3), verbose=False).to_arrays()
+    block = blocks[5]
+    assert sorted(set(block.partition.tolist())) == [1, 2, 3]
+    assert sorted(set(block.physgrp.tolist())) == [1, 2]
+
+
+formats = [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)]
+
+
+def contents(filename):
+    # The mesh as read back: nodes by tag, elements (tag, type, physical group, entity, partition, nodes), groups
+    # and periodic pairs
+    gt = gmshTranslator(filename, verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+    nodes = sorted(zip(tags.tolist(), coords.tolist()))
+    elements = sorted((int(block.tags[i]), eletype, int(block.physgrp[i]), int(block.partition[i]), block.nodes[i].tolist())
+        for eletype, block in blocks.items() for i in range(len(block)))
+    periodic = [(link[:3], link[3].tolist(), sorted(link[4].tolist())) for link in gt.periodic_links]
+    return nodes, elements, sorted(gt.physical_group_names.items()), periodic
+
+
+@pytest.mark.parametrize("source", formats)
+@pytest.mark.parametrize("target", formats)
+@pytest.mark.parametrize("options", [dict(partitions=2), dict(kind="tet", periodic=True, sparse=True)])
+def test_extract_round_trip(make_mesh, tmp_path, source, target, options):
+    filename = make_mesh(*source, groups=2, **options)
+    copy = str(tmp_path / "copy.msh")
+    assert gmshTranslator(filename, verbose=False).extract(copy, version=target[0], binary=target[1]) == \
+        (len(contents(filename)[0]), len(contents(filename)[1]))
+    assert contents(copy) == contents(filename)
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_extract_group(make_mesh, tmp_path, version, binary):
+    filename = make_mesh(version, binary, n=4, groups=2, periodic=True)
+    copy = str(tmp_path / "group.msh")
+    gmshTranslator(filename, verbose=False).extract(copy, groups=["group2"])
+    nodes, elements, names, periodic = contents(copy)
+    assert len(elements) == 32 and set(element[2] for element in elements) == set([2])
+    assert set(tag for tag, xyz in nodes) == set(tag for element in elements for tag in element[4])
+    assert [name for grp, name in names] == ["group2"]
+    used = set(tag for tag, xyz in nodes)
+    assert all(set(pair) <= used for link in periodic for pair in link[2])
+
+
+@pytest.mark.parametrize("version,binary", formats)
+def test_write_msh_round_trip(make_mesh, tmp_path, version, binary):
+    filename = make_mesh("2.2", False, groups=2, partitions=2, periodic=True)
+    gt = gmshTranslator(filename, verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+    copy = str(tmp_path / "copy.msh")
+    write_msh(copy, tags, coords, blocks, gt.physical_group_names, gt.physical_group_dims, version, binary, gt.periodic_links)
+    assert contents(copy) == contents(filename)
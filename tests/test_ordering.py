@@ -0,0 +1,91 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.ordering import node_orderings, register_ordering, permutation, reorder
+from gmshtranslator.readers import nodes_per_element_type
+from test_partitions import element_calls
+
+
+# One 10-node tetrahedron (type 11) and one 4-node tetrahedron (type 4), MSH 2.2 ASCII
+TET10 = """$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$Nodes
+10
+1 0 0 0
+2 1 0 0
+3 0 1 0
+4 0 0 1
+5 0.5 0 0
+6 0.5 0.5 0
+7 0 0.5 0
+8 0 0 0.5
+9 0 0.5 0.5
+10 0.5 0 0.5
+$EndNodes
+$Elements
+2
+1 11 2 1 1 1 2 3 4 5 6 7 8 9 10
+2 4 2 2 1 1 2 3 4
+$EndElements
+"""
+
+
+@pytest.fixture
+def tet10(tmp_path):
+    filename = str(tmp_path / "tet10.msh")
+    with open(filename, "w") as f:
+        f.write(TET10)
+    return filename
+
+
+def test_vtk_tet10_swaps_the_last_two_edges():
+    assert permutation(11, "vtk").tolist() == [0, 1, 2, 3, 4, 5, 6, 7, 9, 8]
+    assert permutation(4, "vtk") is None
+    assert reorder(np.arange(10), 11, "vtk").tolist() == [0, 1, 2, 3, 4, 5, 6, 7, 9, 8]
+
+
+@pytest.mark.parametrize("convention", sorted(set(node_orderings) - set(["essi"])))
+def test_reorder_round_trip(convention):
+    for eletype, table in node_orderings[convention].items():
+        nodes = np.arange(2 * nodes_per_element_type[eletype]).reshape(2, -1)
+        assert (reorder(reorder(nodes, eletype, convention), eletype, "gmsh", convention) == nodes).all()
+
+
+def test_register_ordering_checks_the_permutation():
+    with pytest.raises(ValueError):
+        register_ordering("vtk", 4, [0, 1, 2, 2])
+    with pytest.raises(ValueError):
+        register_ordering("vtk", 4, [0, 1, 2])
+    with pytest.raises(ValueError):
+        permutation(4, "unknown")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_translator_orderings(tet10, workers):
+    gmsh = element_calls(tet10, workers=workers)
+    vtk = element_calls(tet10, workers=workers, options=dict(ordering="vtk"))
+    assert gmsh[0][3] == list(range(1, 11))
+    assert vtk[0][3] == [1, 2, 3, 4, 5, 6, 7, 8, 10, 9]
+    assert vtk[1] == gmsh[1]
+
+
+def test_other_orderings_are_not_parsed_line_by_line(tet10):
+    gt = gmshTranslator(tet10, ordering="vtk", verbose=False)
+    assert not gt.scanned_lines and gt.element_blocks is not None
+    assert gt.element_blocks[11].nodes[0].tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 10, 9]
+
+
+def test_essi_higher_order_elements_need_a_registered_ordering(tet10, make_mesh):
+    with pytest.raises(ValueError):
+        permutation(11, "essi")
+    with pytest.raises(ValueError):
+        gmshTranslator(tet10, ordering="essi", verbose=False)
+    filename = make_mesh("2.2", False)
+    assert element_calls(filename, options=dict(ordering="essi")) == element_calls(filename)
+    try:
+        register_ordering("essi", 11, list(range(10)))
+        assert element_calls(tet10, options=dict(ordering="essi")) == element_calls(tet10)
+    finally:
+        del node_orderings["essi"][11]
@@ -0,0 +1,145 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+# Every way of parsing a mesh must give the rules the same calls, in the same order, and the
+# translator the same counts and periodic data: the line parser (MSH 2.2 ASCII), the arrays
+# (loaded by one or several processes), the pipeline, lazy translators, the cache and
+# compressed files. The meshes come from conftest.make_mesh.
+
+formats = [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)]
+meshes = {
+    "plain" : dict(groups=2),
+    "tet" : dict(kind="tet", groups=3),
+    "partitioned" : dict(groups=2, partitions=3),
+    "periodic" : dict(groups=2, periodic=True),
+    "sparse" : dict(kind="tet", groups=2, sparse=True),
+}
+
+
+def plain(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    return value
+
+
+def record(gt, **parse_options):
+    # Calls of one rule of every kind, and what the translator knows of the mesh after parse()
+    calls = {"nodes" : [], "elements" : [], "node batches" : [], "element batches" : []}
+    gt.add_nodes_rule(lambda tag, x, y, z, physgroups: calls["nodes"].append(("condition", tag, sorted(physgroups))) or True,
+        lambda tag, x, y, z: calls["nodes"].append((tag, x, y, z)))
+    gt.add_elements_rule(lambda *args: True, lambda *args: calls["elements"].append(args))
+    gt.add_nodes_batch_rule(lambda tags, x, y, z, physgroups: np.ones(tags.shape, dtype=bool),
+        lambda tags, x, y, z: calls["node batches"].append((tags, x, y, z)))
+    gt.add_elements_batch_rule(lambda eletags, eletype, physgrp, nodes: np.ones(eletags.shape, dtype=bool),
+        lambda eletags, eletype, physgrp, nodes: calls["element batches"].append((eletype, eletags, physgrp, nodes)))
+    gt.parse(**parse_options)
+
+    result = dict((kind, [plain(call) for call in calls[kind]]) for kind in ("nodes", "elements"))
+    #batch rules are called once per chunk in a pipeline: compare what they were given, by element type
+    result["node batches"] = sorted(zip(*[np.concatenate(column).tolist() for column in zip(*calls["node batches"])]))
+    batches = {}
+    for eletype, eletags, physgrp, nodes in calls["element batches"]:
+        batches.setdefault(int(eletype), []).append(np.column_stack((eletags, physgrp, nodes)))
+    result["element batches"] = dict((eletype, sorted(np.concatenate(rows).tolist())) for eletype, rows in batches.items())
+
+    result["counts"] = (gt.Nphys, gt.Nnodes, gt.Nelem, int(gt.maxNodeTag), plain(gt.physical_groups))
+    result["periodic"] = (gt.Nperiodic, [len(pairs) for pairs in gt.Periodic_nodes], plain(gt.Periodic_nodes),
+        [plain(link) for link in getattr(gt, "periodic_links", [])])
+    return result
+
+
+def parsed(filename, **options):
+    parse_options = dict((key, options.pop(key)) for key in ("workers", "pipeline", "chunk_size") if key in options)
+    return record(gmshTranslator(filename, verbose=False, **options), **parse_options)
+
+
+@pytest.fixture(scope="module")
+def reference(make_mesh):
+    # Default parse() of every mesh: line by line for MSH 2.2 ASCII, from the arrays otherwise
+    results = {}
+
+    def get(version, binary, mesh):
+        key = (version, binary, mesh)
+        if key not in results:
+            results[key] = parsed(make_mesh(version, binary, **meshes[mesh]))
+        return results[key]
+
+    return get
+
+
+@pytest.mark.parametrize("version,binary", formats)
+@pytest.mark.parametrize("mesh", sorted(meshes))
+@pytest.mark.parametrize("path", ["workers", "pipeline", "lazy", "lazy pipeline", "loaded", "cache", "gzip", "bz2", "xz"])
+def test_parse_paths_give_the_same_calls(make_mesh, reference, tmp_path, version, binary, mesh, path):
+    expected = reference(version, binary, mesh)
+    filename = make_mesh(version, binary, **meshes[mesh])
+    if path == "workers":
+        result = parsed(filename, workers=2)
+    elif path == "pipeline":
+        result = parsed(filename, pipeline=True, chunk_size=7)
+    elif path == "lazy":
+        result = parsed(filename, lazy=True)
+    elif path == "lazy pipeline":
+        result = parsed(filename, lazy=True, pipeline=True, chunk_size=11)
+    elif path == "loaded":
+        gt = gmshTranslator(filename, verbose=False)
+        gt.load()
+        result = record(gt)
+    elif path == "cache":
+        assert parsed(filename, cache=True, cache_dir=str(tmp_path)) == expected
+        gt = gmshTranslator(filename, cache=True, cache_dir=str(tmp_path), verbose=False)
+        assert gt.element_blocks is not None     #restored
+        result = record(gt)
+    else:
+        if path == "xz":
+            pytest.importorskip("lzma")
+        result = parsed(make_mesh(version, binary, compression=path, **meshes[mesh]))
+    for key in expected:
+        assert result[key] == expected[key], key
+
+
+def node_calls(result):
+    # (tag, physical groups, coordinates) from the alternating condition and action calls, by tag
+    calls = result["nodes"]
+    return sorted((condition[1], condition[2], action[1:]) for condition, action in zip(calls[::2], calls[1::2]))
+
+
+@pytest.mark.parametrize("mesh", sorted(meshes))
+def test_formats_give_the_same_mesh(reference, mesh):
+    # Element calls are in the same order in every format; MSH 4.1 lists the nodes by entity
+    expected = reference("2.2", False, mesh)
+    for version, binary in formats[1:]:
+        result = reference(version, binary, mesh)
+        assert result["elements"] == expected["elements"]
+        assert node_calls(result) == node_calls(expected)
+        assert result["element batches"] == expected["element batches"]
+        assert result["counts"] == expected["counts"]
+        assert result["periodic"] == expected["periodic"]
+
+
+def test_reference_calls(reference):
+    result = reference("2.2", False, "partitioned")
+    assert len(result["elements"]) == 27 and all(len(call) == 6 for call in result["elements"])
+    assert sorted(set(call[5][0] for call in result["elements"])) == ["1", "2", "3"]
+    assert result["counts"][:3] == (2, 64, 27)
+    assert [call[0] for call in result["nodes"][::2]] == ["condition"] * 64
+    periodic = reference("2.2", True, "periodic")["periodic"]
+    assert periodic[0] == 3 and periodic[1] == [16, 16, 16]
+
+
+@pytest.mark.parametrize("version", ["4", "4.0", "3.0", "1.0"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_unsupported_versions_are_rejected(make_mesh, tmp_path, version, lazy):
+    # A 4.1 mesh relabelled: the 4.1 readers must not be given a MSH 4.0 file
+    with open(make_mesh("4.1", False)) as fid:
+        text = fid.read()
+    filename = str(tmp_path / "old.msh")
+    with open(filename, "w") as fid:
+        fid.write(text.replace("$MeshFormat\n4.1 ", "$MeshFormat\n" + version + " ", 1))
+    with pytest.raises(SystemExit):
+        gmshTranslator(filename, lazy=lazy, verbose=False).parse()
@@ -0,0 +1,133 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+# MSH 2.2 elements with ghost partitions (negative tags), a partition list without ghosts and
+# elements without partitions, mixed in one section
+GHOSTS = """$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$Nodes
+6
+1 0 0 0
+2 1 0 0
+3 2 0 0
+4 0 1 0
+5 1 1 0
+6 2 1 0
+$EndNodes
+$Elements
+5
+1 1 2 1 1 1 2
+2 2 5 2 2 2 1 -2 2 5 4
+3 2 4 2 3 1 3 3 6 5
+4 2 3 2 3 0 4 5 6
+5 1 2 1 1 2 3
+$EndElements
+"""
+
+
+def plain(value):
+    return value.tolist() if hasattr(value, "tolist") else value
+
+
+def element_calls(filename, **parse_options):
+    gt = gmshTranslator(filename, verbose=False, **parse_options.pop("options", {}))
+    calls = []
+    gt.add_elements_rule(lambda *args: True, lambda *args: calls.append(tuple(plain(a) for a in args)))
+    gt.parse(**parse_options)
+    return calls
+
+
+@pytest.fixture
+def ghosts(tmp_path):
+    filename = str(tmp_path / "ghosts.msh")
+    with open(filename, "w") as f:
+        f.write(GHOSTS)
+    return filename
+
+
+def test_ghost_partitions_are_passed_to_element_rules(ghosts):
+    calls = element_calls(ghosts)
+    assert [len(c) for c in calls] == [4, 6, 6, 4, 4]
+    assert calls[1][4:] == (2, ["1", "-2"])
+    assert calls[2][4:] == (1, ["3"])
+
+
+@pytest.mark.parametrize("options", [dict(workers=2), dict(options=dict(cache=True)), dict(pipeline=True, chunk_size=2)])
+def test_array_paths_pass_partitions_as_the_line_parser(ghosts, options):
+    reference = element_calls(ghosts)
+    assert element_calls(ghosts, **dict(options)) == reference
+    if "options" in options:
+        assert element_calls(ghosts, **dict(options)) == reference    #restored from the cache
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_partitioned_meshes(make_mesh, binary):
+    filename = make_mesh("2.2", binary, partitions=2)
+    calls = element_calls(filename, workers=2)
+    assert all(len(c) == 6 and c[4] == 1 for c in calls)
+    assert sorted(set(c[5][0] for c in calls)) == ["1", "2"]
+    if not binary:
+        assert element_calls(filename) == calls
+
+
+@pytest.mark.parametrize("fmt,extension", [("vtk", "vtk"), ("opensees", "tcl"), ("essi", "fei"), ("abaqus", "inp")])
+def test_write_partitions_with_default_arguments(make_mesh, tmp_path, fmt, extension):
+    gt = gmshTranslator(make_mesh("2.2", False, partitions=2), verbose=False)
+    pattern = str(tmp_path / ("part.%d." + extension))
+    if fmt != "vtk":
+        with pytest.raises(SystemExit):
+            gt.write_partitions(pattern, fmt)
+        assert not (tmp_path / ("part.1." + extension)).exists()
+        return
+    assert gt.write_partitions(pattern, fmt) == [pattern % 1, pattern % 2]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["part.1.vtk", "part.1.vtk.ghosts", "part.2.vtk", "part.2.vtk.ghosts"]
+
+
+@pytest.mark.parametrize("fmt,groups,element", [
+    ("opensees", {"group1" : ("stdBrick", 1), "group2" : ("stdBrick", 2)}, "element stdBrick "),
+    ("essi", {1 : ("8NodeBrick", 1), 2 : ("8NodeBrick", 2)}, "add element # "),
+    ("abaqus", {"group1" : "C3D8", "group2" : "C3D8"}, "*ELEMENT, TYPE=C3D8, ELSET=group"),
+])
+def test_write_partitions_with_groups(make_mesh, tmp_path, fmt, groups, element):
+    gt = gmshTranslator(make_mesh("2.2", False, partitions=2), verbose=False)
+    written = gt.write_partitions(str(tmp_path / "part.%d.txt"), fmt, groups)
+    assert len(written) == 2
+    contents = "".join(open(filename).read() for filename in written)
+    if fmt == "abaqus":
+        assert contents.count(element) == 4     #both groups in both partitions
+    else:
+        assert contents.count(element) == 27
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("4.1", True)])
+def test_owned_and_ghost_nodes(make_mesh, version, binary):
+    # Partitions are slabs of one cell along x: nodes on the plane between two partitions belong to the lower one
+    gt = gmshTranslator(make_mesh(version, binary, partitions=3), verbose=False)
+    partitioning = gt.build_partitions()
+    tags, coords, blocks = gt.to_arrays()
+    x = dict(zip(tags.tolist(), coords[:, 0].tolist()))
+    assert partitioning.partitions.tolist() == [1, 2, 3]
+    for p in (1, 2, 3):
+        assert sum(len(block) for block in partitioning.elements(p).values()) == 9
+        assert partitioning.nodes(p).size == 32
+        assert sorted(set(round(3 * x[tag]) for tag in partitioning.owned_nodes(p).tolist())) == ([0, 1] if p == 1 else [p])
+        assert sorted(set(round(3 * x[tag]) for tag in partitioning.ghost_nodes(p).tolist())) == ([] if p == 1 else [p - 1])
+        assert (partitioning.owner_of(partitioning.ghost_nodes(p)) == p - 1).all()
+        nodes, node_coords, elements = partitioning.arrays(p)
+        assert [x[tag] for tag in nodes.tolist()] == node_coords[:, 0].tolist()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ghosts_files(make_mesh, tmp_path, workers):
+    gt = gmshTranslator(make_mesh("2.2", True, partitions=3), verbose=False)
+    written = gt.write_partitions(str(tmp_path / "part.%d.vtk"), "vtk", workers=workers)
+    assert written == [str(tmp_path / ("part.%d.vtk" % p)) for p in (1, 2, 3)]
+    assert open(written[0] + ".ghosts").read() == ""
+    for p in (2, 3):
+        lines = [line.split() for line in open(written[p - 1] + ".ghosts").read().splitlines()]
+        assert len(lines) == 16 and set(owner for tag, owner in lines) == set([str(p - 1)])
+        assert "POINTS 32 double" in open(written[p - 1]).read()
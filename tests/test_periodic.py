@@ -0,0 +1,50 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.periodic import PeriodicConstraints
+
+
+def test_resolve_chains_and_cycles():
+    shift = np.eye(4)
+    shift[0, 3] = 2.0
+    periodic = PeriodicConstraints([
+        (1, 2, 1, shift.ravel(), np.array([[3, 2], [7, 7]])),
+        (1, 3, 2, np.zeros(0), np.array([[2, 1], [5, 6], [6, 5]])),
+    ])
+    assert len(periodic) == 5
+    assert periodic.has_affine.tolist() == [True, False] and periodic.link.tolist() == [0, 0, 1, 1, 1]
+    assert periodic.pairs_of(1).tolist() == [[2, 1], [5, 6], [6, 5]]
+    assert periodic.transform(0, [[1.0, 1.0, 0.0]]).tolist() == [[3.0, 1.0, 0.0]]
+    assert periodic.transform(1, [[1.0, 1.0, 0.0]]).tolist() == [[1.0, 1.0, 0.0]]
+
+    nodes, masters = periodic.resolve()
+    assert nodes.tolist() == [2, 3, 6] and masters.tolist() == [1, 1, 5]
+    assert periodic.master_of([3, 4, 6, 7]).tolist() == [1, 4, 5, 7]
+    assert periodic.independent_nodes().tolist() == [1, 5]
+    assert PeriodicConstraints([]).master_of([1, 2]).tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)])
+def test_periodic_cube(make_mesh, version, binary):
+    # The faces x = 1, y = 1 and z = 1 are slaves of x = 0, y = 0 and z = 0
+    gt = gmshTranslator(make_mesh(version, binary, periodic=True, sparse=True), verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+    position = dict((tag, i) for i, tag in enumerate(tags.tolist()))
+    periodic = gt.periodic
+    assert periodic.link_dims.tolist() == [2, 2, 2] and periodic.has_affine.all()
+    for k in range(3):
+        pairs = periodic.pairs_of(k)
+        slaves = coords[[position[t] for t in pairs[:, 0].tolist()]]
+        masters = coords[[position[t] for t in pairs[:, 1].tolist()]]
+        assert np.allclose(periodic.transform(k, masters), slaves)
+
+    nodes, finals = periodic.resolve()
+    assert nodes.size == 64 - 27
+    slaves = coords[[position[t] for t in nodes.tolist()]]
+    masters = coords[[position[t] for t in finals.tolist()]]
+    assert np.allclose(np.where(np.isclose(slaves, 1.0), 0.0, slaves), masters)
+    corner = tags[np.flatnonzero(np.isclose(coords, 1.0).all(axis=1))[0]]
+    origin = tags[np.flatnonzero(np.isclose(coords, 0.0).all(axis=1))[0]]
+    assert periodic.master_of([corner]).tolist() == [origin]
+    assert len(periodic.independent_nodes()) == 27 - 8
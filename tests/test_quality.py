@@ -0,0 +1,83 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.quality import MeshQuality
+from gmshtranslator.readers import ElementBlock
+
+
+def quality(eletype, coords, nodes):
+    # Metrics of elements of one type, nodes numbered by position in coords
+    coords = np.asarray(coords, dtype=float)
+    nodes = np.asarray(nodes, dtype=np.int64) + 1
+    n = nodes.shape[0]
+    block = ElementBlock(eletype, np.arange(1, n + 1), np.ones(n, dtype=np.int64), np.ones(n, dtype=np.int64),
+        nodes, np.arange(n))
+    return MeshQuality(np.arange(1, coords.shape[0] + 1), coords, {eletype : block}).elements[eletype]
+
+
+h = np.sqrt(3.) / 2.
+ideal = {
+    1 : ([[0, 0, 0], [3, 4, 0]], 5.),
+    2 : ([[0, 0, 0], [1, 0, 0], [0.5, h, 0]], h / 2.),
+    3 : ([[0, 0, 0], [3, 0, 0], [3, 1, 0], [0, 1, 0]], 3.),
+    4 : ([[0, 0, 0], [1, 0, 0], [0.5, h, 0], [0.5, h / 3., np.sqrt(2. / 3.)]], np.sqrt(2.) / 12.),
+    5 : ([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 2], [1, 0, 2], [1, 1, 2], [0, 1, 2]], 2.),
+    6 : ([[0, 0, 0], [1, 0, 0], [0.5, h, 0], [0, 0, 1], [1, 0, 1], [0.5, h, 1]], h / 2.),
+}
+
+
+@pytest.mark.parametrize("eletype", sorted(ideal))
+def test_ideal_elements(eletype):
+    coords, size = ideal[eletype]
+    q = quality(eletype, coords, [list(range(len(coords)))])
+    assert q.size[0] == pytest.approx(size)
+    assert q.jacobian[0] == pytest.approx(1.)
+    assert not q.inverted[0] and not q.degenerate[0]
+
+
+@pytest.mark.parametrize("eletype", [4, 5, 6])
+def test_mirrored_ideal_elements_are_inverted(eletype):
+    coords, size = ideal[eletype]
+    q = quality(eletype, np.array(coords) * [1, 1, -1], [list(range(len(coords)))])
+    assert q.size[0] == pytest.approx(-size)
+    assert q.jacobian[0] == pytest.approx(-1.)
+    assert q.inverted[0]
+
+
+@pytest.mark.parametrize("eletype,coords", [
+    (4, [[0, 0, 0], [1, 0, 0], [0, 2, 0], [0.3, 0.2, 1.5]]),
+    (4, [[0, 0, 0], [4, 0, 0], [0.2, 0.1, 0], [0.1, 0.3, 0.05]]),
+    (2, [[0, 0, 0], [3, 0, 0], [0.2, 0.5, 0]]),
+])
+def test_mirror_of_a_simplex_scores_minus_the_element(eletype, coords):
+    nodes = [list(range(len(coords)))]
+    element = quality(eletype, coords, nodes)
+    mirror = quality(eletype, np.array(coords, dtype=float) * [1, -1, 1], nodes)
+    assert element.jacobian[0] > 0
+    assert mirror.jacobian[0] == -element.jacobian[0]
+    assert mirror.size[0] == pytest.approx(-element.size[0])
+
+
+def test_flat_tetrahedron_is_degenerate():
+    q = quality(4, [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], [[0, 1, 2, 3]])
+    assert q.degenerate[0] and not q.inverted[0]
+    assert q.aspect_ratio[0] == pytest.approx(np.sqrt(2.))
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("4.1", True)])
+def test_generated_meshes(make_mesh, version, binary):
+    hexahedra = gmshTranslator(make_mesh(version, binary, n=3, groups=3), verbose=False).mesh_quality()
+    q = hexahedra.elements[5]
+    assert np.allclose(q.size, 1. / 27) and np.allclose(q.jacobian, 1.) and np.allclose(q.aspect_ratio, 1.)
+    assert sorted(hexahedra.groups) == [1, 2, 3]
+    assert all(group.elements == 9 and group.size == pytest.approx(1. / 3) for group in hexahedra.groups.values())
+
+    #cells split in 6 tetrahedra around a diagonal: the worst corner has edges 1, sqrt(2), sqrt(3) times the cell size
+    tetrahedra = gmshTranslator(make_mesh(version, binary, n=3, kind="tet", groups=1), verbose=False).mesh_quality()
+    q = tetrahedra.elements[4]
+    assert len(q) == 6 * 27
+    assert q.size.sum() == pytest.approx(1.)
+    assert np.allclose(q.jacobian, 1. / np.sqrt(3.))
+    assert np.allclose(q.aspect_ratio, np.sqrt(3.))
+    assert tetrahedra.groups[1].inverted == 0 and tetrahedra.groups[1].degenerate == 0
@@ -0,0 +1,47 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.renumbering import Renumbering, bandwidth
+
+
+@pytest.mark.parametrize("tags", [[8, 3, 15, 1], [8, 3, 10**12, 1]], ids=["table", "search"])
+def test_renumbering(tags):
+    renumbering = Renumbering(tags, start=1)
+    assert (renumbering.table is None) == (max(tags) > 1000)
+    assert renumbering.new(15 if max(tags) < 1000 else 10**12) == 3
+    assert renumbering.new(np.array([[1, 8], [3, 1]])).tolist() == [[4, 1], [2, 4]]
+    assert renumbering.old(np.array([4, 1, 2])).tolist() == [1, 8, 3]
+    assert len(renumbering) == 4
+    for missing in (2, -1, 10**13):
+        with pytest.raises(ValueError):
+            renumbering.new(missing)
+
+
+def test_compact_renumbering_of_sparse_tags(make_mesh):
+    gt = gmshTranslator(make_mesh("4.1", True, sparse=True), verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+    numbers, newcoords, newblocks = gt.renumber(start=0)
+    assert numbers.tolist() == list(range(64))
+    assert gt.node_numbering.old(numbers).tolist() == sorted(tags.tolist())      #by tag
+    assert (newcoords[gt.node_numbering.new(tags)] == coords).all()
+    assert newblocks[5].tags.tolist() == list(range(27))
+    assert (gt.node_numbering.old(newblocks[5].nodes) == blocks[5].nodes).all()
+    assert (gt.element_numbering.old(newblocks[5].tags) == blocks[5].tags).all()
+
+
+def test_rcm_renumbering_reduces_the_bandwidth(make_mesh):
+    pytest.importorskip("scipy")
+    gt = gmshTranslator(make_mesh("2.2", True, n=4, kind="tet", groups=1), verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+    gt.renumber("compact")
+    compact = bandwidth(blocks, gt.node_numbering)
+    numbers, newcoords, newblocks = gt.renumber("rcm")
+    assert sorted(gt.node_numbering.old(numbers).tolist()) == sorted(tags.tolist())
+    assert bandwidth(blocks, gt.node_numbering) < compact
+    assert (newcoords[gt.node_numbering.new(tags) - 1] == coords).all()
+
+
+def test_unknown_renumbering_method(make_mesh):
+    with pytest.raises(SystemExit):
+        gmshTranslator(make_mesh(), verbose=False).renumber("random")
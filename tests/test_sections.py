@@ -0,0 +1,63 @@
+from __future__ import print_function
+import io
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.readers import index_sections
+from test_fixtures import MSH41, binary_msh41
+from test_partitions import GHOSTS, ghosts
+
+
+def expected_sections(text, count=True):
+    # (header, start, end, line, nlines) of every section, found with str.index
+    sections = {}
+    for name in [line[1:] for line in text.split("\n") if line.startswith("$") and not line.startswith("$End")]:
+        header = text.index("$" + name + "\n")
+        start = header + len(name) + 2
+        end = text.index("$End" + name + "\n")
+        line = text[:start].count("\n") + 1
+        nlines = text[start:end].count("\n")
+        sections[name] = (header, start, end, line if count else None, nlines if count else None)
+    return sections
+
+
+def as_tuples(sections):
+    return dict((name, (s.header, s.start, s.end, s.line, s.nlines)) for name, s in sections.items())
+
+
+@pytest.mark.parametrize("text", [GHOSTS, MSH41], ids=["msh2", "msh4"])
+@pytest.mark.parametrize("blocksize", [7, 1 << 20])
+def test_index_sections(text, blocksize):
+    sections = index_sections(io.BytesIO(text.encode()), blocksize=blocksize)
+    assert as_tuples(sections) == expected_sections(text)
+
+
+def test_binary_sections_are_not_counted():
+    data = binary_msh41()
+    sections = index_sections(io.BytesIO(data), count=False, blocksize=64)
+    assert sorted(sections) == ["Elements", "Entities", "MeshFormat", "Nodes", "Periodic", "PhysicalNames"]
+    for name, section in sections.items():
+        assert data[section.header:section.start] == ("$" + name + "\n").encode()
+        assert data[section.end:].startswith(("$End" + name + "\n").encode())
+        assert section.line is None and section.nlines is None
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_translator_sections(ghosts, lazy):
+    gt = gmshTranslator(ghosts, lazy=lazy, verbose=False)
+    assert as_tuples(gt.section_index()) == expected_sections(GHOSTS)
+    with open(ghosts, "rb") as fid:
+        assert gt.__seek_section__(fid, "Elements")
+        assert fid.readline() == b"5\n"
+        assert not gt.__seek_section__(fid, "Periodic")
+
+
+def test_parse_seeks_to_the_sections(ghosts):
+    gt = gmshTranslator(ghosts, verbose=False)
+    tags = []
+    gt.add_nodes_rule(lambda *args: True, lambda tag, x, y, z: tags.append(int(tag)))
+    gt.parse()
+    assert tags == [1, 2, 3, 4, 5, 6]
+    #parse() goes where the index says: there the $Elements body does not have the 6 nodes
+    gt.sections["Nodes"] = gt.sections["Elements"]
+    with pytest.raises(SystemExit):
+        gt.parse()
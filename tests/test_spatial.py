@@ -0,0 +1,59 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator import spatial
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.spatial import SpatialIndex, tag_mask
+
+
+@pytest.fixture(params=["kdtree", "slabs"])
+def index(request, monkeypatch):
+    # Random nodes with sparse tags, with and without scipy
+    if request.param == "kdtree":
+        pytest.importorskip("scipy")
+    else:
+        monkeypatch.setattr(spatial, "cKDTree", None)
+    random = np.random.RandomState(3)
+    tags = random.permutation(2000)[:500] * 3 + 1
+    return SpatialIndex(tags, random.uniform(-1.0, 1.0, (500, 3)))
+
+
+def brute_force(index, inside):
+    return np.sort(index.node_tags[inside])
+
+
+def test_queries_match_brute_force(index):
+    coords = index.node_coords
+    lower, upper = np.array([-0.5, -np.inf, 0.0]), np.array([0.25, 0.5, np.inf])
+    assert index.in_box(lower, upper).tolist() == brute_force(index, ((coords >= lower) & (coords <= upper)).all(axis=1)).tolist()
+
+    center = np.array([0.1, -0.2, 0.3])
+    distance = np.sqrt(((coords - center)**2).sum(axis=1))
+    assert index.within(center, 0.4).tolist() == brute_force(index, distance <= 0.4).tolist()
+    assert index.nearest(center, k=5).tolist() == index.node_tags[np.argsort(distance)[:5]].tolist()
+    assert index.nearest(center).tolist() == [index.node_tags[np.argmin(distance)]]
+
+    normal = np.array([1.0, 2.0, -1.0]) / np.sqrt(6.0)
+    assert index.on_plane(center, normal, 0.05).tolist() == \
+        brute_force(index, np.abs((coords - center).dot(normal)) <= 0.05).tolist()
+    assert index.on_plane(center, [0, 0, 2], 0.05).tolist() == brute_force(index, np.abs(coords[:, 2] - 0.3) <= 0.05).tolist()
+
+
+def test_tag_mask():
+    assert tag_mask(np.array([2, 5, 9]), [[1, 2], [9, 10]]).tolist() == [[False, True], [True, False]]
+    assert tag_mask(np.zeros(0, dtype=np.int64), [1, 2]).tolist() == [False, False]
+
+
+def test_spatial_rule_helpers(make_mesh):
+    gt = gmshTranslator(make_mesh("4.1", True, sparse=True), verbose=False)
+    base = gt.spatial_index().on_plane([0, 0, 0], [0, 0, 1])
+    assert base.size == 16 and gt.spatial_index() is gt.spatial
+
+    nodes, elements, among = [], [], []
+    gt.add_nodes_batch_rule(gt.are_nodes_in_box([-1, -1, -1], [0.5, 2, 2]), lambda tags, x, y, z: nodes.append(tags))
+    gt.add_nodes_rule(gt.is_node_among(base), lambda tag, x, y, z: among.append(z))
+    gt.add_elements_batch_rule(gt.are_elements_on_nodes(base, all_nodes=False), lambda eletags, *args: elements.append(eletags))
+    gt.parse()
+    assert np.concatenate(nodes).size == 32
+    assert among == [0.0] * 16
+    assert np.concatenate(elements).size == 9
@@ -0,0 +1,37 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+
+
+formats = [("2.2", False), ("2.2", True), ("4.1", False), ("4.1", True)]
+
+
+@pytest.mark.parametrize("version,binary", formats)
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_chunks_match_the_arrays(make_mesh, version, binary, compression):
+    gt = gmshTranslator(make_mesh(version, binary, kind="tet", groups=3, partitions=2, compression=compression), verbose=False)
+    tags, coords, blocks = gt.to_arrays()
+
+    chunks = list(gt.iter_nodes(chunk_size=10))
+    assert max(chunk[0].size for chunk in chunks) == 10
+    assert np.concatenate([c[0] for c in chunks]).tolist() == tags.tolist()
+    assert (np.concatenate([c[1] for c in chunks]) == coords).all()
+
+    chunks = list(gt.iter_elements(chunk_size=25))
+    assert max(len(block) for block in chunks) == 25 and set(block.eletype for block in chunks) == set([4])
+    for field in ("tags", "physgrp", "partition", "nodes"):
+        assert (np.concatenate([getattr(block, field) for block in chunks]) == getattr(blocks[4], field)).all()
+
+
+def test_iter_elements_of_some_types(tmp_path):
+    # Points, lines and triangles mixed; only the triangles are asked for
+    filename = str(tmp_path / "mixed.msh")
+    with open(filename, "w") as f:
+        f.write("$MeshFormat\n2.2 0 8\n$EndMeshFormat\n$Nodes\n3\n1 0 0 0\n2 1 0 0\n3 0 1 0\n$EndNodes\n"
+            "$Elements\n4\n1 15 2 1 1 1\n2 1 2 1 1 1 2\n3 2 2 2 2 1 2 3\n4 1 2 1 1 2 3\n$EndElements\n")
+    gt = gmshTranslator(filename, verbose=False)
+    blocks = list(gt.iter_elements(types=[gt.triangle_3_node]))
+    assert [(block.eletype, block.tags.tolist(), block.nodes.tolist()) for block in blocks] == [(2, [3], [[1, 2, 3]])]
+    lines = list(gt.iter_elements(chunk_size=1, types=[gt.line_2_node]))
+    assert [block.tags.tolist() for block in lines] == [[2], [4]]
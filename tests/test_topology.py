@@ -0,0 +1,87 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from test_fixtures import MSH41
+
+
+# MSH41 with the surface in two physical groups, "body" and "skin": gmsh lists its quads once
+# per group
+TWO_GROUPS = MSH41.replace('2 1 "body"\n', '2 1 "body"\n2 4 "skin"\n').replace("3\n1 2", "4\n1 2", 1) \
+    .replace("1 0 0 0 2 1 0 1 1 0\n", "1 0 0 0 2 1 0 2 1 4 0\n")
+
+
+@pytest.fixture
+def two_groups(tmp_path):
+    filename = str(tmp_path / "two_groups.msh")
+    with open(filename, "w") as f:
+        f.write(TWO_GROUPS)
+    return filename
+
+
+def test_elements_in_two_groups(two_groups):
+    gt = gmshTranslator(two_groups, verbose=False)
+    assert sorted(gt.physical_groups_by_name) == ["body", "left", "right", "skin"]
+    topology = gt.build_topology()
+    assert topology.element_tags.tolist() == [3, 4, 1, 2]
+    assert topology.groups_of(1).tolist() == [1, 4] and topology.groups_of(3).tolist() == [2]
+    assert topology.in_groups(4).tolist() == [False, False, True, True]
+
+    body = gt.boundary_faces("body")
+    skin = gt.boundary_faces("skin")
+    assert len(body) == 6
+    assert sorted(zip(skin.element_tags.tolist(), skin.local_facet.tolist())) == \
+        sorted(zip(body.element_tags.tolist(), body.local_facet.tolist()))
+    assert skin.nodes.tolist() == body.nodes.tolist()
+    assert len(gt.boundary_faces()) == 6
+
+
+def outward(gt, faces):
+    # Whether the normal of every boundary face of the unit cube points away from its center
+    tags, coords, blocks = gt.to_arrays()
+    position = dict((tag, i) for i, tag in enumerate(tags.tolist()))
+    result = []
+    for nodes in faces.nodes.tolist():
+        points = coords[[position[tag] for tag in nodes if tag >= 0]]
+        normal = np.cross(points[1] - points[0], points[-1] - points[0])
+        result.append(np.dot(normal, points.mean(axis=0) - 0.5) > 0)
+    return all(result)
+
+
+@pytest.mark.parametrize("version,binary", [("2.2", False), ("4.1", True)])
+def test_hexahedra_topology(make_mesh, version, binary):
+    gt = gmshTranslator(make_mesh(version, binary, sparse=True), verbose=False)
+    topology = gt.build_topology()
+    assert topology.element_tags.size == 27
+    assert np.bincount(topology.node_valence()).tolist() == [0, 8, 24, 0, 24, 0, 0, 0, 8]
+    for tag in topology.node_tags[::5].tolist():
+        elements = topology.elements_of(tag).tolist()
+        assert all(tag in gt.element_blocks[5].nodes[gt.element_blocks[5].tags == e][0] for e in elements)
+
+    degree = np.diff(topology.element_indptr)
+    assert degree.sum() == 2 * 54 and sorted(set(degree.tolist())) == [3, 4, 5, 6]
+    for tag in topology.element_tags.tolist():
+        nodes = set(gt.element_blocks[5].nodes[gt.element_blocks[5].tags == tag][0].tolist())
+        for other in topology.neighbours_of(tag).tolist():
+            assert len(nodes & set(gt.element_blocks[5].nodes[gt.element_blocks[5].tags == other][0].tolist())) == 4
+
+    faces = gt.boundary_faces()
+    assert len(faces) == 54 and faces.nodes.shape == (54, 4) and outward(gt, faces)
+    assert len(gt.boundary_faces("group1")) == 30 and len(gt.boundary_faces(2)) == 42
+
+
+def test_tetrahedra_boundary(make_mesh):
+    gt = gmshTranslator(make_mesh("4.1", False, kind="tet"), verbose=False)
+    faces = gt.boundary_faces()
+    assert len(faces) == 108 and faces.nodes.shape == (108, 3) and outward(gt, faces)
+    assert set(faces.local_facet.tolist()) <= set(range(4))
+    indptr, neighbours = gt.topology.element_adjacency()
+    assert np.diff(indptr).max() == 4 and np.diff(indptr).sum() == 4 * 162 - 108
+
+
+def test_fixture_surface_topology(two_groups):
+    # Surfaces are joined through their edges; lines have no facets of their own dimension here
+    topology = gmshTranslator(two_groups, verbose=False).build_topology()
+    assert topology.neighbours_of(1).tolist() == [2]
+    assert topology.element_dims().tolist() == [1, 1, 2, 2]
+    assert topology.elements_of(2).tolist() == [1, 2] and topology.elements_of(1).tolist() == [3, 1]
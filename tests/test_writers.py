@@ -0,0 +1,102 @@
+from __future__ import print_function
+import re
+import numpy as np
+import pytest
+from gmshtranslator.gmshtranslator import gmshTranslator
+from gmshtranslator.readers import ElementBlock
+from gmshtranslator.writers import write_abaqus, write_rows
+from test_fixtures import MSH41
+
+
+# Output of the writers for the hand-written MSH41 fixture: nodes in file order (1 4 3 6 2 5),
+# the quads of "body" and the lines of "left" and "right"
+
+@pytest.fixture
+def gt(tmp_path):
+    filename = str(tmp_path / "fixture.msh")
+    with open(filename, "w") as f:
+        f.write(MSH41)
+    return gmshTranslator(filename, verbose=False)
+
+
+def test_write_rows_in_chunks(tmp_path):
+    filename = str(tmp_path / "rows.txt")
+    with open(filename, "w") as f:
+        write_rows(f, "%d %.1f\n", [np.arange(5), np.linspace(0, 1, 5)], chunk_size=2)
+    assert open(filename).read() == "0 0.0\n1 0.2\n2 0.5\n3 0.8\n4 1.0\n"
+
+
+def test_write_opensees(gt, tmp_path):
+    filename = str(tmp_path / "model.tcl")
+    gt.write_opensees(filename, {"body" : ("quad", (1.0, "PlaneStrain", 2))}, ndm=2, ndf=2)
+    assert open(filename).read() == ("model BasicBuilder -ndm 2 -ndf 2\n\n"
+        "node 1 0 0\nnode 4 0 1\nnode 3 2 0\nnode 6 2 1\nnode 2 1 0\nnode 5 1 1\n\n"
+        "element quad 1 1 2 5 4 1.0 PlaneStrain 2\nelement quad 2 2 3 6 5 1.0 PlaneStrain 2\n")
+
+    filename = str(tmp_path / "model.py")
+    gt.write_opensees(filename, {"left" : ("truss", (1.0, 3))}, language="python")
+    assert open(filename).read() == ("import openseespy.opensees as ops\n\n"
+        "ops.model('basic', '-ndm', 3, '-ndf', 3)\n\n"
+        "ops.node(1, 0, 0, 0)\nops.node(4, 0, 1, 0)\n\n"
+        "ops.element('truss', 3, 1, 4, 1.0, 3)\n")
+
+
+def test_write_essi(gt, tmp_path):
+    filename = str(tmp_path / "model.fei")
+    gt.write_essi(filename, {"right" : ("2NodeBeam", 1), 1 : ("4NodeShell_ANDES", "use material # 2 thickness = 0.1*m")},
+        all_nodes=True)
+    lines = open(filename).read().split("\n")
+    assert lines[0] == "add node # 1 at (0*m, 0*m, 0*m) with 3 dofs;"
+    assert len(lines) == 6 + 1 + 3 + 1
+    assert lines[7:10] == [
+        "add element # 4 type 2NodeBeam with nodes (3, 6) use material # 1;",
+        "add element # 1 type 4NodeShell_ANDES with nodes (1, 2, 5, 4) use material # 2 thickness = 0.1*m;",
+        "add element # 2 type 4NodeShell_ANDES with nodes (2, 3, 6, 5) use material # 2 thickness = 0.1*m;"]
+
+
+def test_write_abaqus(gt, tmp_path):
+    filename = str(tmp_path / "model.inp")
+    gt.write_abaqus(filename, {"body" : "S4", "left" : ("T3D2",)})
+    assert open(filename).read() == ("*NODE\n"
+        "1, 0, 0, 0\n4, 0, 1, 0\n3, 2, 0, 0\n6, 2, 1, 0\n2, 1, 0, 0\n5, 1, 1, 0\n"
+        "*ELEMENT, TYPE=T3D2, ELSET=left\n3, 1, 4\n"
+        "*ELEMENT, TYPE=S4, ELSET=body\n1, 1, 2, 5, 4\n2, 2, 3, 6, 5\n")
+
+
+def test_abaqus_lines_hold_16_entries(tmp_path):
+    nodes = np.arange(1, 21).reshape(1, 20)
+    block = ElementBlock(17, np.array([7]), np.array([1]), np.array([1]), nodes, np.array([0]))
+    filename = str(tmp_path / "c3d20.inp")
+    write_abaqus(filename, np.arange(1, 21), np.zeros((20, 3)), {17 : block}, {1 : "C3D20"})
+    text = open(filename).read()
+    assert text.endswith("*ELEMENT, TYPE=C3D20, ELSET=GROUP1\n7, " + ", ".join(map(str, range(1, 16))) + ",\n16, 17, 18, 19, 20\n")
+
+
+def test_write_vtk(gt, tmp_path):
+    filename = str(tmp_path / "model.vtk")
+    gt.write_vtk(filename, ["body", "right"])
+    text = open(filename).read()
+    assert "POINTS 6 double\n0 0 0\n0 1 0\n2 0 0\n2 1 0\n1 0 0\n1 1 0\n" in text
+    #cells by type (lines first), as positions in the points
+    assert "CELLS 3 13\n2 2 3\n4 0 4 5 1\n4 4 2 3 5\n" in text
+    assert "CELL_TYPES 3\n3\n9\n9\n" in text
+    assert "SCALARS physgrp int 1\nLOOKUP_TABLE default\n3\n1\n1\n" in text
+    assert "SCALARS tags int 1\nLOOKUP_TABLE default\n4\n1\n2\n" in text
+
+
+def test_write_vtu(gt, tmp_path):
+    filename = str(tmp_path / "model.vtu")
+    gt.write_vtk(filename)
+    data = open(filename, "rb").read()
+    header, appended = data.split(b'<AppendedData encoding="raw">\n_', 1)
+    arrays = {}
+    for dtype, name, offset in re.findall(rb'type="(\w+)" Name="(\w+)" NumberOfComponents="\d" format="appended" offset="(\d+)"', header):
+        size = int(np.frombuffer(appended[int(offset):int(offset)+8], dtype="<u8")[0])
+        dtype = {b"Float64" : "<f8", b"Int64" : "<i8", b"UInt8" : "u1"}[dtype]
+        arrays[name.decode()] = np.frombuffer(appended[int(offset)+8:int(offset)+8+size], dtype=dtype)
+    assert b'NumberOfPoints="6" NumberOfCells="4"' in header
+    assert arrays["Points"].reshape(-1, 3)[:, :2].tolist() == [[0, 0], [0, 1], [2, 0], [2, 1], [1, 0], [1, 1]]
+    assert arrays["connectivity"].tolist() == [0, 1, 2, 3, 0, 4, 5, 1, 4, 2, 3, 5]
+    assert arrays["offsets"].tolist() == [2, 4, 8, 12]
+    assert arrays["types"].tolist() == [3, 3, 9, 9]
+    assert arrays["physgrp"].tolist() == [2, 3, 1, 1] and arrays["tags"].tolist() == [3, 4, 1, 2]